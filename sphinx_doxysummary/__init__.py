@@ -13,8 +13,19 @@ import sphinx
 from sphinx.application import Sphinx
 
 from sphinx_doxysummary.xmltree import process_generate_xmltree
-from sphinx_doxysummary.generate import process_generate_files
-from sphinx_doxysummary.directive import DoxySummary
+from sphinx_doxysummary.doxygen import process_run_doxygen
+from sphinx_doxysummary.generate import (process_generate_files, process_merge_info,
+                                         process_purge_doc, process_xml_outdated_docs)
+from sphinx_doxysummary.directive import (DoxySummary, DoxySummaryTarget,
+                                          process_direct_link)
+from sphinx_doxysummary.pipeline import process_pipelined_build
+from sphinx_doxysummary.shard import (process_build_shard, process_exclude_shard_dir,
+                                      process_merge_shards)
+from sphinx_doxysummary.inventory import process_export_inventory
+from sphinx_doxysummary.store import process_save_store
+from sphinx_doxysummary.incremental import (process_incremental_xmltree,
+                                            process_outdated_docs,
+                                            process_save_cache)
 
 
 # adding all elements to Sphinx application
@@ -23,14 +34,74 @@ def setup(app: Sphinx) -> Dict[str, Any]:
     app.setup_extension('breathe')
 
     app.add_directive('doxysummary', DoxySummary)
+    app.add_directive('doxysummary-target', DoxySummaryTarget)
     # app.add_role('autolink', AutoLink())
+    app.connect('config-inited', process_exclude_shard_dir)
+    app.connect('builder-inited', process_run_doxygen, priority=400)
     app.connect('builder-inited', process_generate_xmltree)
+    app.connect('builder-inited', process_incremental_xmltree)
     app.connect('builder-inited', process_generate_files)
+    app.connect('builder-inited', process_pipelined_build)
+    app.connect('builder-inited', process_build_shard)
+    app.connect('builder-inited', process_merge_shards)
+    app.connect('env-purge-doc', process_purge_doc)
+    app.connect('env-merge-info', process_merge_info)
+    app.connect('env-updated', process_save_store)
+    app.connect('missing-reference', process_direct_link)
+    app.connect('env-get-outdated', process_outdated_docs)
+    app.connect('env-get-outdated', process_xml_outdated_docs)
+    app.connect('build-finished', process_save_cache)
+    app.connect('build-finished', process_export_inventory)
 
     app.add_config_value(name='doxysummary_generate', default=True,
                          rebuild=True, types=[bool])
     app.add_config_value(name='doxygen_xml', default=[os.path.abspath('./xml')],
-                         rebuild=True, types=[list])
+                         rebuild=True, types=[list, dict])
+    app.add_config_value(name='doxysummary_default_project', default=None,
+                         rebuild='env', types=[str])
+    app.add_config_value(name='doxysummary_doxyfile', default=None,
+                         rebuild='', types=[str, list])
+    app.add_config_value(name='doxysummary_doxygen', default='doxygen',
+                         rebuild='', types=[str])
+    app.add_config_value(name='doxysummary_xml_engine', default='python',
+                         rebuild='', types=[str])
+    app.add_config_value(name='doxysummary_index', default=None,
+                         rebuild='', types=[str])
+    app.add_config_value(name='doxysummary_cache_dir', default=None,
+                         rebuild='', types=[str])
+    app.add_config_value(name='doxysummary_cache_size', default=1 << 30,
+                         rebuild='', types=[int])
+    app.add_config_value(name='doxysummary_server', default=None,
+                         rebuild='', types=[str])
+    app.add_config_value(name='doxysummary_server_timeout', default=60.0,
+                         rebuild='', types=[int, float])
+    app.add_config_value(name='doxysummary_pipeline', default=False,
+                         rebuild='', types=[bool])
+    app.add_config_value(name='doxysummary_incremental', default=False,
+                         rebuild='', types=[bool])
+    app.add_config_value(name='doxysummary_shard', default=None,
+                         rebuild='', types=[tuple, str])
+    app.add_config_value(name='doxysummary_shard_dir', default='doxysummary_shards',
+                         rebuild='', types=[str])
+    app.add_config_value(name='doxysummary_merge_shards', default=False,
+                         rebuild='', types=[bool])
+    app.add_config_value(name='doxysummary_inventory', default=None,
+                         rebuild='', types=[str])
+    app.add_config_value(name='doxysummary_template', default='cppbase.rst',
+                         rebuild='env', types=[str])
+    app.add_config_value(name='doxysummary_preflight', default='error',
+                         rebuild='', types=[str])
+    app.add_config_value(name='doxysummary_stub_layout', default='flat',
+                         rebuild='env', types=[str])
+    app.add_config_value(name='doxysummary_stub_max_length', default=0,
+                         rebuild='env', types=[int])
+    app.add_config_value(name='doxysummary_group_overloads', default=False,
+                         rebuild='env', types=[bool])
+    app.add_config_value(name='doxysummary_split_members', default=0,
+                         rebuild='env', types=[int])
+    app.add_config_value(name='doxysummary_direct_links', default=False,
+                         rebuild='env', types=[bool])
 
-    return {'version': sphinx.__display_version__, 'parallel_read_safe': True}
+    return {'version': sphinx.__display_version__, 'env_version': 2,
+            'parallel_read_safe': True, 'parallel_write_safe': True}
 
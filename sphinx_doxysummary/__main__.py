@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Command line interface of doxysummary.
+
+Usage::
+
+    python -m sphinx_doxysummary serve --socket /tmp/doxysummary.sock ./xml
+    python -m sphinx_doxysummary shard --shard 0/4 docs/source
+    python -m sphinx_doxysummary merge docs/source/doxysummary_shards merged
+    python -m sphinx_doxysummary index --output symbols.pickle ./xml
+    python -m sphinx_doxysummary generate docs/source
+    python -m sphinx_doxysummary query --index symbols.pickle "foo(int)"
+    python -m sphinx_doxysummary fuzz --cases 5000 --seed 1
+    python -m sphinx_doxysummary inventory --output core.inv ./xml
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+from typing import Any, Dict, List
+
+
+def init_sphinx(sourcedir: str, confdir: str = None,
+                overrides: Dict[str, Any] = None) -> None:
+    """Initialize a Sphinx application without building the documentation.
+
+    The handlers of ``builder-inited`` (loading of the Doxygen projects and
+    generation of rst files) are run, but no document is read.
+
+    Parameters
+    ----------
+    sourcedir: str
+        Source directory of the documentation.
+    confdir: str, optional
+        Directory of ``conf.py``. If ``None``, the source directory is used.
+    overrides: Dict[str, Any], optional
+        Config variables overriding those of ``conf.py``.
+    """
+    import tempfile
+    from sphinx.application import Sphinx
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        Sphinx(sourcedir, confdir or sourcedir, os.path.join(tmpdir, 'out'),
+               os.path.join(tmpdir, 'doctrees'), 'dummy',
+               confoverrides=overrides or {}, status=None)
+
+
+def build_shard(sourcedir: str, confdir: str, shard: str,
+                output: str = None) -> None:
+    """Build the artifact of a shard without building the documentation.
+
+    Parameters
+    ----------
+    sourcedir: str
+        Source directory of the documentation.
+    confdir: str
+        Directory of ``conf.py``. If ``None``, the source directory is used.
+    shard: str
+        Shard to build, as ``"i/n"``.
+    output: str, optional
+        Directory of shard artifacts, overriding the config variable
+        ``doxysummary_shard_dir``.
+    """
+    overrides = {'doxysummary_shard': shard}
+    if output is not None:
+        overrides['doxysummary_shard_dir'] = os.path.abspath(output)
+    init_sphinx(sourcedir, confdir, overrides)
+
+
+def read_source(source: str, engine: str = 'python', index: Dict[str, Any] = None) -> List[Any]:
+    """Read the items of a Doxygen xml directory or of an inventory.
+
+    Parameters
+    ----------
+    source: str
+        Doxygen xml directory, or inventory file.
+    engine: str, optional
+        XML extraction engine.
+    index: Dict[str, Any], optional
+        Symbol index from which the items of an xml directory are loaded
+        (parsed if missing or outdated in the index).
+
+    Return
+    ------
+    List[DoxygenItem]
+        Items of the source.
+
+    Raises
+    ------
+    ValueError
+        When the source is neither a directory nor an inventory.
+    """
+    from sphinx_doxysummary.inventory import is_inventory, read_inventory
+    from sphinx_doxysummary.prebuilt import prebuilt_items
+    from sphinx_doxysummary.xmltree import parse_doxygen_xml
+
+    if is_inventory(source):
+        return read_inventory(source)
+    if not os.path.isdir(source):
+        raise ValueError(f'{source} is neither a Doxygen xml directory nor an inventory')
+    items = prebuilt_items(index, source) if index is not None else None
+    if items is None:
+        items = parse_doxygen_xml(source, engine)
+    return items
+
+
+def query(name: str, xmldirs: List[str], index_fname: str = None,
+          scope: str = '', using: List[str] = None,
+          engine: str = 'python') -> List[str]:
+    """Look up a name (with arguments for a function) as the directive
+    ``doxysummary`` does, and describe the items found.
+
+    Parameters
+    ----------
+    name: str
+        Entry to look up (e.g. ``func_overload(int *)``).
+    xmldirs: List[str]
+        Doxygen xml directories or inventories. If empty, all projects of the
+        symbol index are used.
+    index_fname: str, optional
+        Symbol index from which the items are loaded (projects missing or
+        outdated in the index are parsed).
+    scope: str, optional
+        Scope in which the name is resolved.
+    using: List[str], optional
+        Namespaces searched after the scope and its enclosing scopes.
+    engine: str, optional
+        XML extraction engine.
+
+    Return
+    ------
+    List[str]
+        One line per item bearing the name. The overload matching the
+        arguments is marked by ``*``.
+
+    Raises
+    ------
+    ValueError
+        When the name is not found, or a source is neither a directory nor an
+        inventory.
+    """
+    from sphinx_doxysummary.prebuilt import load_index
+    from sphinx_doxysummary.utils import split_name
+    from sphinx_doxysummary.xmltree import xml_tree, register_item, resolve_name
+
+    index = load_index(index_fname) if index_fname else None
+    if not xmldirs and index is not None:
+        xmldirs = list(index['projects'])
+    for xmldir in xmldirs:
+        for item in read_source(xmldir, engine, index):
+            register_item(item)
+
+    _, item_name, func_args = split_name(name)
+    fullname = resolve_name(item_name, scope, using)
+    lines = []
+    for item in xml_tree[fullname]:
+        matched = bool(func_args) and item.kind == 'function' and item.check_args(func_args)
+        lines.append(f'{"*" if matched else " "} {item.kind} {item.name}'
+                     f'{item.argsstring or ""} [{item.refid}] {item.summary}')
+    return lines
+
+
+def main(argv: List[str] = None) -> int:
+    """Entry point of ``python -m sphinx_doxysummary``.
+
+    Parameters
+    ----------
+    argv: List[str], optional
+        Command line arguments. Default is ``sys.argv[1:]``.
+
+    Return
+    ------
+    int
+        Exit status.
+    """
+    parser = argparse.ArgumentParser(prog='python -m sphinx_doxysummary',
+                                     description='Doxysummary utilities.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser(
+        'serve', help='run a symbol server holding parsed Doxygen projects')
+    serve_parser.add_argument('--socket', required=True,
+                              help='path of the Unix socket to listen to')
+    serve_parser.add_argument('xmldirs', nargs='*',
+                              help='Doxygen xml directories to parse at startup')
+
+    shard_parser = subparsers.add_parser(
+        'shard', help='build the symbol store and rst files of one shard')
+    shard_parser.add_argument('--shard', required=True,
+                              help='shard to build, as "i/n"')
+    shard_parser.add_argument('--confdir', default=None,
+                              help='directory of conf.py (default: SOURCEDIR)')
+    shard_parser.add_argument('--output', default=None,
+                              help='directory of shard artifacts (default: '
+                                   'config variable doxysummary_shard_dir)')
+    shard_parser.add_argument('sourcedir', help='source directory of the documentation')
+
+    merge_parser = subparsers.add_parser(
+        'merge', help='combine the artifacts of a sharded build')
+    merge_parser.add_argument('--output', required=True,
+                              help='directory in which the merged artifact is saved')
+    merge_parser.add_argument('shard_dir', help='directory of the shard artifacts')
+
+    index_parser = subparsers.add_parser(
+        'index', help='parse Doxygen projects into a symbol index file')
+    index_parser.add_argument('--output', required=True,
+                              help='path of the symbol index file')
+    index_parser.add_argument('--engine', default='python', choices=['python', 'xslt'],
+                              help='XML extraction engine')
+    index_parser.add_argument('xmldirs', nargs='+', help='Doxygen xml directories')
+
+    generate_parser = subparsers.add_parser(
+        'generate', help='generate the rst files of doxysummary directives')
+    generate_parser.add_argument('--confdir', default=None,
+                                 help='directory of conf.py (default: SOURCEDIR)')
+    generate_parser.add_argument('-D', dest='define', action='append', default=[],
+                                 metavar='NAME=VALUE', help='override a config variable')
+    generate_parser.add_argument('sourcedir', help='source directory of the documentation')
+
+    query_parser = subparsers.add_parser(
+        'query', help='look up a name or a function signature')
+    query_parser.add_argument('--index', default=None, help='symbol index file')
+    query_parser.add_argument('--scope', default='', help='scope of the name')
+    query_parser.add_argument('--using', default='',
+                              help='namespaces searched after the scope')
+    query_parser.add_argument('--engine', default='python', choices=['python', 'xslt'],
+                              help='XML extraction engine')
+    query_parser.add_argument('name', help='name, with arguments for a function')
+    query_parser.add_argument('xmldirs', nargs='*',
+                              help='Doxygen xml directories or inventories '
+                                   '(default: projects of the index)')
+
+    fuzz_parser = subparsers.add_parser(
+        'fuzz', help='compare and benchmark argument type matchers on random cases')
+    fuzz_parser.add_argument('--cases', type=int, default=2000,
+                             help='number of generated cases')
+    fuzz_parser.add_argument('--seed', type=int, default=0, help='random seed')
+    fuzz_parser.add_argument('--repeat', type=int, default=3,
+                             help='number of timed runs per matcher')
+    fuzz_parser.add_argument('--show', type=int, default=5,
+                             help='number of failing cases shown per matcher')
+
+    inventory_parser = subparsers.add_parser(
+        'inventory', help='export Doxygen projects as a symbol inventory')
+    inventory_parser.add_argument('--output', required=True,
+                                  help='path of the inventory file')
+    inventory_parser.add_argument('--project', default='',
+                                  help='name of the project written in the header')
+    inventory_parser.add_argument('--engine', default='python', choices=['python', 'xslt'],
+                                  help='XML extraction engine')
+    inventory_parser.add_argument('sources', nargs='+',
+                                  help='Doxygen xml directories or inventories')
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if args.command == 'serve':
+        from sphinx_doxysummary.server import serve
+        try:
+            serve(args.socket, args.xmldirs)
+        except ValueError as err:
+            print(err, file=sys.stderr)
+            return 1
+    elif args.command == 'shard':
+        build_shard(args.sourcedir, args.confdir, args.shard, args.output)
+    elif args.command == 'index':
+        from sphinx_doxysummary.prebuilt import build_index, save_index
+        save_index(args.output, build_index(args.xmldirs, args.engine))
+    elif args.command == 'generate':
+        init_sphinx(args.sourcedir, args.confdir,
+                    dict(define.split('=', 1) for define in args.define))
+    elif args.command == 'query':
+        from sphinx_doxysummary.utils import split_using
+        try:
+            lines = query(args.name, args.xmldirs, args.index, args.scope,
+                          split_using(args.using), args.engine)
+        except (KeyError, ValueError) as err:
+            print(err, file=sys.stderr)
+            return 1
+        print('\n'.join(lines))
+    elif args.command == 'fuzz':
+        from sphinx_doxysummary.fuzz import format_report, make_corpus, run_matchers
+        corpus = make_corpus(args.cases, args.seed)
+        reports = run_matchers(corpus, repeat=args.repeat)
+        print(format_report(reports, len(corpus), show=args.show))
+        # candidate matchers must be right on every case
+        if any(report['wrong'] or report['errors']
+               for name, report in reports.items() if name != 'heuristic'):
+            return 1
+    elif args.command == 'inventory':
+        from sphinx_doxysummary.inventory import write_inventory
+        items = []
+        try:
+            for source in args.sources:
+                items.extend(read_source(source, args.engine))
+        except ValueError as err:
+            print(err, file=sys.stderr)
+            return 1
+        write_inventory(args.output, items, args.project)
+    elif args.command == 'merge':
+        from sphinx_doxysummary.shard import (artifact_path, load_artifacts,
+                                              merge_artifacts, save_artifact)
+        artifact = merge_artifacts(load_artifacts(args.shard_dir))
+        save_artifact(artifact_path(args.output, 0, 1), artifact)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Content-addressed cache of compound files, shared between projects.
+
+The records extracted from a compound file (see
+:func:`sphinx_doxysummary.xmltree.extract_records`) only depend on its content
+and on the XML engine. With the config variable ``doxysummary_cache_dir``, they
+are saved in a directory keyed by the SHA-256 digest of the file::
+
+    v2-python/
+        3f/3f8a...e1.pickle    # records of a compound file
+        ...
+
+so that any build reading an identical compound file (e.g. the documentation
+of another version of the same library, or another checkout) reuses them
+instead of parsing the file. The directory can be shared by concurrent builds:
+entries are written to a temporary file and renamed.
+
+The modification time of an entry is updated each time it is used, and the
+least recently used entries are removed when the directory exceeds
+``doxysummary_cache_size`` bytes.
+
+The entries are pickles, loaded without any check: anyone who can write in the
+directory can run code in the builds using it. The directory must only be
+writable by trusted users. It is created with permission ``0700`` (like the
+socket of the symbol server), and a directory writable by all users is not
+used.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+
+from typing import Any, Dict, List, Tuple
+
+from sphinx.application import Sphinx
+from sphinx.util import logging
+
+from sphinx_doxysummary.xmltree import extract_records
+
+logger = logging.getLogger(__name__)
+
+cache_version = 2
+"""Version of the format of cache entries."""
+
+
+class RecordCache:
+    """Content-addressed cache of the records of compound files.
+
+    Attributes
+    ----------
+    directory: str
+        Directory of the cache.
+    max_size: int
+        Maximal total size of the entries, in bytes (no limit if 0).
+    hits: int
+        Number of compound files whose records were found in the cache.
+    misses: int
+        Number of compound files parsed.
+    """
+
+    def __init__(self, directory: str, max_size: int = 0):
+        """
+        Parameters
+        ----------
+        directory: str
+            Directory of the cache, created if needed.
+        max_size: int, optional
+            Maximal total size of the entries, in bytes.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, digest: str, engine: str) -> str:
+        """Get the path of the entry of a compound file digest."""
+        return os.path.join(self.directory, f'v{cache_version}-{engine}',
+                            digest[:2], digest + '.pickle')
+
+    def records(self, xml_fname: str, engine: str = 'python') -> List[Dict[str, Any]]:
+        """Get the records of a compound file, from the cache if a file with
+        the same content has already been parsed.
+
+        This method has the signature of
+        :func:`sphinx_doxysummary.xmltree.extract_records` and can be called
+        from several threads.
+        """
+        with open(xml_fname, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        path = self.entry_path(digest, engine)
+        try:
+            with open(path, 'rb') as f:
+                records = pickle.load(f)
+            os.utime(path)  # most recently used
+            self.hits += 1
+            return records
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass
+
+        records = extract_records(xml_fname, engine)
+        self.misses += 1
+        try:
+            os.makedirs(os.path.dirname(os.path.dirname(path)), mode=0o700, exist_ok=True)
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}-{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(records, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)  # atomic, other builds see whole entries
+        except OSError as err:
+            logger.warning('doxysummary: cannot write to the cache %s (%s)',
+                           self.directory, err)
+        return records
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """List the entries of the cache as (modification time, size, path)."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.pickle'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:  # removed by another build
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self) -> int:
+        """Remove the least recently used entries until the total size of the
+        cache is at most ``max_size``.
+
+        Return
+        ------
+        int
+            Number of entries removed.
+        """
+        if not self.max_size:
+            return 0
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def report(self) -> None:
+        """Evict the least recently used entries and log the use of the
+        cache."""
+        removed = self.evict()
+        logger.info('[doxysummary] compound cache %s: %d hits, %d parsed, %d '
+                    'entries evicted', self.directory, self.hits, self.misses,
+                    removed)
+
+
+def trusted_directory(directory: str) -> bool:
+    """Create the directory of a cache (owner only) if it does not exist, and
+    check that it is not writable by all users."""
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        return not os.stat(directory).st_mode & 0o002
+    except OSError:
+        return False
+
+
+def get_record_cache(app: Sphinx) -> RecordCache:
+    """Get the cache of compound files (config variable
+    ``doxysummary_cache_dir``, relative to the configuration directory), or
+    ``None`` if it is not set or cannot be trusted (see
+    :func:`trusted_directory`)."""
+    if not app.config.doxysummary_cache_dir:
+        return None
+    directory = os.path.join(app.confdir, app.config.doxysummary_cache_dir)
+    if not trusted_directory(directory):
+        logger.warning('doxysummary: the cache directory %s cannot be created or '
+                       'is writable by all users, it is not used', directory)
+        return None
+    return RecordCache(directory, app.config.doxysummary_cache_size)
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Single pass parser of C++ parameter declarations.
+
+Each parameter is reduced to a canonical key: argument names, default values,
+spaces and the position of cv-qualifiers in the declaration specifiers are
+removed, so that two parameters have the same type if and only if their keys
+are equal. Every token is read once, so the cost is linear in the length of
+the declaration, even for deeply nested templates.
+"""
+
+import re
+
+from typing import List, Tuple
+
+token_re = re.compile(r'[\s\\]*(\.\.\.|&&|::|[A-Za-z_]\w*|\d[\w.\']*|[^\s\\])')
+"""Regex of a C++ token (identifier, number, ``::``, ``&&``, ``...`` or a
+single character). Backslashes (reStructuredText escapes) are skipped."""
+
+cv_qualifiers = frozenset(('const', 'volatile'))
+builtin_types = frozenset((
+    'auto', 'bool', 'char', 'char8_t', 'char16_t', 'char32_t', 'double',
+    'float', 'int', 'long', 'short', 'signed', 'unsigned', 'void', 'wchar_t',
+))
+ignored_specifiers = frozenset((
+    'class', 'constexpr', 'enum', 'explicit', 'extern', 'friend', 'inline',
+    'mutable', 'register', 'static', 'struct', 'typename', 'union', 'virtual',
+))
+function_qualifiers = frozenset(('const', 'volatile', 'noexcept', 'throw',
+                                 '&', '&&'))
+
+
+def tokenize_declaration(declaration: str) -> List[str]:
+    r"""Split a C++ declaration into tokens.
+
+    Examples
+    --------
+    >>> tokenize_declaration(r'const std::vector<int>\* & x')
+    ['const', 'std', '::', 'vector', '<', 'int', '>', '*', '&', 'x']
+    """
+    return token_re.findall(declaration)
+
+
+class DeclarationParser:
+    """Recursive descent parser building canonical keys of C++ types.
+
+    Attributes
+    ----------
+    tokens: List[str]
+        Tokens of the declaration.
+    pos: int
+        Index of the next token to read.
+    """
+
+    def __init__(self, declaration: str):
+        """
+        Parameters
+        ----------
+        declaration: str
+            Declaration to parse.
+        """
+        self.tokens = tokenize_declaration(declaration)
+        self.pos = 0
+
+    def peek(self, offset: int = 0) -> str:
+        """Get a token without consuming it (``''`` at the end)."""
+        pos = self.pos + offset
+        return self.tokens[pos] if pos < len(self.tokens) else ''
+
+    def next(self) -> str:
+        """Consume a token."""
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def skip_until(self, stops: Tuple[str, ...]) -> str:
+        """Consume tokens until one of ``stops`` at bracket depth 0, and
+        return the consumed tokens joined without spaces."""
+        depth = 0
+        consumed: List[str] = []
+        while self.peek():
+            token = self.peek()
+            if depth == 0 and token in stops:
+                break
+            if token in ('(', '[', '{'):
+                depth += 1
+            elif token in (')', ']', '}'):
+                if depth == 0:
+                    break
+                depth -= 1
+            consumed.append(self.next())
+        return ''.join(consumed)
+
+    def qualified_name(self) -> str:
+        """Read a possibly qualified and templated name (e.g.
+        ``::std::map<int, T>::iterator``)."""
+        parts: List[str] = []
+        if self.peek() == '::':
+            parts.append(self.next())
+        while True:
+            parts.append(self.next())
+            if self.peek() == '<':
+                parts.append(self.template_args())
+            if self.peek() == '::' and re.match(r'[A-Za-z_~]', self.peek(1)):
+                parts.append(self.next())
+                continue
+            return ''.join(parts)
+
+    def template_args(self) -> str:
+        """Read a template argument list, including its brackets."""
+        self.next()  # '<'
+        args: List[str] = []
+        # an unmatched closing bracket ends the list (e.g. "(a<b)")
+        while self.peek() and self.peek() not in ('>', ')', ']', '}'):
+            start = self.pos
+            if re.match(r'[A-Za-z_:]', self.peek()):
+                args.append(self.type_key(stops=(',', '>')))
+            else:  # non-type template argument
+                args.append('')
+            if self.peek() not in (',', '>', ''):  # expression
+                args[-1] += self.skip_until((',', '>'))
+            if self.peek() == ',':
+                self.next()
+            elif self.pos == start:  # no progress on malformed input
+                self.next()
+        if self.peek() == '>':
+            self.next()
+        return '<' + ','.join(args) + '>'
+
+    def is_pointer_to_member(self) -> bool:
+        """Check if the next tokens are ``Class::*``."""
+        pos = self.pos
+        try:
+            if self.peek() == '::':
+                self.next()
+            while re.match(r'[A-Za-z_]', self.peek()):
+                self.next()
+                if self.peek() == '<':
+                    self.template_args()
+                if self.peek() != '::':
+                    return False
+                self.next()
+                if self.peek() == '*':
+                    return True
+            return False
+        finally:
+            self.pos = pos
+
+    def specifiers(self) -> str:
+        """Read the declaration specifiers (cv-qualifiers and type name)."""
+        cv: List[str] = []
+        words: List[str] = []
+        name = ''
+        while True:
+            token = self.peek()
+            if token in cv_qualifiers:
+                cv.append(self.next())
+            elif token in ignored_specifiers:
+                self.next()
+            elif token in builtin_types and not name:
+                words.append(self.next())
+            elif (re.match(r'[A-Za-z_]', token) or token == '::') and not (name or words):
+                name = self.qualified_name()
+            else:
+                break
+        return ' '.join(sorted(set(cv)) + sorted(words) + ([name] if name else []))
+
+    def declarator(self, stops: Tuple[str, ...]) -> str:
+        """Read a (possibly abstract) declarator and drop its name."""
+        operators: List[str] = []
+        while True:
+            token = self.peek()
+            if token in ('*', '&', '&&'):
+                operators.append(self.next())
+            elif token in cv_qualifiers and operators:
+                qualifiers = [self.next()]
+                while self.peek() in cv_qualifiers:
+                    qualifiers.append(self.next())
+                operators[-1] += ' '.join(sorted(set(qualifiers)))
+            elif (re.match(r'[A-Za-z_]', token) or token == '::') and \
+                    self.is_pointer_to_member():
+                member = self.qualified_name()
+                self.next()  # '::'
+                self.next()  # '*'
+                operators.append(member + '::*')
+            else:
+                break
+        key = ''.join(operators)
+
+        # nested declarator, e.g. (*callback), (&a) or (Class::*member)
+        if self.peek() == '(':
+            self.pos += 1
+            nested = (self.peek() in ('*', '&', '&&', '^') or
+                      self.is_pointer_to_member())
+            self.pos -= 1
+        else:
+            nested = False
+        if nested:
+            self.next()  # '('
+            key += '(' + self.declarator(stops=(')',)) + ')'
+            self.next()  # ')'
+        # declarator name
+        elif re.match(r'[A-Za-z_]', self.peek()) and self.peek() not in cv_qualifiers:
+            self.qualified_name()
+
+        # suffixes: arrays and function parameters
+        while self.peek() and self.peek() not in stops:
+            token = self.peek()
+            if token == '[':
+                self.next()
+                key += '[' + self.skip_until((']',)) + ']'
+                self.next()  # ']'
+            elif token == '(':
+                key += '(' + ','.join(self.parameter_list()) + ')'
+                qualifiers: List[str] = []
+                while self.peek() in function_qualifiers:
+                    qualifier = self.next()
+                    if qualifier in ('noexcept', 'throw'):
+                        # exception specification is not part of the type
+                        if self.peek() == '(':
+                            self.next()
+                            self.skip_until(())
+                            self.next()
+                    else:
+                        qualifiers.append(qualifier)
+                key += ''.join(sorted(set(qualifiers)))
+            elif re.match(r'[A-Za-z_]', token):  # name after an abstract declarator
+                self.qualified_name()
+            else:
+                break
+        return key
+
+    def type_key(self, stops: Tuple[str, ...] = (',', ')')) -> str:
+        """Read a parameter declaration and return its canonical key.
+
+        A default value (after ``=``) is skipped.
+        """
+        if self.peek() == '...':
+            self.next()
+            return '...'
+        key = self.specifiers()
+        declarator = self.declarator(stops + ('=',))
+        if key and re.match(r'[\w:]', declarator):  # e.g. pointer to member
+            key += ' '
+        key += declarator
+        if self.peek() == '=':
+            self.skip_until(stops)
+        return key or 'void'
+
+    def parameter_list(self) -> List[str]:
+        """Read a parenthesized parameter list and return the keys of its
+        parameters (an empty list for ``()`` and ``(void)``)."""
+        self.next()  # '('
+        keys: List[str] = []
+        while self.peek() and self.peek() != ')':
+            start = self.pos
+            keys.append(self.type_key())
+            if self.peek() not in (',', ')', ''):  # unexpected tokens
+                keys[-1] += self.skip_until((',',))
+            if self.peek() == ',':
+                self.next()
+            elif self.pos == start:  # unmatched ']' or '}', skipped
+                keys.pop()
+                self.next()
+        self.next()  # ')'
+        return [] if keys == ['void'] else keys
+
+
+def canonical_type(declaration: str) -> str:
+    r"""Get the canonical key of the type of a parameter declaration.
+
+    Parameters
+    ----------
+    declaration: str
+        Declaration of one parameter, with or without argument name and
+        default value. reStructuredText escapes are removed.
+
+    Return
+    ------
+    str
+        Canonical key of the type.
+
+    Examples
+    --------
+    >>> canonical_type('const int a = 0')
+    'const int'
+    >>> canonical_type('int const')
+    'const int'
+    >>> canonical_type(r'double \* const a')
+    'double*const'
+    >>> canonical_type('int (&a)[3]')
+    'int(&)[3]'
+    >>> canonical_type('int(*callback)(double)')
+    'int(*)(double)'
+    >>> canonical_type('int example::Example::* member')
+    'int example::Example::*'
+    >>> canonical_type('const std::map<std::string, std::vector<int>> & m')
+    'const std::map<std::string,std::vector<int>>&'
+    >>> canonical_type('')
+    'void'
+    """
+    return DeclarationParser(declaration).type_key(stops=())
+
+
+def canonical_args(args: str) -> List[str]:
+    r"""Get the canonical keys of the parameters of a function.
+
+    Parameters
+    ----------
+    args: str
+        Parameters of the prototype / declaration enclosed in parentheses.
+        Qualifiers after the closing parenthesis are ignored.
+
+    Return
+    ------
+    List[str]
+        Canonical key of each parameter. ``()`` and ``(void)`` give an empty
+        list.
+
+    Examples
+    --------
+    >>> canonical_args(r'(std::map<int, char> m, int(\*)(double, char) f)')
+    ['std::map<int,char>', 'int(*)(double,char)']
+    >>> canonical_args('(void)')
+    []
+
+    Malformed declarations (e.g. typos in an entry) give keys matching no
+    overload, but are always read to the end:
+
+    >>> canonical_args('(std::vector<int)')
+    ['std::vector<int>']
+    >>> canonical_args('(int])')
+    ['int']
+    >>> canonical_args('(a<b)')
+    ['a<b>']
+    >>> canonical_args('(operator<)')
+    ['operator<>']
+    >>> canonical_args('(std::enable_if_t<N<3, int> x)')
+    ['std::enable_if_t<N<3,int>>']
+    >>> canonical_args('(std::map<int,')
+    ['std::map<int>']
+    """
+    parser = DeclarationParser(args)
+    if parser.peek() != '(':
+        return [parser.type_key(stops=())]
+    return parser.parameter_list()
@@ -6,12 +6,9 @@ Created on Fri Jun 24 14:42:36 2022
 @author: quocdang
 """
 
-import os
-import platform
-import re
 import shlex
 
-from typing import Any, Dict, List, Tuple
+from typing import Any, List, Tuple, Union
 
 from docutils import nodes
 from docutils.parsers.rst import directives
@@ -21,11 +18,17 @@ from docutils.statemachine import StringList
 from sphinx import addnodes
 from sphinx.ext.autodoc.directive import DocumenterBridge, Options
 from sphinx.ext.autosummary import autosummary_table
+from sphinx.application import Sphinx
+from sphinx.environment import BuildEnvironment
 from sphinx.util.docutils import SphinxDirective, switch_source_input
+from sphinx.util.nodes import make_refnode
 from sphinx.util.typing import OptionSpec
 
-from sphinx_doxysummary.xmltree import xml_tree, DoxygenItem
-from sphinx_doxysummary.utils import split_name, fullname_to_filename, unescape_rst
+from sphinx_doxysummary.generate import (DoxySummaryEntry, document_refids,
+                                         item_re, parse_doxysummary,
+                                         preflight_entries)
+from sphinx_doxysummary.store import get_store
+from sphinx_doxysummary.utils import split_name
 
 class DoxySummary(SphinxDirective):
     """
@@ -42,90 +45,96 @@ class DoxySummary(SphinxDirective):
         'toctree': directives.unchanged,  # where to generate files
         'template': directives.unchanged_required,  # name of template
         'scope': directives.unchanged,  # scoped item (namespace, class, enum)
+        'using': directives.unchanged,  # namespaces visible to the items
+        'project': directives.unchanged,  # Doxygen project of the items
     }
 
+    def get_entries(self) -> List[DoxySummaryEntry]:
+        """
+        Get the resolved entries of the directive.
+
+        Entries resolved at the beginning of the build by
+        :func:`sphinx_doxysummary.generate.process_generate_files` are looked
+        up in the side-store of the build environment (see
+        :func:`sphinx_doxysummary.store.get_store`). The content is parsed and resolved
+        again only if the directive was not found there (e.g. its file is not
+        in ``doxysummary_generate``).
+
+        Return
+        ------
+        List[DoxySummaryEntry]
+            Resolved entries of the directive.
+        """
+        docname = self.env.docname
+        table = get_store(self.env).get('entries')
+        entries = table.get(docname, {}).get(self.lineno)
+        if entries is not None:
+            sources = [x.strip() for x in self.content if item_re.match(x.strip())]
+            if sources == [entry.source for entry in entries]:
+                # entries skipped by the preflight are not resolved
+                return [entry for entry in entries if entry.resolved_name is not None]
+
+        # fall back to reading the content
+        entries = parse_doxysummary(self.content, self.options,
+                                    str(self.env.doc2path(docname)), docname,
+                                    self.lineno, self.config, self.content_offset + 1)
+        return preflight_entries(entries, self.config.doxysummary_preflight)
+
+    def make_direct_link(self, entry: DoxySummaryEntry) -> Node:
+        """
+        Create a reference to the generated file of an entry.
+
+        The reference points to the anchor of the Doxygen reference ID (created
+        by Breathe) in the generated file. It is resolved by
+        :func:`process_direct_link` without searching the C++ domain.
+
+        Parameters
+        ----------
+        entry: DoxySummaryEntry
+            Resolved entry.
+
+        Return
+        ------
+        docutils.nodes.Node
+            Pending cross-reference node.
+        """
+        displayname = entry.displayname
+        refnode = addnodes.pending_xref('', refdomain='', reftype='doxysummary',
+                                        reftarget=entry.docname,
+                                        refanchor=entry.refid,
+                                        refexplicit=True,
+                                        refdoc=self.env.docname)
+        refnode += nodes.literal(displayname, displayname,
+                                 classes=['xref', 'cpp', 'doxysummary'])
+        return refnode
+
     def run(self) -> List[Node]:
         """
         Method called after Sphinx has read the directive ``doxysummary``.
 
-        It retrieves the full name of each entry, creates a summary table with
-        alias and brief description from Doxygen created XML files, and builds
-        a hidden toctree linking to the generated files at the beginning of
+        It retrieves the resolved entries, creates a summary table with alias
+        and brief description from Doxygen created XML files, and builds a
+        hidden toctree linking to the generated files at the beginning of
         Sphinx build process.
 
         Raises
         ------
         ValueError
-            When a line having more than 1 alias.
+            When an item cannot be found in its scope nor in any enclosing or
+            ``using`` namespace, or when no overload matches the arguments.
 
         Return
         ------
         List[docutils.nodes.Node]
             List of docutils nodes to be added to the document.
-
-        Notes
-        -----
-        The ``name`` variable in the method ``run`` represents the full scoped
-        name without return type and with arguments.
         """
         # create documenter bridge
         self.bridge = DocumenterBridge(self.env, self.state.document.reporter,
                                        Options(), self.lineno, self.state)
 
-        # get input by lines
-        names: List[str] = []
-        displaynames: List[str] = []  # name to be displayed to the table
-        item_regex = r'^(~?[_a-zA-Z][^#"]*)\s*.*?'
-        alias_regex = r'".+"'
-        for x in self.content:
-            # if not empty line
-            if x.strip() and re.search(r'^[~a-zA-Z_]', x.strip()[0]):
-                name = unescape_rst(re.search(item_regex, x).group(1).strip())
-
-                # check if name starts with a ~
-                ignore_parent: bool = False
-                if name[0] == '~':
-                    ignore_parent = True
-                    name = name[1:]  # remove tilde
-
-                # retrieve the fullname
-                if 'scope' in self.options:
-                    splitted = split_name(name)[1:]
-                    splitted[0] = '::'.join([self.options['scope'].strip(), splitted[0]])
-                    name = ''.join(splitted)
-                # delete return type
-                name = ''.join(split_name(name)[1:])
-                names.append(name)
-
-                # append displayname if alias detected -> overwrite effect of ~
-                m = re.search(alias_regex, x.strip())
-                if m:
-                    ignore_parent = False
-                    alias = m.group(0).strip('"')
-                    displaynames.append(alias)
-                # if alias not detected, display in-scope name
-                elif ignore_parent:
-                    displaynames.append(name.split("::")[-1])  # attention !
-                else:
-                    displaynames.append(name)
-
-        # get summary
-        descs: Dict[str, str] = {}
-        restype: Dict[str, str] = {}
-        for name in names:
-            items_list: List[DoxygenItem] = xml_tree[split_name(name)[1]]
-            func_args = split_name(name)[-1]
-            if func_args:  # if name is a function with arguments
-                for item in items_list:  # loop over functions with the same name
-                    if item.check_args(func_args):  # found a matched definition
-                        descs[name] = item.summary
-                        restype[name] = item.return_type
-                        break
-                if name not in descs.keys():
-                    raise ValueError('Function not found, '
-                                     'please enter the correct C++ declaration/prototype.')
-            else:
-                descs[name] = xml_tree[name][0].summary
+        entries = self.get_entries()
+        document_refids(self.env).setdefault(self.env.docname, set()).update(
+            entry.refid for entry in entries)
 
         # initialize table to be returned
         table_spec = addnodes.tabular_col_spec()
@@ -141,10 +150,13 @@ class DoxySummary(SphinxDirective):
         body = nodes.tbody('')
         group.append(body)
 
-        def append_row(*column_texts: str) -> None:
+        def append_row(*column_texts: Union[str, Node]) -> None:
             row = nodes.row('')
             source, line = self.state_machine.get_source_and_line()
             for text in column_texts:
+                if isinstance(text, Node):  # node already built
+                    row.append(nodes.entry('', nodes.paragraph('', '', text)))
+                    continue
                 node = nodes.paragraph('')
                 vl = StringList()
                 vl.append(text, '%s:%d:<autosummary>' % (source, line))
@@ -159,47 +171,81 @@ class DoxySummary(SphinxDirective):
             body.append(row)
 
         # add each line to table with description
-        for name, displayname in zip(names, displaynames):
-            _, item_name, func_args = split_name(name)
-            kind = xml_tree[item_name][0].kind
+        for entry in entries:
+            if self.config.doxysummary_direct_links:
+                append_row(self.make_direct_link(entry), entry.summary)
+                continue
+            name = entry.fullname
             qualifier = 'cpp:any'
             linkname = name
             # "define" macros is not included in role cpp:any
-            if kind == 'define':
+            if entry.kind == 'define':
                 qualifier = 'c:macro'
-            elif kind == 'function':
+            elif entry.kind == 'function':
                 qualifier = 'cpp:func'
-                if func_args:
-                    linkname = restype[name] + ' ' + name
-            # get description (summary)
-            desc = descs[name]
+                if split_name(name)[-1]:
+                    linkname = entry.return_type + ' ' + name
             # if name are template -> add backslash before '<' and '>'
-            displayname = displayname.replace('<', r'\<').replace('>', r'\>')
+            displayname = entry.displayname.replace('<', r'\<').replace('>', r'\>')
             col1 = ':%s:`%s <%s>`' % (qualifier, displayname, linkname)
-            append_row(col1, desc)
-
-        # add a hidden toctree and create files
-        dirname = os.path.dirname(self.env.docname)
-        if 'toctree' in self.options:
-            tree_prefix = self.options['toctree'].strip()
-        else:
-            tree_prefix = ''
-
-        docnames: List[str] = []  # list of entries of hidden toctree
-        for name in names:
-            file_name = fullname_to_filename(name, '')
-            docname = os.path.join(tree_prefix, file_name)
-            docname = os.path.normpath(os.path.join(dirname, docname))
-            if platform.system() == "Windows":
-                docname = docname.replace('\\', '/')
-            docnames.append(docname)
-
-        if docnames:
-            tocnode = addnodes.toctree()
-            tocnode['includefiles'] = docnames
-            tocnode['entries'] = [(None, docn) for docn in docnames]
-            tocnode['hidden'] = True
-            tocnode['glob'] = None
-            tocnode['maxdepth'] = -1
+            append_row(col1, entry.summary)
+
+        # add a hidden toctree linking to the generated files
+        docnames: List[str] = [entry.docname for entry in entries]
+        tocnode = addnodes.toctree()
+        tocnode['includefiles'] = docnames
+        tocnode['entries'] = [(None, docn) for docn in docnames]
+        tocnode['hidden'] = True
+        tocnode['glob'] = None
+        tocnode['maxdepth'] = -1
 
         return [table_spec, table, tocnode]
+
+
+class DoxySummaryTarget(SphinxDirective):
+    """
+    Class represents the directive ``doxysummary-target``, an anchor named after
+    a Doxygen refid (the target of ``doxysummary_direct_links``) in the
+    documents rendered without Breathe.
+    """
+
+    required_arguments = 1
+    optional_arguments = 0
+    has_content = False
+
+    def run(self) -> List[Node]:
+        targetnode = nodes.target('', '', ids=[self.arguments[0]])
+        self.set_source_info(targetnode)
+        self.state.document.note_explicit_target(targetnode)
+        return [targetnode]
+
+
+def process_direct_link(app: Sphinx, env: BuildEnvironment,
+                        node: addnodes.pending_xref,
+                        contnode: nodes.TextElement) -> Node:
+    """
+    Resolve references created with the config ``doxysummary_direct_links``.
+
+    This function is connected to the event ``missing-reference``.
+
+    Parameters
+    ----------
+    app: Sphinx
+        Sphinx application.
+    env: BuildEnvironment
+        Sphinx build environment.
+    node: sphinx.addnodes.pending_xref
+        Cross-reference to resolve.
+    contnode: docutils.nodes.TextElement
+        Content of the reference.
+
+    Return
+    ------
+    docutils.nodes.Node
+        Reference to the generated file, or ``None`` if the reference was not
+        created by doxysummary or its generated file does not exist.
+    """
+    if node['reftype'] != 'doxysummary' or node['reftarget'] not in env.all_docs:
+        return None
+    return make_refnode(app.builder, node['refdoc'], node['reftarget'],
+                        node.get('refanchor'), contnode)
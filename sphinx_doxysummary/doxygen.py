@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Run Doxygen from the Sphinx build, only when its input changed.
+
+With the config variable ``doxysummary_doxyfile``, Doxygen is run on each
+listed Doxyfile when the build starts, before the XML files are read. The
+Doxyfile, the files it includes and the source files it lists (``INPUT``,
+``FILE_PATTERNS``, ``RECURSIVE``, ``EXCLUDE`` and ``EXCLUDE_PATTERNS``) are
+hashed, and the digest is saved in a stamp file in the XML output directory::
+
+    xml/
+        doxysummary_doxygen.stamp    # digest of the input, digests of the xml files
+        index.xml
+        ...
+
+At the next build, Doxygen is not run if the digest of its input is the same
+and ``index.xml`` exists. Otherwise, the xml files are hashed after the run,
+and their digests are compared with the ones of the stamp file to report the
+compound files which changed. With ``doxysummary_incremental``, the digests are
+reused by :class:`sphinx_doxysummary.incremental.ProjectCache`, so that only
+the changed compound files are parsed again, without reading the others twice.
+"""
+
+import fnmatch
+import hashlib
+import os
+import pickle
+import re
+import shlex
+import subprocess
+
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from sphinx.application import Sphinx
+from sphinx.util import logging
+
+from sphinx_doxysummary.utils import build_mode, doxygen_projects
+from sphinx_doxysummary.xmltree import compound_files
+
+logger = logging.getLogger(__name__)
+
+stamp_version = 1
+"""Version of the format of the stamp file."""
+
+stamp_filename = 'doxysummary_doxygen.stamp'
+"""Name of the stamp file in the XML output directory."""
+
+default_file_patterns = [
+    '*.c', '*.cc', '*.cxx', '*.cpp', '*.c++', '*.java', '*.ii', '*.ixx',
+    '*.ipp', '*.i++', '*.inl', '*.idl', '*.ddl', '*.odl', '*.h', '*.hh',
+    '*.hxx', '*.hpp', '*.h++', '*.l', '*.cs', '*.d', '*.php', '*.php4',
+    '*.php5', '*.phtml', '*.inc', '*.m', '*.markdown', '*.md', '*.mm',
+    '*.dox', '*.py', '*.pyw', '*.f90', '*.f95', '*.f03', '*.f08', '*.f18',
+    '*.f', '*.for', '*.vhd', '*.vhdl', '*.ucf', '*.qsf', '*.ice',
+]
+"""Default value of the Doxygen tag ``FILE_PATTERNS``."""
+
+
+def read_doxyfile(fname: str) -> Tuple[Dict[str, List[str]], List[str]]:
+    """
+    Read the tags of a Doxyfile.
+
+    Lines continued by a backslash, values appended with ``+=``, quoted values,
+    environment variables ``$(VAR)`` and ``@INCLUDE`` are supported.
+
+    Parameters
+    ----------
+    fname : str
+        Path of the Doxyfile.
+
+    Return
+    ------
+    Tuple[Dict[str, List[str]], List[str]]
+        Map of tag -> values, and paths of the files read (the Doxyfile and
+        the files it includes).
+    """
+    tags: Dict[str, List[str]] = {}
+    read_files = []
+
+    def read(path: str) -> None:
+        read_files.append(path)
+        with open(path, encoding='utf-8', errors='replace') as f:
+            text = f.read().replace('\\\n', ' ')
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            match = re.match(r'(@?[A-Za-z_0-9]+)\s*(\+?=)\s*(.*)$', line)
+            if match is None:
+                continue
+            tag, operator, value = match.groups()
+            value = re.sub(r'\$\((\w+)\)', lambda m: os.environ.get(m.group(1), ''), value)
+            try:
+                values = shlex.split(value, comments=False, posix=True)
+            except ValueError:  # unbalanced quotes
+                values = value.split()
+            if tag == '@INCLUDE':
+                for include in values:
+                    include_dirs = tags.get('@INCLUDE_PATH', []) + [os.path.dirname(path)]
+                    for include_dir in include_dirs:
+                        include_path = os.path.join(include_dir, include)
+                        if os.path.isfile(include_path):
+                            read(include_path)
+                            break
+                continue
+            if operator == '+=':
+                tags.setdefault(tag, []).extend(values)
+            else:
+                tags[tag] = values
+
+    read(os.path.abspath(fname))
+    return tags, read_files
+
+
+def tag_enabled(tags: Dict[str, List[str]], tag: str) -> bool:
+    """Check if a boolean tag of a Doxyfile is ``YES``."""
+    return [value.upper() for value in tags.get(tag, [])] == ['YES']
+
+
+def parents(path: str, root: str) -> List[str]:
+    """Get the directories between a file and the root directory of its
+    search."""
+    directories = []
+    path = os.path.dirname(path)
+    while len(path) > len(root):
+        directories.append(path)
+        path = os.path.dirname(path)
+    return directories
+
+
+def input_files(tags: Dict[str, List[str]], basedir: str) -> List[str]:
+    """
+    List the source files read by Doxygen.
+
+    Parameters
+    ----------
+    tags : Dict[str, List[str]]
+        Tags of the Doxyfile (see :func:`read_doxyfile`).
+    basedir : str
+        Directory in which Doxygen is run.
+
+    Return
+    ------
+    List[str]
+        Paths of the source files, sorted.
+    """
+    patterns = tags.get('FILE_PATTERNS') or default_file_patterns
+    exclude = {os.path.abspath(os.path.join(basedir, path))
+               for path in tags.get('EXCLUDE', [])}
+    exclude_patterns = tags.get('EXCLUDE_PATTERNS', [])
+    recursive = tag_enabled(tags, 'RECURSIVE')
+
+    def is_excluded(path: str) -> bool:
+        return (path in exclude
+                or any(fnmatch.fnmatch(path, pattern) for pattern in exclude_patterns))
+
+    files = set()
+    for location in tags.get('INPUT') or ['.']:
+        location = os.path.abspath(os.path.join(basedir, location))
+        if os.path.isfile(location):
+            files.add(location)
+            continue
+        if not os.path.isdir(location) or is_excluded(location):
+            continue
+        candidates = Path(location).rglob('*') if recursive else Path(location).glob('*')
+        for path in candidates:
+            path = str(path)
+            if (os.path.isfile(path) and not is_excluded(path)
+                    and any(fnmatch.fnmatch(os.path.basename(path), pattern)
+                            for pattern in patterns)
+                    and not any(is_excluded(parent) for parent in parents(path, location))):
+                files.add(path)
+    return sorted(files)
+
+
+def xml_output(tags: Dict[str, List[str]], basedir: str) -> str:
+    """Get the absolute path of the XML output directory of a Doxyfile."""
+    output_dir = os.path.join(basedir, ' '.join(tags.get('OUTPUT_DIRECTORY', [])))
+    xml_dir = ' '.join(tags.get('XML_OUTPUT', [])) or 'xml'
+    return os.path.abspath(os.path.join(output_dir, xml_dir))
+
+
+def input_digest(doxygen: str, read_files: List[str], sources: List[str]) -> str:
+    """
+    Get the digest of the input of a Doxygen run.
+
+    Parameters
+    ----------
+    doxygen : str
+        Doxygen command.
+    read_files : List[str]
+        Doxyfile and files it includes.
+    sources : List[str]
+        Source files read by Doxygen.
+
+    Return
+    ------
+    str
+        SHA-1 digest of the command, and of the paths and contents of the
+        files.
+    """
+    digest = hashlib.sha1(doxygen.encode('utf-8'))
+    for fname in read_files + sources:
+        digest.update(b'\0' + fname.encode('utf-8') + b'\0')
+        with open(fname, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def xml_digests(xmldir: str) -> Dict[str, str]:
+    """Get the SHA-1 digests of the xml files of a Doxygen project, including
+    ``index.xml``."""
+    digests = {}
+    for fname in compound_files(xmldir) + [os.path.join(xmldir, 'index.xml')]:
+        with open(fname, 'rb') as f:
+            digests[fname] = hashlib.sha1(f.read()).hexdigest()
+    return digests
+
+
+def load_stamp(xmldir: str) -> Tuple[str, Dict[str, str]]:
+    """Load the stamp file of an XML output directory (``(None, {})`` if it
+    does not exist or was written by another version)."""
+    try:
+        with open(os.path.join(xmldir, stamp_filename), 'rb') as f:
+            version, digest, digests = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        return None, {}
+    if version != stamp_version:
+        return None, {}
+    return digest, digests
+
+
+def save_stamp(xmldir: str, digest: str, digests: Dict[str, str]) -> None:
+    """Save the stamp file of an XML output directory."""
+    with open(os.path.join(xmldir, stamp_filename), 'wb') as f:
+        pickle.dump((stamp_version, digest, digests), f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def run_doxygen(doxyfile: str, doxygen: str = 'doxygen') -> Tuple[str, Dict[str, str]]:
+    """
+    Run Doxygen on a Doxyfile if its input changed since the last run.
+
+    Parameters
+    ----------
+    doxyfile : str
+        Path of the Doxyfile. Doxygen is run in its directory.
+    doxygen : str, optional
+        Doxygen command, split as a shell command line.
+
+    Return
+    ------
+    Tuple[str, Dict[str, str]]
+        XML output directory, and digests of its xml files if Doxygen was run
+        (``None`` if it was not run).
+
+    Raises
+    ------
+    ValueError
+        If Doxygen cannot be run or fails.
+    """
+    doxyfile = os.path.abspath(doxyfile)
+    basedir = os.path.dirname(doxyfile)
+    tags, read_files = read_doxyfile(doxyfile)
+    xmldir = xml_output(tags, basedir)
+    digest = input_digest(doxygen, read_files, input_files(tags, basedir))
+    old_digest, old_digests = load_stamp(xmldir)
+    if digest == old_digest and os.path.isfile(os.path.join(xmldir, 'index.xml')):
+        logger.info('[doxysummary] Doxygen input of %s unchanged, Doxygen not run',
+                    doxyfile)
+        return xmldir, None
+
+    logger.info('[doxysummary] running Doxygen on %s', doxyfile)
+    try:
+        result = subprocess.run(shlex.split(doxygen) + [doxyfile], cwd=basedir,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                universal_newlines=True)
+    except OSError as err:
+        raise ValueError(f'Cannot run Doxygen command "{doxygen}": {err}') from err
+    if result.stderr:
+        logger.verbose(result.stderr)
+    if result.returncode != 0:
+        raise ValueError(f'Doxygen failed on {doxyfile} (exit code '
+                         f'{result.returncode}):\n{result.stderr}')
+
+    digests = xml_digests(xmldir)
+    changed = [fname for fname in digests.keys() | old_digests.keys()
+               if digests.get(fname) != old_digests.get(fname)]
+    logger.info('[doxysummary] Doxygen run on %s: %d of %d xml files changed',
+                doxyfile, len(changed), len(digests))
+    save_stamp(xmldir, digest, digests)
+    return xmldir, digests
+
+
+def process_run_doxygen(app: Sphinx) -> None:
+    """
+    Run Doxygen on the Doxyfiles of the config variable
+    ``doxysummary_doxyfile`` (relative to the configuration directory), before
+    the XML files are read (event ``builder-inited``).
+
+    The digests of the xml files written by Doxygen are stored in
+    ``app.doxysummary_xml_digests`` (map of XML directory -> path -> digest).
+    Sharded builds do not run Doxygen: it must be run before the shards are
+    built.
+
+    Parameters
+    ----------
+    app : Sphinx
+        Sphinx application.
+    """
+    app.doxysummary_xml_digests = {}
+    doxyfiles = app.config.doxysummary_doxyfile
+    if not doxyfiles or build_mode(app.config) in ('shard', 'merge'):
+        return
+    if isinstance(doxyfiles, str):
+        doxyfiles = [doxyfiles]
+
+    xmldirs = {xmldir for _, xmldir in doxygen_projects(app.config)}
+    for doxyfile in doxyfiles:
+        xmldir, digests = run_doxygen(os.path.join(app.confdir, doxyfile),
+                                      app.config.doxysummary_doxygen)
+        if xmldir not in xmldirs:
+            logger.warning('doxysummary: the XML output %s of %s is not listed '
+                           'in doxygen_xml', xmldir, doxyfile)
+        if digests is not None:
+            app.doxysummary_xml_digests[xmldir] = digests
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Differential fuzzing and benchmark of argument type matchers.
+
+Random C++ parameter types are generated as small trees and written in several
+equivalent ways (position of cv-qualifiers, spaces, argument names, default
+values, reStructuredText escapes). Each case pairs a spelling written by a
+user with the spelling of Doxygen, and knows whether the two types are equal:
+negative cases are obtained by mutating one node of the tree.
+
+Matchers (functions with the signature of
+:func:`sphinx_doxysummary.utils.compare_type`) are run on the same corpus:
+their answers are compared with the expected ones and with the answers of the
+reference matcher, and their throughput is measured.
+
+A share of the cases are malformed (truncated, or with an unbalanced bracket
+inserted or removed), as typos in the entries of a directive. Their answer is
+not checked, but matchers must neither raise nor hang on them: a case taking
+more than a time limit is reported as an error.
+
+Usage::
+
+    python -m sphinx_doxysummary fuzz --cases 5000 --seed 1
+"""
+
+import random
+import signal
+import threading
+import time
+
+from typing import Any, Callable, Dict, List, Tuple
+
+from sphinx_doxysummary.utils import compare_type, compare_type_heuristic
+
+Matcher = Callable[[str, str, str], bool]
+
+matchers: Dict[str, Matcher] = {
+    'heuristic': compare_type_heuristic,
+    'parser': compare_type,
+}
+"""Available matchers. ``heuristic`` is the reference."""
+
+builtins = ['int', 'double', 'char', 'bool', 'float', 'unsigned int', 'long',
+            'unsigned long long']
+class_names = ['Foo', 'std::string', 'example::Example', 'ns::inner::Bar']
+template_names = ['std::vector', 'std::map', 'std::shared_ptr', 'Tmpl']
+member_classes = ['Foo', 'example::Example']
+
+
+def value_type(rng: random.Random, depth: int) -> Tuple:
+    """Generate a random type which is not a reference (pointers, arrays and
+    pointers to member cannot point to references)."""
+    node = random_type(rng, depth)
+    return node[1] if node[0] in ('lref', 'rref') else node
+
+
+def random_type(rng: random.Random, depth: int = 0) -> Tuple:
+    """Generate a random type tree.
+
+    Nodes are tuples: ``('builtin', name, const, volatile)``, ``('class',
+    name, template args, const, volatile)``, ``('ptr', inner, const)``,
+    ``('lref', inner)``, ``('rref', inner)``, ``('array', inner, bound)``,
+    ``('func', return type, params)`` (only below a pointer) and ``('member',
+    inner, class)`` (pointer to member).
+    """
+    roll = rng.random() if depth < 3 else 0.0
+    if roll < 0.35:
+        return ('builtin', rng.choice(builtins), rng.random() < 0.3, rng.random() < 0.05)
+    if roll < 0.55:
+        if rng.random() < 0.5:
+            args = tuple(random_type(rng, depth + 2) for _ in range(rng.randint(1, 2)))
+            return ('class', rng.choice(template_names), args, rng.random() < 0.3, False)
+        return ('class', rng.choice(class_names), (), rng.random() < 0.3, False)
+    if roll < 0.75:
+        return ('ptr', value_type(rng, depth + 1), rng.random() < 0.2)
+    if roll < 0.85:
+        inner = random_type(rng, depth + 1)
+        if inner[0] in ('lref', 'rref'):  # no reference to reference
+            return inner
+        return (rng.choice(['lref', 'rref']), inner)
+    if roll < 0.9:
+        return ('array', value_type(rng, depth + 1), rng.randint(1, 9))
+    if roll < 0.95:
+        params = tuple(random_type(rng, depth + 2) for _ in range(rng.randint(0, 2)))
+        return ('ptr', ('func', random_type(rng, depth + 2), params), False)
+    return ('member', value_type(rng, depth + 2), rng.choice(member_classes))
+
+
+def mutate(node: Tuple, rng: random.Random) -> Tuple:
+    """Get a different type by changing one node of a type tree."""
+    kind = node[0]
+    children = {'ptr': [1], 'lref': [1], 'rref': [1], 'array': [1],
+                'member': [1], 'func': [1]}.get(kind, [])
+    if kind == 'class' and node[2]:
+        children = [2]
+    if children and rng.random() < 0.6:  # mutate below this node
+        i = children[0]
+        if kind == 'class':
+            args = list(node[2])
+            j = rng.randrange(len(args))
+            args[j] = mutate(args[j], rng)
+            return node[:2] + (tuple(args),) + node[3:]
+        return node[:i] + (mutate(node[i], rng),) + node[i + 1:]
+    if kind == 'builtin':
+        if rng.random() < 0.5:
+            return (kind, node[1], not node[2], node[3])
+        return (kind, rng.choice([b for b in builtins if b != node[1]]), node[2], node[3])
+    if kind == 'class':
+        return (kind, node[1], node[2], not node[3], node[4])
+    if kind == 'ptr':
+        return (kind, node[1], not node[2])
+    if kind == 'lref':
+        return ('rref', node[1])
+    if kind == 'rref':
+        return ('lref', node[1])
+    if kind == 'array':
+        return (kind, node[1], node[2] + 1)
+    if kind == 'func':
+        return (kind, node[1], node[2] + (('builtin', 'int', False, False),))
+    return (kind, node[1], rng.choice([c for c in member_classes if c != node[2]]))
+
+
+def spell(node: Tuple, rng: random.Random, declarator: str = '') -> str:
+    """Write a declaration of a type tree, with a randomly chosen style.
+
+    Parameters
+    ----------
+    node: Tuple
+        Type tree.
+    rng: random.Random
+        Random generator choosing the style.
+    declarator: str, optional
+        Declarator written so far (e.g. argument name).
+
+    Return
+    ------
+    str
+        Declaration.
+    """
+    def space() -> str:
+        return rng.choice(['', ' ', '  '])
+
+    def cv(const: bool, volatile: bool) -> List[str]:
+        qualifiers = [q for q, on in (('const', const), ('volatile', volatile)) if on]
+        rng.shuffle(qualifiers)
+        return qualifiers
+
+    kind = node[0]
+    if kind in ('builtin', 'class'):
+        if kind == 'class':
+            name = node[1]
+            if node[2]:
+                args = (',' + space()).join(spell(arg, rng) for arg in node[2])
+                name += '<' + space() + args + space() + '>'
+            qualifiers = cv(node[3], node[4])
+        else:
+            name, qualifiers = node[1], cv(node[2], node[3])
+        words = qualifiers + [name] if rng.random() < 0.5 else [name] + qualifiers
+        return ' '.join(words) + (' ' + declarator if declarator else '')
+    if kind in ('ptr', 'lref', 'rref', 'member'):
+        operator = {'ptr': '*', 'lref': '&', 'rref': '&&'}.get(kind)
+        if kind == 'member':
+            operator = node[2] + '::*'
+        if kind == 'ptr' and node[2]:
+            operator += ' const' + (' ' if declarator else '')
+        declarator = operator + space() + declarator
+        if node[1][0] in ('array', 'func'):
+            declarator = '(' + declarator + ')'
+        return spell(node[1], rng, declarator)
+    if kind == 'array':
+        return spell(node[1], rng, declarator + '[' + str(node[2]) + ']')
+    params = (',' + space()).join(spell(param, rng) for param in node[2])
+    return spell(node[1], rng, declarator + '(' + params + ')')
+
+
+def make_case(rng: random.Random) -> Tuple[str, str, str, bool]:
+    """Generate a case ``(arg1, arg2, arg2_declarator, expected)``.
+
+    ``arg1`` is the argument as a user writes it (maybe with name, default
+    value and reStructuredText escapes), ``arg2`` the type as Doxygen writes it
+    (without name) and ``arg2_declarator`` the declaration with its name.
+    """
+    node = random_type(rng)
+    expected = rng.random() < 0.5
+    user_node = node if expected else mutate(node, rng)
+    arg1 = spell(user_node, rng, rng.choice(['', '', 'x', 'value']))
+    if rng.random() < 0.2:
+        arg1 += ' = 0'
+    if rng.random() < 0.2:
+        arg1 = arg1.replace('*', r'\*')
+    arg2 = spell(node, rng)
+    arg2_declarator = spell(node, rng, 'arg')
+    return arg1, arg2, arg2_declarator, expected
+
+
+def malform(declaration: str, rng: random.Random) -> str:
+    """Truncate a declaration, or insert or remove a bracket in it."""
+    roll = rng.random()
+    if roll < 0.4 or not declaration:
+        return declaration[:rng.randrange(len(declaration) + 1)]
+    if roll < 0.8:
+        i = rng.randrange(len(declaration) + 1)
+        return declaration[:i] + rng.choice('()<>[]{},') + declaration[i:]
+    brackets = [i for i, c in enumerate(declaration) if c in '()<>[]{}']
+    if not brackets:
+        return declaration[:-1]
+    i = rng.choice(brackets)
+    return declaration[:i] + declaration[i + 1:]
+
+
+def make_malformed_case(rng: random.Random) -> Tuple[str, str, str, None]:
+    """Generate a case whose user argument is malformed (see :func:`malform`),
+    with expected answer ``None`` (not checked)."""
+    arg1, arg2, arg2_declarator, _ = make_case(rng)
+    if rng.random() < 0.5:
+        arg1 = '(' + arg1 + ', ' + arg2 + ')'
+    return malform(arg1, rng), arg2, arg2_declarator, None
+
+
+def make_corpus(count: int, seed: int = 0,
+                malformed: float = 0.1) -> List[Tuple[str, str, str, bool]]:
+    """Generate ``count`` cases with a given seed (see :func:`make_case`), a
+    share ``malformed`` of them being malformed (see
+    :func:`make_malformed_case`)."""
+    rng = random.Random(seed)
+    return [make_malformed_case(rng) if rng.random() < malformed else make_case(rng)
+            for _ in range(count)]
+
+
+def call_with_timeout(function: Callable[..., Any], args: Tuple, timeout: float) -> Any:
+    """Call a function, raising ``TimeoutError`` if it runs more than
+    ``timeout`` seconds (only checked in the main thread of POSIX systems)."""
+    if (not timeout or not hasattr(signal, 'setitimer')
+            or threading.current_thread() is not threading.main_thread()):
+        return function(*args)
+
+    def expire(signum, frame):
+        raise TimeoutError(f'no answer after {timeout} s')
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return function(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def run_matchers(corpus: List[Tuple[str, str, str, bool]],
+                 candidates: Dict[str, Matcher] = None,
+                 reference: str = 'heuristic',
+                 repeat: int = 3, timeout: float = 1.0) -> Dict[str, Dict[str, Any]]:
+    """Run matchers on a corpus.
+
+    Parameters
+    ----------
+    corpus: List[Tuple[str, str, str, bool]]
+        Cases generated by :func:`make_corpus`.
+    candidates: Dict[str, Matcher], optional
+        Matchers to run. Default is ``matchers``.
+    reference: str, optional
+        Name of the matcher to which the others are compared.
+    repeat: int, optional
+        Number of runs over the corpus, the fastest is kept.
+    timeout: float, optional
+        Time limit of a case in seconds, a case exceeding it is an error.
+
+    Return
+    ------
+    Dict[str, Dict[str, Any]]
+        Map of matcher name -> report with keys ``wrong`` (cases with an
+        unexpected answer), ``differ`` (cases answered differently from the
+        reference matcher), ``errors`` (cases raising an exception) and
+        ``rate`` (comparisons per second). Malformed cases are never wrong.
+        Cases raising an exception or exceeding the time limit are timed in
+        none of the runs.
+    """
+    candidates = candidates or matchers
+
+    def answer(matcher: Matcher, case: Tuple[str, str, str, bool]) -> Any:
+        try:
+            return call_with_timeout(matcher, case[:3], timeout)
+        except Exception as err:  # a crash is a finding, not a failure
+            return err
+
+    answers = {name: [answer(matcher, case) for case in corpus]
+               for name, matcher in candidates.items()}
+    reports = {}
+    for name, matcher in candidates.items():
+        results = answers[name]
+        timed = [case for case, result in zip(corpus, results)
+                 if not isinstance(result, Exception)]
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for case in timed:
+                matcher(*case[:3])
+            best = min(best, time.perf_counter() - start)
+        reports[name] = {
+            'wrong': [case for case, result in zip(corpus, results)
+                      if case[3] is not None and result is not case[3]
+                      and not isinstance(result, Exception)],
+            'differ': [case for case, result, ref in zip(corpus, results,
+                                                         answers.get(reference, results))
+                       if result != ref],
+            'errors': [(case, result) for case, result in zip(corpus, results)
+                       if isinstance(result, Exception)],
+            'rate': len(corpus) / best if best > 0 else float('inf'),
+        }
+    return reports
+
+
+def format_report(reports: Dict[str, Dict[str, Any]], corpus_size: int,
+                  reference: str = 'heuristic', show: int = 5) -> str:
+    """Format the reports of :func:`run_matchers` for the command line."""
+    lines = [f'{corpus_size} cases, reference matcher: {reference}', '']
+    lines.append(f'{"matcher":<12s}{"wrong":>8s}{"differ":>8s}{"errors":>8s}'
+                 f'{"comparisons/s":>16s}')
+    for name, report in reports.items():
+        lines.append(f'{name:<12s}{len(report["wrong"]):>8d}{len(report["differ"]):>8d}'
+                     f'{len(report["errors"]):>8d}{report["rate"]:>16,.0f}')
+    for name, report in reports.items():
+        for title, cases in (('wrong', report['wrong']), ('differ', report['differ'])):
+            if cases and show:
+                lines.append('')
+                lines.append(f'{name}: {title} (first {min(show, len(cases))})')
+                for arg1, arg2, declarator, expected in cases[:show]:
+                    lines.append(f'  {arg1!r} vs {arg2!r} ({declarator!r}), '
+                                 f'expected {expected}')
+    return '\n'.join(lines)
@@ -16,6 +16,8 @@ from jinja2.sandbox import SandboxedEnvironment
 
 from sphinx.application import Sphinx
 from sphinx.builders import Builder
+from sphinx.config import Config
+from sphinx.environment import CONFIG_OK, BuildEnvironment
 from sphinx.ext.autosummary.generate import _underline
 from sphinx.ext.autosummary import get_rst_suffix
 from sphinx.locale import __
@@ -23,14 +25,27 @@ from sphinx.util import logging, rst
 from sphinx.util.osutil import ensuredir
 from sphinx.util.template import SphinxTemplateLoader
 
-from sphinx_doxysummary.utils import split_name, fullname_to_filename, unescape_rst
-from sphinx_doxysummary.xmltree import xml_tree
+from sphinx_doxysummary.incremental import file_digest, file_fingerprint
+from sphinx_doxysummary.inventory import is_inventory
+from sphinx_doxysummary.store import get_store
+from sphinx_doxysummary.utils import (bound_filename, build_mode, doxygen_projects,
+                                      split_name, split_scope, split_using,
+                                      stub_docname, unescape_rst)
+from sphinx_doxysummary.xmltree import (DoxygenItem, compound_files, compound_refid,
+                                        project_items, resolve_name, symbol_index)
 
 logger = logging.getLogger(__name__)
 
+item_re = re.compile(r'^(~?[_a-zA-Z][^#"]*)\s*.*?')  # entry of the directive
+alias_re = re.compile(r'".+"')  # alias of the entry
+
 class DoxySummaryEntry:
     """Simple class representing an entry in \"doxysummary\" directive.
-    
+
+    Entries are resolved once per build (see :meth:`resolve`), so that the
+    Doxygen data bound to them can be shared between the generation of rst
+    files and the directive ``doxysummary``.
+
     Attributes
     ----------
     filename: str
@@ -45,15 +60,55 @@ class DoxySummaryEntry:
         removed. Only the function name and the arguments are retained.
     scope: str
         Scope of the name. The true name in Doxygen XML of the item is
-        "scope::name".
+        "scope::name", or the name in one of the enclosing scopes.
+    using: List[str]
+        Namespaces searched after the scope and its enclosing scopes.
     alias: str
         Alias of the entry. If there is an alias, the displayname and the title
         of the generated file are the alias.
+    ignore_parent: bool
+        Whether the entry is displayed without its scope (entry starting with
+        ``~``).
+    document: str
+        Docname of the document containing the entry.
+    lineno: int
+        Line number of the directive containing the entry.
+    offset: int
+        Number of lines from the directive to the entry.
+    source: str
+        Line of the directive content from which the entry is read.
+    refid: str
+        Reference ID of the matched Doxygen item (set by :meth:`resolve`).
+    kind: str
+        Kind of the matched Doxygen item (set by :meth:`resolve`).
+    summary: str
+        Brief description of the matched Doxygen item (set by :meth:`resolve`).
+    return_type: str
+        Return type of the matched function (set by :meth:`resolve`).
+    docname: str
+        Docname of the generated rst file (set by :meth:`resolve`).
+    project: str
+        Name of the Doxygen project in which the entry is looked up (``None``
+        for all projects).
+    layout: str
+        Layout of the generated rst files (see
+        :func:`sphinx_doxysummary.utils.stub_docname`).
+    max_length: int
+        Maximal length of the components of the generated file path.
+    group_overloads: bool
+        Whether the overloads of a function share one generated file.
+    split_members: int
+        Maximal number of members of a class or struct rendered in its
+        generated file (see :func:`member_pages`, 0 for no limit).
     """
 
     def __init__(self, filename: str, name: str,
                  template: str= 'cppbase.rst', toctree: str = '',
-                 scope: str = '', alias: str = None):
+                 scope: str = '', using: List[str] = None, alias: str = None,
+                 ignore_parent: bool = False, document: str = '',
+                 lineno: int = 0, offset: int = 0, source: str = '',
+                 project: str = None, layout: str = 'flat', max_length: int = 0,
+                 group_overloads: bool = False, split_members: int = 0):
         """
         Parameters
         ----------
@@ -69,36 +124,229 @@ class DoxySummaryEntry:
         scope: str, optional
             Current scope of the entry.
             The default is ''.
+        using: List[str], optional
+            Namespaces declared in the ``:using:`` option.
+            The default is ``None``.
         alias: str
             Alias of the entry.
             The default is ``None``.
+        ignore_parent: bool, optional
+            Display the entry without its scope.
+            The default is ``False``.
+        document: str, optional
+            Docname of the document containing the entry.
+            The default is ''.
+        lineno: int, optional
+            Line number of the directive.
+            The default is 0.
+        offset: int, optional
+            Number of lines from the directive to the entry.
+            The default is 0.
+        source: str, optional
+            Line of the directive content.
+            The default is ''.
+        project: str, optional
+            Name of the Doxygen project of the entry.
+            The default is ``None`` (all projects).
+        layout: str, optional
+            Layout of the generated rst files.
+            The default is ``'flat'``.
+        max_length: int, optional
+            Maximal length of the components of the generated file path.
+            The default is 0 (no limit).
+        group_overloads: bool, optional
+            Generate the entries of functions with arguments to the file of
+            their name, shared by all overloads.
+            The default is ``False``.
+        split_members: int, optional
+            Maximal number of members of a class rendered in its generated
+            file.
+            The default is 0 (no limit).
         """
         self.filename = filename
         self.toctree = toctree
         self.template = template
         self.name = name
         self.scope = scope
+        self.using = using or []
         self.alias = alias
+        self.ignore_parent = ignore_parent
+        self.document = document
+        self.lineno = lineno
+        self.offset = offset
+        self.source = source
+        self.project = project
+        self.layout = layout
+        self.max_length = max_length
+        self.group_overloads = group_overloads
+        self.split_members = split_members
+
+        # attributes bound by resolve()
+        self.resolved_name: str = None
+        self.refid: str = ''
+        self.kind: str = ''
+        self.summary: str = ''
+        self.return_type: str = ''
+        self.docname: str = ''
+
+    @property
+    def location(self) -> Tuple[str, int]:
+        """Document and line of the entry, to report warnings."""
+        return self.document, self.lineno + self.offset
 
     @property
     def fullname(self) -> str:
         """
         Get the fullname (scope + name) of the entry.
 
+        The name is resolved in the scope of the entry, then in its enclosing
+        scopes and in the ``using`` namespaces.
+
         Return
         ------
         str
             Fullname of the entry.
         """
+        if self.resolved_name is not None:
+            return self.resolved_name
         splitted_name = split_name(self.name)
-        if self.scope != '':
-            splitted_name[1] = '::'.join([self.scope, splitted_name[1]])
+        splitted_name[1] = resolve_name(splitted_name[1], self.scope, self.using,
+                                        self.project)
         return ''.join([name for name in splitted_name if name != ''])
 
+    @property
+    def displayname(self) -> str:
+        """Name displayed in the summary table."""
+        if self.alias:  # alias overwrites effect of ~
+            return self.alias
+        if self.ignore_parent:
+            _, item_name, func_args = split_name(self.fullname)
+            return split_scope(item_name)[-1] + func_args
+        return self.fullname
+
+    def resolve(self) -> None:
+        """Find the Doxygen item of the entry and bind its data to the entry.
+
+        Raises
+        ------
+        ValueError
+            When the item or the overload matching the arguments is not found.
+        """
+        fullname = self.fullname
+        _, item_name, func_args = split_name(fullname)
+        items_list: List[DoxygenItem] = project_items(item_name, self.project)
+        if func_args:  # if name is a function with arguments
+            for item in items_list:  # loop over functions with the same name
+                if item.check_args(func_args):  # found a matched definition
+                    break
+            else:
+                raise ValueError('Function not found, '
+                                 'please enter the correct C++ declaration/prototype.')
+            self.return_type = item.return_type
+        else:
+            item = items_list[0]
+        self.resolved_name = fullname
+        self.refid = item.refid
+        self.kind = item.kind
+        self.summary = item.summary
+
+        # docname of the generated file
+        stub_name = item_name if self.is_overload_group else fullname
+        docname = os.path.join(self.toctree, stub_docname(stub_name, self.layout,
+                                                          self.max_length))
+        docname = os.path.normpath(os.path.join(os.path.dirname(self.document),
+                                                docname))
+        self.docname = docname.replace(os.sep, '/')
+
+    @property
+    def is_overload_group(self) -> bool:
+        """Whether the entry is a function with arguments generated to the
+        file shared by the overloads of its name."""
+        return (self.group_overloads and self.kind == 'function'
+                and split_name(self.name)[2] != '')
+
     def __repr__(self):
         return f'Entry of name {self.fullname} template {self.template}'
 
 
+def parse_doxysummary(content: List[str], options: Dict[str, str],
+                      filename: str, document: str, lineno: int,
+                      config: Config = None,
+                      content_lineno: int = None) -> List[DoxySummaryEntry]:
+    """Read the entries of a ``doxysummary`` directive.
+
+    This is the only parser of the directive content, it is shared by
+    :func:`process_generate_files` and the directive itself.
+
+    Parameters
+    ----------
+    content: List[str]
+        Lines of the directive content.
+    options: Dict[str, str]
+        Options of the directive (``toctree``, ``template``, ``scope``,
+        ``using`` and ``project``).
+    filename: str
+        Name of the rst file containing the directive.
+    document: str
+        Docname of the rst file containing the directive.
+    lineno: int
+        Line number of the directive.
+    config: sphinx.config.Config, optional
+        Sphinx configuration, giving the template and the project of the
+        entries if the directive has no ``template`` or ``project`` option
+        (``doxysummary_template`` and ``doxysummary_default_project``)
+        and the layout of their generated files (``doxysummary_stub_layout``
+        and ``doxysummary_stub_max_length``), and whether overloads are
+        grouped (``doxysummary_group_overloads``).
+    content_lineno: int, optional
+        Line number of the first line of the content. The default is the
+        line following the directive.
+
+    Return
+    ------
+    List[DoxySummaryEntry]
+        Unresolved entries of the directive.
+    """
+    entry_args: Dict[str, Any] = {
+        'filename': filename,
+        'document': document,
+        'lineno': lineno,
+        'toctree': (options.get('toctree') or '').strip(),
+        'scope': (options.get('scope') or '').strip(),
+        'using': split_using(options.get('using') or ''),
+        'project': (options.get('project') or '').strip() or None,
+    }
+    if config is not None:
+        entry_args['template'] = config.doxysummary_template
+        entry_args['project'] = entry_args['project'] or config.doxysummary_default_project
+        entry_args['layout'] = config.doxysummary_stub_layout
+        entry_args['max_length'] = config.doxysummary_stub_max_length
+        entry_args['group_overloads'] = config.doxysummary_group_overloads
+        entry_args['split_members'] = config.doxysummary_split_members
+    if options.get('template'):
+        entry_args['template'] = options['template'].strip()
+
+    if content_lineno is None:
+        content_lineno = lineno + 1
+    entries: List[DoxySummaryEntry] = []
+    for index, line in enumerate(content):
+        line = line.strip()
+        m = item_re.match(line)
+        if not m:  # empty line or comment
+            continue
+        name = unescape_rst(m.group(1).strip())
+        ignore_parent = name[0] == '~'
+        if ignore_parent:
+            name = name[1:]  # remove tilde
+        alias = alias_re.search(line)
+        entries.append(DoxySummaryEntry(
+            name=''.join(split_name(name)[1:]),  # delete return type
+            alias=alias.group(0).strip('"') if alias else None,
+            ignore_parent=ignore_parent, source=line,
+            offset=content_lineno + index - lineno, **entry_args))
+    return entries
+
+
 class DoxySummaryRenderer:
     """Renderer generating rst files based on templates.
     
@@ -171,32 +419,487 @@ class DoxySummaryRenderer:
 
         return template.render(context)
 
-def process_generate_files(app: Sphinx) -> None:
+
+cpp_directives = {
+    'class': 'cpp:class',
+    'struct': 'cpp:struct',
+    'union': 'cpp:union',
+    'function': 'cpp:function',
+    'variable': 'cpp:var',
+    'typedef': 'cpp:type',
+    'enum': 'cpp:enum',
+    'enumvalue': 'cpp:enumerator',
+    'define': 'c:macro',
+}
+"""Map of item kinds to the directives of the C++ (or C) domain declaring
+them. Other kinds (e.g. concepts, whose template parameters are not read) have
+no native declaration."""
+
+
+def cpp_declaration(item: DoxygenItem, name: str) -> str:
     """
-    Process generating rst files.
-    This function must be called at initialization of Sphinx's building
-    process.
+    Get the declaration of an item, as written in a directive of the C++
+    domain.
 
     Parameters
     ----------
-    app : Sphinx
-        Sphinx Buider.
+    item: DoxygenItem
+        Item read from Doxygen XML.
+    name: str
+        Name of the item in the declaration (qualified or not).
 
-    Raises
+    Return
     ------
-    ValueError
-        Kind of item not found in the package template library.
+    str
+        Declaration (e.g. ``int f(double x) const`` or ``double x[3]``).
+    """
+    if item.kind == 'function':
+        return ' '.join(s for s in (item.return_type, name + item.argsstring) if s)
+    if item.kind in ('variable', 'typedef'):
+        return ' '.join(s for s in (item.type, name + item.argsstring) if s)
+    return name
+
+
+def item_context(item: DoxygenItem, name: str) -> Dict[str, str]:
+    """
+    Get the data of an item needed to declare it in a template rendering the
+    C++ domain directly: keys ``directive``, ``declaration``, ``summary``,
+    ``description`` (detailed description without the summary) and ``refid``
+    (anchor of the item, created by Breathe otherwise).
+    """
+    description = item.description
+    if item.summary and description.startswith(item.summary):
+        description = description[len(item.summary):].strip()
+    return {'directive': cpp_directives.get(item.kind, ''),
+            'declaration': cpp_declaration(item, name),
+            'summary': item.summary, 'description': description,
+            'refid': item.refid}
+
+
+def member_contexts(item: DoxygenItem, project: str = None) -> List[Dict[str, str]]:
+    """
+    Get the contexts (see :func:`item_context`) of the documented public
+    members of a class, or of the values of an enum.
+
+    Parameters
+    ----------
+    item: DoxygenItem
+        Class, struct, union or enum.
+    project: str, optional
+        Doxygen project of the item.
+
+    Return
+    ------
+    List[Dict[str, str]]
+        Contexts of the members, with their local names, in the order of the
+        Doxygen index.
+    """
+    index = symbol_index(project)
+    if item.kind == 'enum':
+        kinds = ('enumvalue',)
+    elif item.kind in ('class', 'struct', 'union'):
+        kinds = ('function', 'variable', 'typedef', 'enum')
+    else:
+        return []
+    members = []
+    for local_name, member_name in index.scope_index.get(item.name, {}).items():
+        for member in index.xml_tree.get(member_name, []):
+            if (member.kind in kinds and member.protection in ('', 'public')
+                    and (member.summary or member.description)):
+                members.append(item_context(member, local_name))
+    return members
+
+
+def member_groups(item: DoxygenItem, size: int, project: str = None
+                  ) -> List[List[Tuple[str, List[DoxygenItem]]]]:
+    """
+    Split the members of a class into groups of at most ``size`` members.
+
+    The members are the functions, variables, typedefs and enums of the scope
+    of the class in the Doxygen index (nested classes have their own compound,
+    and friends are not members), of any protection.
+    The overloads of a name are kept in the same group, so a group exceeds
+    ``size`` only if a name has more overloads.
+
+    Parameters
+    ----------
+    item: DoxygenItem
+        Class or struct.
+    size: int
+        Maximal number of members of a group.
+    project: str, optional
+        Doxygen project of the item.
+
+    Return
+    ------
+    List[List[Tuple[str, List[DoxygenItem]]]]
+        Groups of (local name, members bearing the name), in the order of the
+        Doxygen index.
+    """
+    index = symbol_index(project)
+    groups: List[List[Tuple[str, List[DoxygenItem]]]] = [[]]
+    count = 0
+    for local_name, member_name in index.scope_index.get(item.name, {}).items():
+        members = [member for member in index.xml_tree.get(member_name, [])
+                   if member.kind in ('function', 'variable', 'typedef', 'enum')]
+        if not members:
+            continue
+        if groups[-1] and count + len(members) > size:
+            groups.append([])
+            count = 0
+        groups[-1].append((local_name, members))
+        count += len(members)
+    return groups if groups[-1] else []
+
+
+def member_pages(doxysummary: DoxySummaryEntry, item: DoxygenItem,
+                 keys: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Get the contexts of the member pages of a class or struct with more than
+    ``doxysummary.split_members`` members.
+
+    The generated file of such a class is an overview (the class without its
+    members, and a table linking each member name to its page), and its
+    members are rendered in pages of at most ``split_members`` members,
+    generated next to it (see :func:`render_generated_files`), so that the
+    time to read a page and the size of its output stay bounded.
+
+    Parameters
+    ----------
+    doxysummary: DoxySummaryEntry
+        Resolved entry of the class.
+    item: DoxygenItem
+        Class or struct.
+    keys: Dict[str, Any]
+        Context of the template of the class.
+
+    Return
+    ------
+    List[Dict[str, Any]]
+        Contexts of the member pages (empty if the class is not split). Each
+        context holds the keys ``member_page`` (``True``), ``docname`` (relative
+        to the directory of the class file), ``names`` (local names of the
+        members), ``rows`` (name and summary of each member name),
+        ``members`` (see :func:`member_contexts`) and ``targets`` (kind and
+        name of each member, with the arguments of functions to select the
+        overload, for the directives of Breathe), besides the names of the
+        class.
+    """
+    if (not doxysummary.split_members or item.kind not in ('class', 'struct')
+            or item.name not in symbol_index(doxysummary.project).scope_index):
+        return []
+    groups = member_groups(item, doxysummary.split_members, doxysummary.project)
+    count = sum(len(members) for group in groups for _, members in group)
+    if count <= doxysummary.split_members:
+        return []
+    basename = doxysummary.docname.split('/')[-1]
+    pages = []
+    for number, group in enumerate(groups, start=1):
+        names = [local_name for local_name, _ in group]
+        title = rst.escape(f'{keys["fullname"]}: ' + (names[0] if len(names) == 1
+                           else f'{names[0]} to {names[-1]}'))
+        documented = [member for _, members in group for member in members
+                      if member.protection in ('', 'public')
+                      and (member.summary or member.description)]
+        pages.append({
+            'member_page': True,
+            'docname': bound_filename(f'{basename}-members-{number}',
+                                      doxysummary.max_length),
+            'objname': title,
+            'underline': len(title) * '=',
+            'fullname': keys['fullname'],
+            'module': keys['module'],
+            'kind': item.kind,
+            'names': names,
+            'rows': [{'name': rst.escape(local_name),
+                      'summary': next((m.summary for m in members if m.summary), '')}
+                     for local_name, members in group],
+            'members': [item_context(member, member.name.split('::')[-1])
+                        for member in documented],
+            'targets': [{'kind': member.kind,
+                         'name': member.name + (member.argsstring
+                                                if member.kind == 'function' else '')}
+                        for _, members in group for member in members],
+        })
+    return pages
+
+
+def entry_item(doxysummary: DoxySummaryEntry) -> DoxygenItem:
+    """Get the Doxygen item of a resolved entry."""
+    item_name = split_name(doxysummary.fullname)[1]
+    for item in project_items(item_name, doxysummary.project):
+        if item.refid == doxysummary.refid:
+            return item
+    raise ValueError(f'Item of entry "{doxysummary.source}" not found')
+
+
+def get_template_context(doxysummary: DoxySummaryEntry) -> Dict[str, Any]:
+    """
+    Construct the dictionary of keys - values for subtituting to the template
+    of a resolved entry.
+
+    Besides the names, the context holds the data of the item (keys of
+    :func:`item_context`, and ``members`` for classes and enums, see
+    :func:`member_contexts`), so that templates can declare it in the C++
+    domain without reading the XML files again (see ``cppnative.rst``). The
+    members of large classes are rendered in separate pages, listed by the key
+    ``member_pages`` (see :func:`member_pages`).
+
+    The context of an entry grouped with the other overloads of its function
+    (see :attr:`DoxySummaryEntry.is_overload_group`) is the context of the
+    function name, with the key ``overloads`` listing the full names
+    (``fullname``) and the data of the overloads (completed by
+    :class:`GenerationPlan`).
+
+    Parameters
+    ----------
+    doxysummary: DoxySummaryEntry
+        Resolved entry.
+
+    Return
+    ------
+    Dict[str, Any]
+        Context of the template.
+    """
+    fullname = doxysummary.fullname  # note: mute return type
+    item = entry_item(doxysummary)
+    keys = {}
+    if doxysummary.is_overload_group:  # page of all overloads of the name
+        item_name = split_name(fullname)[1]
+        keys['objname'] = rst.escape(item_name)
+        keys['module'] = "::".join(item_name.split("::")[:-1])
+        keys['fullname'] = item_name
+        keys['overloads'] = [dict(item_context(item, item.name), fullname=fullname)]
+        keys['underline'] = len(keys['objname']) * '='
+        keys['kind'] = 'function'
+        keys['function'] = True
+        return keys
+    if doxysummary.alias:
+        keys['objname'] = doxysummary.alias
+    else:
+        keys['objname'] = fullname
+    keys['objname'] = rst.escape(keys['objname'])
+    keys['module'] = "::".join(fullname.split("::")[:-1])
+    keys['fullname'] = fullname
+    keys['underline'] = len(keys['objname']) * '='
+    keys['kind'] = doxysummary.kind
+    keys[doxysummary.kind] = True  # in order to use {%if ...%} in Jinja template
+    keys.update(item_context(item, item.name))
+    keys['member_pages'] = member_pages(doxysummary, item, keys)
+    keys['members'] = ([] if keys['member_pages']
+                       else member_contexts(item, doxysummary.project))
+    return keys
+
+
+class GenerationPlan:
+    """
+    Map of files to be generated to their render jobs.
+
+    An item listed in several directives (or several times in a directive) is
+    rendered only once. Entries generated to the same file with a different
+    template or context (e.g. different alias, or two names mangled to the
+    same filename) are reported, and the first entry is kept. Overloads of a
+    function grouped in one file are gathered in a single job.
+
+    Attributes
+    ----------
+    jobs: Dict[str, Tuple[str, Dict[str, Any]]]
+        Map of generated filename -> (template name, template context).
+    owners: Dict[str, DoxySummaryEntry]
+        Map of generated filename -> first entry generated to the file.
+    """
+
+    def __init__(self, srcdir: str, suffix: str):
+        """
+        Parameters
+        ----------
+        srcdir: str
+            Source directory of the Sphinx project.
+        suffix: str
+            Suffix of generated files.
+        """
+        self.srcdir = srcdir
+        self.suffix = suffix
+        self.jobs: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self.owners: Dict[str, DoxySummaryEntry] = {}
+
+    def add(self, doxysummary: DoxySummaryEntry) -> str:
+        """
+        Add the render job of a resolved entry.
+
+        Parameters
+        ----------
+        doxysummary: DoxySummaryEntry
+            Resolved entry.
+
+        Return
+        ------
+        str
+            Generated filename if the job is new or an overload has been added
+            to it, ``None`` if the file is already planned.
+        """
+        generated_filename = os.path.join(self.srcdir, doxysummary.docname + self.suffix)
+        job = (doxysummary.template, get_template_context(doxysummary))
+        if generated_filename not in self.jobs:
+            self.jobs[generated_filename] = job
+            self.owners[generated_filename] = doxysummary
+            return generated_filename
+        template_name, keys = self.jobs[generated_filename]
+        if 'overloads' in job[1] and 'overloads' in keys and template_name == job[0]:
+            overload = job[1]['overloads'][0]
+            if any(o['fullname'] == overload['fullname'] for o in keys['overloads']):
+                return None
+            keys['overloads'].append(overload)
+            return generated_filename
+        if self.jobs[generated_filename] != job:
+            owner = self.owners[generated_filename]
+            logger.warning(__('doxysummary: entry "%s" conflicts with entry "%s" '
+                              '(%s:%d) already generated to %s, entry ignored'),
+                           doxysummary.source, owner.source, owner.filename,
+                           owner.lineno + owner.offset, generated_filename,
+                           location=doxysummary.location)
+        return None
+
+
+def make_generation_plan(doxysummaries: List[DoxySummaryEntry], srcdir: str,
+                         suffix: str) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+    """
+    Map each file to be generated to its render job (see
+    :class:`GenerationPlan`).
+
+    Parameters
+    ----------
+    doxysummaries: List[DoxySummaryEntry]
+        Resolved entries.
+    srcdir: str
+        Source directory of the Sphinx project.
+    suffix: str
+        Suffix of generated files.
+
+    Return
+    ------
+    Dict[str, Tuple[str, Dict[str, Any]]]
+        Map of generated filename -> (template name, template context).
+    """
+    plan = GenerationPlan(srcdir, suffix)
+    for doxysummary in doxysummaries:
+        plan.add(doxysummary)
+    return plan.jobs
+
+
+def write_if_changed(filename: str, content: str, force: bool = False) -> bool:
     """
+    Write a file, unless it already has the given content (so that its
+    modification time, checked by Sphinx to find outdated documents, is kept).
+
+    Only the incremental mode keeps unchanged files: it marks the generated
+    files of the items whose XML changed as outdated itself (see
+    :func:`sphinx_doxysummary.incremental.process_outdated_docs`). In the
+    other modes, Sphinx only reads again the generated files it finds
+    modified, so they are always written.
+
+    Parameters
+    ----------
+    filename: str
+        Path of the file.
+    content: str
+        Content of the file.
+    force: bool, optional
+        Write the file even if it already has the content.
+        The default is ``False``.
+
+    Return
+    ------
+    bool
+        Whether the file has been written.
+    """
+    if not force and os.path.isfile(filename):
+        with open(filename, 'r') as f:
+            if f.read() == content:
+                return False
+    ensuredir(os.path.dirname(filename))
+    with open(filename, 'w') as f:
+        f.write(content)
+    return True
+
+
+def render_generated_files(renderer: DoxySummaryRenderer, generated_filename: str,
+                           job: Tuple[str, Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Render a job of the generation plan, and the member pages of its context
+    (see :func:`member_pages`).
+
+    Parameters
+    ----------
+    renderer: DoxySummaryRenderer
+        Renderer of templates.
+    generated_filename: str
+        Path of the generated file.
+    job: Tuple[str, Dict[str, Any]]
+        Template name and template context.
 
-    # get files in the source directory
+    Return
+    ------
+    Dict[str, str]
+        Map of path -> content of the generated files.
+    """
+    template_name, keys = job
+    files = {generated_filename: renderer.render(template_name, keys)}
+    directory = os.path.dirname(generated_filename)
+    suffix = os.path.splitext(generated_filename)[1]
+    for page in keys.get('member_pages', []):
+        files[os.path.join(directory, page['docname'] + suffix)] = \
+            renderer.render(template_name, page)
+    return files
+
+
+def write_generated_file(renderer: DoxySummaryRenderer, generated_filename: str,
+                         job: Tuple[str, Dict[str, Any]],
+                         only_if_changed: bool = False) -> None:
+    """
+    Render a job of the generation plan and write the generated files (see
+    :func:`write_if_changed`).
+
+    Parameters
+    ----------
+    renderer: DoxySummaryRenderer
+        Renderer of templates.
+    generated_filename: str
+        Path of the generated file.
+    job: Tuple[str, Dict[str, Any]]
+        Template name and template context.
+    only_if_changed: bool, optional
+        Keep the files which already have the rendered content (incremental
+        mode). The default is ``False``.
+    """
+    for filename, content in render_generated_files(renderer, generated_filename,
+                                                    job).items():
+        write_if_changed(filename, content, force=not only_if_changed)
+
+
+def find_genfiles(app: Sphinx) -> List[str]:
+    """
+    Get the rst files to be scanned for ``doxysummary`` directives (config
+    variable ``doxysummary_generate``).
+
+    Parameters
+    ----------
+    app : Sphinx
+        Sphinx application.
+
+    Return
+    ------
+    List[str]
+        Paths of the files, relative to the source directory.
+    """
     genfiles = app.config.doxysummary_generate
+    env = app.builder.env
 
     if genfiles is True:
-        env = app.builder.env
         genfiles = [env.doc2path(x, base=None) for x in env.found_docs
                     if os.path.isfile(env.doc2path(x))]
     elif genfiles is False:
-        pass
+        genfiles = []
     else:
         ext = list(app.config.source_suffix)
         genfiles = [genfile + (ext[0] if not genfile.endswith(tuple(ext)) else '')
@@ -206,103 +909,374 @@ def process_generate_files(app: Sphinx) -> None:
             if not os.path.isfile(os.path.join(app.srcdir, entry)):
                 logger.warning(__(f'doxysummary_generate: file not found: {entry}'))
                 genfiles.remove(entry)
+    return genfiles
+
+
+def scan_directives(app: Sphinx, genfiles: List[str]) -> List[DoxySummaryEntry]:
+    """
+    Read the entries of all ``doxysummary`` directives in rst files.
+
+    The entries (not resolved yet) are stored under the key ``entries`` of the
+    side-store of the build environment (see
+    :func:`sphinx_doxysummary.store.get_store`), a map of docname -> directive
+    line number -> entries.
+
+    Parameters
+    ----------
+    app : Sphinx
+        Sphinx application.
+    genfiles: List[str]
+        Paths of the rst files, relative to the source directory.
 
-    suffix = get_rst_suffix(app)
+    Return
+    ------
+    List[DoxySummaryEntry]
+        Entries of all directives.
+    """
+    env = app.builder.env
+    table: Dict[str, Dict[int, List[DoxySummaryEntry]]] = {}
+    get_store(env).set('entries', table)
 
     # find all "doxysummary" directives in genfiles
     doxysummary_re = re.compile(r'^(\s*)\.\.\s+doxysummary::\s*')
-    toctree_arg_re = re.compile(r'^\s+:toctree:\s*(.*?)\s*$')
-    template_arg_re = re.compile(r'^\s+:template:\s*(.*?)\s*$')
-    scope_arg_re = re.compile(r'^\s+:scope:\s*(.*?)\s*$')
-    items_arg_re = re.compile(r'^\s+(~?[_a-zA-Z][^#"]*)\s*.*?')
+    option_arg_re = re.compile(r'^\s+:(toctree|template|scope|using|project):\s*(.*?)\s*$')
 
     doxysummaries: List[DoxySummaryEntry] = []
     for filename in genfiles:
-        filename = os.path.join(app.env.srcdir, filename)
+        filename = os.path.join(app.srcdir, filename)
+        document = env.path2doc(filename)
         with open(filename, 'r', encoding='utf-8', errors='ignore') as f:
-            # initialization of variables
-            in_doxysummary = False
-            base_indent = ''
-            doxysummary_args = {'filename': filename}
-
-            # loop over all lines in file
             lines = f.read().splitlines()
-            for line in lines:
-
-                if in_doxysummary:
-                    m = toctree_arg_re.match(line)  # read ":toctree:"
-                    if m:
-                        doxysummary_args['toctree'] = m.group(1)
-                        continue
-
-                    m = template_arg_re.match(line)  # read ":template:"
-                    if m:
-                        doxysummary_args['template'] = m.group(1)
-                        continue
-
-                    m = scope_arg_re.match(line)  # read ":scope:"
-                    if m:
-                        doxysummary_args['scope'] = m.group(1)
-                        continue
-
-                    m = items_arg_re.match(line)  # read items
-                    if m:
-                        name = unescape_rst(m.group(1).strip())
-                        if name[0] == '~':
-                            name = name[1:]
-                        doxysummary_args['name'] = ''.join(split_name(name)[1:])
-                        alias = re.search('".+"', line)
-                        if alias:
-                            alias = alias.group(0).strip('"')
-                            doxysummary_args['alias'] = alias
-                        else:
-                            doxysummary_args['alias'] = None
-                        doxysummaries.append(DoxySummaryEntry(**doxysummary_args))
-                        continue
-
-                    if not line.strip() or line.startswith(base_indent + " "):
-                        continue  # skip empty lines
-
-                    # re-initialize variables
-                    in_doxysummary = False
-                    base_indent = ''
-                    doxysummary_args = {'filename': filename}
-
-                m = doxysummary_re.match(line)
-                if m:  # if "..doxysummary::" found
-                    in_doxysummary = True
-                    base_indent = m.group(1)
+
+        # collect the options and the content of each directive
+        blocks: List[Tuple[int, Dict[str, str], List[str], List[int]]] = []
+        in_doxysummary = False
+        base_indent = ''
+        for lineno, line in enumerate(lines, start=1):
+
+            if in_doxysummary:
+                if not line.strip() or line.startswith(base_indent + " "):
+                    m = option_arg_re.match(line)  # read options
+                    if m and not blocks[-1][2]:
+                        blocks[-1][1][m.group(1)] = m.group(2)
+                    elif line.strip() or blocks[-1][2]:  # keep the line numbers
+                        blocks[-1][2].append(line)
+                        blocks[-1][3].append(lineno)
                     continue
+                in_doxysummary = False
 
-    # generate files based on the template for each doxysummary
-    renderer = DoxySummaryRenderer(app)
-    for doxysummary in doxysummaries:
-        generated_dir = os.path.join(os.path.dirname(doxysummary.filename),
-                                       doxysummary.toctree)
-        ensuredir(generated_dir)
-
-        # construct dictionary of keys - values for subtituting to the template
-        name = doxysummary.name
-        fullname = doxysummary.fullname  # note: mute return type
-        fullname_without_args = split_name(fullname)[1]
-        kind: str = xml_tree[fullname_without_args][0].kind
-        keys = {}
-        if doxysummary.alias:
-            keys['objname'] = doxysummary.alias
+            m = doxysummary_re.match(line)
+            if m:  # if "..doxysummary::" found
+                in_doxysummary = True
+                base_indent = m.group(1)
+                blocks.append((lineno, {}, [], []))
+
+        # read entries of each directive
+        for lineno, options, content, content_linenos in blocks:
+            entries = parse_doxysummary(content, options, filename, document,
+                                        lineno, app.config,
+                                        content_linenos[0] if content else None)
+            table.setdefault(document, {})[lineno] = entries
+            doxysummaries.extend(entries)
+    return doxysummaries
+
+
+def changed_compounds(app: Sphinx) -> Set[str]:
+    """
+    Get the compounds whose xml files changed since the previous build.
+
+    The fingerprint (modification time and size) and the digest of the xml
+    files of each Doxygen project are kept in the side-store (key ``xml``). A
+    file is hashed only if its fingerprint changed, and the digests computed
+    after a run of Doxygen (see :mod:`sphinx_doxysummary.doxygen`) are reused.
+    No xml file is parsed.
+
+    Parameters
+    ----------
+    app : Sphinx
+        Sphinx application.
+
+    Return
+    ------
+    Set[str]
+        Refids of the compounds whose xml files were modified, added or
+        removed, or ``None`` if any item may have changed (no state saved by
+        the previous build, projects added or removed, ``index.xml`` or an
+        inventory modified).
+    """
+    store = get_store(app.builder.env)
+    previous = store.load('xml')
+    xml_digests = getattr(app, 'doxysummary_xml_digests', {})
+    state: Dict[str, Dict[str, Tuple[Tuple[int, int], str]]] = {}
+    changed: Set[str] = set()
+    everything = previous.keys() != {xmldir for _, xmldir in doxygen_projects(app.config)}
+    for _, xmldir in doxygen_projects(app.config):
+        if is_inventory(xmldir):
+            fnames, index_fname = [xmldir], xmldir
         else:
-            keys['objname'] = fullname
-        keys['objname'] = rst.escape(keys['objname'])
-        keys['module'] = "::".join(fullname.split("::")[:-1])
-        keys['fullname'] = fullname
-        keys['underline'] = len(keys['objname']) * '='
-        keys[kind] = True  # in order to use {%if ...%} in Jinja template
+            index_fname = os.path.join(xmldir, 'index.xml')
+            fnames = compound_files(xmldir) + [index_fname]
+        old_files = previous.get(xmldir, {})
+        files = state[xmldir] = {}
+        for fname in fnames:
+            try:
+                fingerprint = file_fingerprint(fname)
+                old_file = old_files.get(fname)
+                if old_file is not None and old_file[0] == fingerprint:
+                    files[fname] = old_file
+                    continue
+                digest = xml_digests.get(xmldir, {}).get(fname) or file_digest(fname)
+            except OSError:  # missing project, reported when it is loaded
+                continue
+            files[fname] = (fingerprint, digest)
+            if old_file is None or old_file[1] != digest:
+                changed.add(os.path.basename(fname)[:-len('.xml')])
+                everything = everything or fname == index_fname
+        for fname in old_files.keys() - files.keys():  # removed files
+            changed.add(os.path.basename(fname)[:-len('.xml')])
+            everything = everything or fname == index_fname
+    if state != previous:
+        store.set('xml', state)
+    return None if everything else changed
+
+
+def outdated_entries(app: Sphinx) -> List[DoxySummaryEntry]:
+    """
+    Select the entries of the documents which will be read again, and reuse
+    the entries resolved by the previous build for the other documents.
+
+    The entries of a document are reused when the document is not outdated
+    (as computed by Sphinx from the modification times of the document and of
+    its dependencies), its directives are at the same lines, the generated
+    files of its entries exist, and no compound of the items it lists changed
+    (see :func:`changed_compounds`). When the configuration or the index of a
+    Doxygen project changed, all entries are selected. The documents selected
+    because of changes of the XML files are stored in
+    ``app.doxysummary_xml_outdated``, to be read again (see
+    :func:`process_xml_outdated_docs`). Since the Doxygen projects are only
+    loaded when an entry is looked up in them (see
+    :func:`sphinx_doxysummary.xmltree.symbol_index`), no XML file is parsed
+    when no document with ``doxysummary`` entries is outdated. If no document
+    with entries is outdated, added or removed, and no compound changed, the
+    entries of the previous build are not even loaded from the side-store.
+
+    Parameters
+    ----------
+    app : Sphinx
+        Sphinx application, whose side-store contains the entries just
+        scanned (see :func:`scan_directives`).
+
+    Return
+    ------
+    List[DoxySummaryEntry]
+        Entries to resolve and generate.
+    """
+    env = app.builder.env
+    store = get_store(env)
+    scanned = store.get('entries')
+    xml_outdated = app.doxysummary_xml_outdated = set()
+    changed_xml = changed_compounds(app)
+    if env.config_status != CONFIG_OK or 'entries' not in store.documents:
+        return [entry for directives in scanned.values()
+                for entries in directives.values() for entry in entries]
+    if changed_xml is None:  # any item may have changed
+        xml_outdated.update(scanned, store.documents.get('refids', set()))
+        logger.info('[doxysummary] Doxygen projects changed, all documents with '
+                    'doxysummary entries outdated')
+        return [entry for directives in scanned.values()
+                for entries in directives.values() for entry in entries]
+
+    added, changed, removed = env.get_outdated_files(False)
+    outdated = added | changed
+    if (not removed and not changed_xml and scanned.keys() == store.documents['entries']
+            and scanned.keys().isdisjoint(outdated)):
+        store.discard('entries')  # keep the saved entries
+        logger.info('[doxysummary] no document with doxysummary entries outdated')
+        return []
+
+    if changed_xml:  # documents listing items of the changed compounds
+        for docname, refids in store.get('refids').items():
+            if any(compound_refid(refid) in changed_xml for refid in refids):
+                xml_outdated.add(docname)
+    previous = store.load('entries')
+    selected: List[DoxySummaryEntry] = []
+    for docname, directives in scanned.items():
+        old_directives = previous.get(docname)
+        if (docname not in outdated and docname not in xml_outdated
+                and old_directives is not None
+                and old_directives.keys() == directives.keys()
+                and all(os.path.isfile(env.doc2path(entry.docname))
+                        for entries in old_directives.values()
+                        for entry in entries if entry.docname)
+                and not any(compound_refid(entry.refid) in changed_xml
+                            for entries in old_directives.values()
+                            for entry in entries if entry.refid)):
+            scanned[docname] = old_directives
+            continue
+        if docname not in outdated:
+            xml_outdated.add(docname)
+        selected.extend(entry for entries in directives.values() for entry in entries)
+
+    projects = {entry.project for entry in selected}
+    logger.info('[doxysummary] %d of %d documents with doxysummary entries outdated '
+                '(%d compounds changed), projects needed: %s',
+                len({entry.document for entry in selected}), len(scanned),
+                len(changed_xml), 'all' if None in projects else
+                (', '.join(sorted(projects)) or 'none'))
+    return selected
+
+
+def process_xml_outdated_docs(app: Sphinx, env: BuildEnvironment, added: Set[str],
+                              changed: Set[str], removed: Set[str]) -> List[str]:
+    """Get the documents to read again because the compounds of the items they
+    list changed, in the default mode (event ``env-get-outdated``, see
+    :func:`outdated_entries`)."""
+    if build_mode(app.config) != 'default':
+        return []
+    outdated = getattr(app, 'doxysummary_xml_outdated', set())
+    return sorted((outdated & env.found_docs) - added - changed)
+
+
+preflight_modes = ('error', 'warn', 'off')
+"""Values of the config variable ``doxysummary_preflight``."""
+
+
+def preflight_entries(doxysummaries: List[DoxySummaryEntry],
+                      mode: str = 'error') -> List[DoxySummaryEntry]:
+    """
+    Resolve entries, reporting all the entries which cannot be resolved
+    instead of stopping at the first one.
+
+    Each unresolved entry is reported with its file and line. Entries matching
+    several items (e.g. a function without arguments whose name is overloaded)
+    are reported as ambiguous, the first item is used.
+
+    Parameters
+    ----------
+    doxysummaries: List[DoxySummaryEntry]
+        Entries to resolve.
+    mode: str, optional
+        ``'error'`` reports all unresolved entries and raises an error,
+        ``'warn'`` reports them as warnings and skips them, ``'off'`` raises
+        the error of the first unresolved entry (no report of ambiguous
+        entries).
+
+    Return
+    ------
+    List[DoxySummaryEntry]
+        Resolved entries. Skipped entries are left unresolved (their
+        ``resolved_name`` is ``None``).
+
+    Raises
+    ------
+    ValueError
+        When an entry cannot be resolved (except in mode ``'warn'``), or the
+        mode is unknown.
+    """
+    if mode not in preflight_modes:
+        raise ValueError(f'Unknown preflight mode "{mode}", expected one of '
+                         + ', '.join(preflight_modes))
+    resolved: List[DoxySummaryEntry] = []
+    failures = 0
+    for doxysummary in doxysummaries:
+        location = doxysummary.location
+        try:
+            doxysummary.resolve()
+        except ValueError as err:
+            if mode == 'off':
+                raise
+            failures += 1
+            report = logger.error if mode == 'error' else logger.warning
+            report(__('doxysummary: entry "%s" cannot be resolved: %s'),
+                   doxysummary.source, err, location=location)
+            continue
+        resolved.append(doxysummary)
+        if mode == 'off' or split_name(doxysummary.name)[2]:
+            continue
+        count = len(project_items(doxysummary.resolved_name, doxysummary.project))
+        if count > 1:
+            logger.warning(__('doxysummary: entry "%s" is ambiguous (%d items named '
+                              '%s), the first one is used'),
+                           doxysummary.source, count, doxysummary.resolved_name,
+                           location=location)
+    if failures and mode == 'error':
+        raise ValueError(f'{failures} doxysummary entries cannot be resolved '
+                         '(see the errors above)')
+    return resolved
+
+
+def process_generate_files(app: Sphinx) -> None:
+    """
+    Process generating rst files.
+    This function must be called at initialization of Sphinx's building
+    process.
+
+    The entries of the directives ``doxysummary`` in outdated documents (see
+    :func:`outdated_entries`) are resolved here, before any rst file is
+    written (see :func:`preflight_entries`), and the resolved entries are
+    stored in the side-store of the build environment (see
+    :func:`scan_directives`) to be reused when the directives are read.
+
+    Parameters
+    ----------
+    app : Sphinx
+        Sphinx Buider.
+
+    Raises
+    ------
+    ValueError
+        Kind of item not found in the package template library.
+    """
+    mode = build_mode(app.config)
+    if mode not in ('default', 'incremental'):
+        return  # see pipeline and shard modules
+
+    env = app.builder.env
+    env.find_files(app.config, app.builder)  # documents added since the last build
+    doxysummaries = scan_directives(app, find_genfiles(app))
+    if mode == 'default':  # the incremental mode compares all entries
+        doxysummaries = outdated_entries(app)
+    doxysummaries = preflight_entries(doxysummaries, app.config.doxysummary_preflight)
+
+    # generate each file once based on the template
+    plan = make_generation_plan(doxysummaries, app.srcdir, get_rst_suffix(app))
+    renderer = DoxySummaryRenderer(app)
+    for generated_filename, job in plan.items():
+        write_generated_file(renderer, generated_filename, job,
+                             only_if_changed=mode == 'incremental')
+
+
+def document_refids(env: BuildEnvironment) -> Dict[str, Set[str]]:
+    """
+    Get the refids of the items listed by the directives of each document
+    (``env.doxysummary_refids``, a map of docname -> refids).
+
+    The map is filled when the directives are read, including those of files
+    which are not in ``doxysummary_generate``. It is the only data written by
+    the directives, so the environments of parallel readers are merged by
+    :func:`process_merge_info`. It only holds the documents read by the
+    current build: the refids of all documents are moved to the side-store
+    (key ``refids``) after reading (see
+    :func:`sphinx_doxysummary.store.process_save_store`), replacing those of
+    the documents removed or read again (see :func:`process_purge_doc`).
+    """
+    if not hasattr(env, 'doxysummary_refids'):
+        env.doxysummary_refids = {}
+    return env.doxysummary_refids
+
+
+def process_purge_doc(app: Sphinx, env: BuildEnvironment, docname: str) -> None:
+    """Forget the items listed by a document removed or read again (event
+    ``env-purge-doc``)."""
+    document_refids(env).pop(docname, None)
+    get_store(env).purged.add(docname)
 
-        # auto detect template if template name is 'auto'
-        template_name = doxysummary.template
-        file_content = renderer.render(template_name, keys)
 
-        # mangle fullname -> filename
-        file_name = fullname_to_filename(fullname, suffix)
-        generated_filename = os.path.join(generated_dir, file_name)
-        with open(generated_filename, 'w') as generated_file:
-            generated_file.write(file_content)
+def process_merge_info(app: Sphinx, env: BuildEnvironment, docnames: Set[str],
+                       other: BuildEnvironment) -> None:
+    """Merge the items listed by the documents read by a parallel reader
+    (event ``env-merge-info``)."""
+    refids, other_refids = document_refids(env), document_refids(other)
+    for docname in docnames:
+        if docname in other_refids:
+            refids[docname] = other_refids[docname]
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Incremental loading of Doxygen projects, for live-reload servers (e.g.
+``sphinx-autobuild --watch xml``).
+
+With the config variable ``doxysummary_incremental``, the records extracted
+from each compound file are cached in the doctree directory. At the next
+build, a compound file is parsed again only if its modification time or size
+changed and its content changed. When Doxygen is run by the build (see
+:mod:`sphinx_doxysummary.doxygen`), the digests of the files it wrote are
+reused. The items whose records changed give the
+refids affected by the changes, and only the documents using them are read
+again:
+
+- the documents of directives whose entries resolve to a different item or
+  whose data changed (e.g. summary of the item),
+- the generated rst files of the affected items, since Breathe renders them
+  from the XML files.
+- the other documents listing the affected items (see
+  :func:`sphinx_doxysummary.generate.document_refids`), stored in the
+  side-store of the build environment (see :mod:`sphinx_doxysummary.store`).
+
+In this mode, the rst files are only written when their content changed (see
+:func:`sphinx_doxysummary.generate.write_if_changed`).
+"""
+
+import hashlib
+import os
+import pickle
+
+from typing import Any, Dict, List, Set, Tuple
+
+from sphinx.application import Sphinx
+from sphinx.environment import BuildEnvironment
+from sphinx.util import logging
+from sphinx.util.osutil import ensuredir
+
+from sphinx_doxysummary.store import get_store
+from sphinx_doxysummary.inventory import is_inventory, read_inventory
+from sphinx_doxysummary.utils import build_mode, doxygen_projects
+from sphinx_doxysummary.xmltree import (DoxygenItem, apply_record, clear_xml_tree,
+                                        compound_files, extract_records,
+                                        parse_index, register_item)
+
+logger = logging.getLogger(__name__)
+
+cache_version = 3
+"""Version of the format of the cache."""
+
+cache_filename = 'doxysummary_cache.pickle'
+"""Name of the cache file in the doctree directory."""
+
+
+def file_fingerprint(fname: str) -> Tuple[int, int]:
+    """Get the modification time (in nanoseconds) and the size of a file."""
+    stat = os.stat(fname)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_digest(fname: str) -> str:
+    """Get the SHA-1 digest of the content of a file."""
+    with open(fname, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class ProjectCache:
+    """Data of a Doxygen project cached between builds.
+
+    Attributes
+    ----------
+    index: Dict[str, Tuple[str, str]]
+        Map of refid -> (name, kind) of the items of ``index.xml``.
+    index_state: Tuple[Tuple[int, int], str]
+        Fingerprint and digest of ``index.xml``.
+    files: Dict[str, Tuple[Tuple[int, int], str, List[Dict[str, Any]]]]
+        Map of compound file path -> (fingerprint, digest, records).
+    """
+
+    def __init__(self):
+        self.index: Dict[str, Tuple[str, str]] = {}
+        self.index_state: Tuple[Tuple[int, int], str] = None
+        self.files: Dict[str, Tuple[Tuple[int, int], str, List[Dict[str, Any]]]] = {}
+
+    def update_index(self, xmldir: str, digests: Dict[str, str] = None) -> Set[str]:
+        """Parse ``index.xml`` again if it changed.
+
+        Parameters
+        ----------
+        xmldir: str
+            Directory containing the xml files of the Doxygen project.
+        digests: Dict[str, str], optional
+            Digests of the xml files already computed (see
+            :func:`sphinx_doxysummary.doxygen.run_doxygen`).
+
+        Return
+        ------
+        Set[str]
+            Refids of the items added, removed, renamed or whose kind changed.
+        """
+        index_fname = os.path.join(xmldir, 'index.xml')
+        fingerprint = file_fingerprint(index_fname)
+        if self.index_state and self.index_state[0] == fingerprint:
+            return set()
+        digest = (digests or {}).get(index_fname) or file_digest(index_fname)
+        if self.index_state and self.index_state[1] == digest:
+            self.index_state = (fingerprint, digest)
+            return set()
+        index = {refid: (item.name, item.kind)
+                 for refid, item in parse_index(xmldir).items()}
+        changed = {refid for refid in index.keys() | self.index.keys()
+                   if index.get(refid) != self.index.get(refid)}
+        self.index, self.index_state = index, (fingerprint, digest)
+        return changed
+
+    def update_inventory(self, fname: str) -> Tuple[List[DoxygenItem], Set[str]]:
+        """Read an inventory listed in ``doxygen_xml``.
+
+        Return
+        ------
+        Tuple[List[DoxygenItem], Set[str]]
+            Items of the inventory, and refids of the items added, removed or
+            modified (all items of the inventory and of its previous version
+            if its content changed).
+        """
+        items = read_inventory(fname)
+        fingerprint, digest = file_fingerprint(fname), file_digest(fname)
+        changed: Set[str] = set()
+        if self.index_state is None or self.index_state[1] != digest:
+            changed = set(self.index) | {item.refid for item in items}
+            self.index = {item.refid: (item.name, item.kind) for item in items}
+        self.index_state = (fingerprint, digest)
+        return items, changed
+
+    def update_files(self, xmldir: str, engine: str = 'python',
+                     digests: Dict[str, str] = None) -> Set[str]:
+        """Extract the records of the compound files which changed.
+
+        Parameters
+        ----------
+        xmldir: str
+            Directory containing the xml files of the Doxygen project.
+        engine: str, optional
+            XML extraction engine.
+        digests: Dict[str, str], optional
+            Digests of the xml files already computed (see
+            :func:`sphinx_doxysummary.doxygen.run_doxygen`), so that the
+            unchanged files rewritten by Doxygen are not read.
+
+        Return
+        ------
+        Set[str]
+            Refids of the records added, removed or modified.
+        """
+        changed: Set[str] = set()
+        files = {}
+        parsed = 0
+        for xml_fname in compound_files(xmldir):
+            fingerprint = file_fingerprint(xml_fname)
+            cached = self.files.get(xml_fname)
+            if cached and cached[0] == fingerprint:
+                files[xml_fname] = cached
+                continue
+            digest = (digests or {}).get(xml_fname) or file_digest(xml_fname)
+            if cached and cached[1] == digest:
+                files[xml_fname] = (fingerprint, digest, cached[2])
+                continue
+            records = extract_records(xml_fname, engine)
+            parsed += 1
+            old_records = {r['refid']: r for r in cached[2]} if cached else {}
+            new_records = {r['refid']: r for r in records}
+            changed.update(refid for refid in old_records.keys() | new_records.keys()
+                           if old_records.get(refid) != new_records.get(refid))
+            files[xml_fname] = (fingerprint, digest, records)
+        for xml_fname in self.files.keys() - files.keys():  # removed files
+            changed.update(r['refid'] for r in self.files[xml_fname][2])
+        self.files = files
+        logger.verbose('[doxysummary] %s: %d compound files parsed', xmldir, parsed)
+        return changed
+
+    def items(self) -> List[DoxygenItem]:
+        """Create the items of the project from the cached data."""
+        index_data = {refid: DoxygenItem(refid=refid, name=name, kind=kind)
+                      for refid, (name, kind) in self.index.items()}
+        for _, _, records in self.files.values():
+            for record in records:
+                if record['refid'] in index_data:
+                    apply_record(index_data[record['refid']], record)
+        return list(index_data.values())
+
+
+def load_cache(fname: str, engine: str) -> Dict[str, ProjectCache]:
+    """Load the caches of the Doxygen projects (empty if the cache file does
+    not exist or was written by another version or another XML engine)."""
+    try:
+        with open(fname, 'rb') as f:
+            version, cache_engine, caches = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        return {}
+    if version != cache_version or cache_engine != engine:
+        return {}
+    return caches
+
+
+def save_cache(fname: str, engine: str, caches: Dict[str, ProjectCache]) -> None:
+    """Save the caches of the Doxygen projects."""
+    ensuredir(os.path.dirname(fname))
+    with open(fname, 'wb') as f:
+        pickle.dump((cache_version, engine, caches), f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def entry_signatures(table: Dict[str, Dict[int, List[Any]]]) -> Dict[str, Tuple]:
+    """Get the data of the resolved entries of each document, to find the
+    documents whose summary tables changed.
+
+    Parameters
+    ----------
+    table: Dict[str, Dict[int, List[DoxySummaryEntry]]]
+        Entries of the directives (key ``entries`` of the side-store).
+
+    Return
+    ------
+    Dict[str, Tuple]
+        Map of docname -> data of its entries.
+    """
+    return {docname: tuple((lineno, entry.source, entry.refid, entry.kind,
+                            entry.summary, entry.return_type, entry.docname)
+                           for lineno, entries in sorted(directives.items())
+                           for entry in entries)
+            for docname, directives in table.items()}
+
+
+def process_incremental_xmltree(app: Sphinx) -> None:
+    """Load the Doxygen projects, parsing only the files which changed since
+    the last build.
+
+    This function replaces
+    :func:`sphinx_doxysummary.xmltree.process_generate_xmltree` when the config
+    variable ``doxysummary_incremental`` is set. The refids affected by the
+    changes are stored in ``app.doxysummary_changed_refids``, and the data of
+    the entries of the last build in ``app.doxysummary_signatures``. Both are
+    only used to find the outdated documents, and are not saved.
+
+    Parameters
+    ----------
+    app : Sphinx
+        Sphinx application.
+    """
+    if build_mode(app.config) != 'incremental':
+        return
+
+    engine = app.config.doxysummary_xml_engine
+    caches = load_cache(os.path.join(app.doctreedir, cache_filename), engine)
+    first_build = not caches
+    changed: Set[str] = set()
+    clear_xml_tree()  # the process may be reused by a live-reload server
+    xml_digests = getattr(app, 'doxysummary_xml_digests', {})
+    for project, xmldir in doxygen_projects(app.config):
+        cache = caches.setdefault(xmldir, ProjectCache())
+        if is_inventory(xmldir):
+            items, inventory_changed = cache.update_inventory(xmldir)
+            changed |= inventory_changed
+            for item in items:
+                register_item(item, project)
+            continue
+        changed |= cache.update_index(xmldir, xml_digests.get(xmldir))
+        changed |= cache.update_files(xmldir, engine, xml_digests.get(xmldir))
+        for item in cache.items():
+            register_item(item, project)
+    app.doxysummary_caches = caches
+
+    app.doxysummary_changed_refids = None if first_build else changed
+    app.doxysummary_signatures = entry_signatures(get_store(app.builder.env).get('entries'))
+
+
+def process_outdated_docs(app: Sphinx, env: BuildEnvironment, added: Set[str],
+                          changed: Set[str], removed: Set[str]) -> List[str]:
+    """Get the documents to read again because of changes of the Doxygen
+    projects (event ``env-get-outdated``).
+
+    Return
+    ------
+    List[str]
+        Documents using items affected by the changes.
+    """
+    if build_mode(app.config) != 'incremental':
+        return []
+
+    # without cache (first build), all refids may have changed
+    changed_refids = app.doxysummary_changed_refids
+    outdated = set()
+    old_signatures = app.doxysummary_signatures
+    table = get_store(env).get('entries')
+    for docname, signature in entry_signatures(table).items():
+        if old_signatures.get(docname) != signature:
+            outdated.add(docname)
+        for entries in table[docname].values():
+            for entry in entries:
+                if changed_refids is None or entry.refid in changed_refids:
+                    outdated.update((docname, entry.docname))
+    if changed_refids is None or changed_refids:  # other documents
+        for docname, refids in get_store(env).get('refids').items():
+            if changed_refids is None or not refids.isdisjoint(changed_refids):
+                outdated.add(docname)
+    outdated = (outdated & env.found_docs) - added - changed
+    if outdated:
+        logger.info('[doxysummary] %d documents outdated by changes of Doxygen '
+                    'XML files', len(outdated))
+    return sorted(outdated)
+
+
+def process_save_cache(app: Sphinx, exception: Exception) -> None:
+    """Save the caches of the Doxygen projects after a successful build (event
+    ``build-finished``)."""
+    caches = getattr(app, 'doxysummary_caches', None)
+    if exception is None and caches is not None:
+        save_cache(os.path.join(app.doctreedir, cache_filename),
+                   app.config.doxysummary_xml_engine, caches)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Symbol inventories.
+
+An inventory holds the items of Doxygen projects (names, kinds, summaries,
+arguments, return types and base classes), so that documentation projects
+referencing a library do not parse its XML files. Like the ``objects.inv`` of
+intersphinx, an inventory is a short text header followed by a zlib
+compressed payload::
+
+    # Doxysummary inventory version 2
+    # Project: core
+    <zlib compressed JSON list of items>
+
+Each item is a list ``[refid, name, kind, summary, argsstring, return_type,
+args, bases, description, protection, type]`` (the last three are absent in
+inventories of version 1, which can still be read). The payload is plain data,
+so an inventory downloaded from another project is safe to load.
+
+Inventories are written by ``python -m sphinx_doxysummary inventory``, or at
+the end of a build with the config variable ``doxysummary_inventory``. They are
+read when listed in ``doxygen_xml`` in place of a Doxygen xml directory.
+"""
+
+import json
+import os
+import zlib
+
+from typing import List
+
+from sphinx.application import Sphinx
+from sphinx.util import logging
+
+from sphinx_doxysummary.xmltree import DoxygenItem, symbol_index
+
+logger = logging.getLogger(__name__)
+
+inventory_version = 2
+"""Version of the format of inventories."""
+
+inventory_header = '# Doxysummary inventory version {version}\n# Project: {project}\n'
+
+
+def is_inventory(path: str) -> bool:
+    """Check if an entry of ``doxygen_xml`` is an inventory (a file) rather
+    than a Doxygen xml directory."""
+    return os.path.isfile(path)
+
+
+def dump_inventory(items: List[DoxygenItem], project: str = '') -> bytes:
+    """Serialize items into an inventory.
+
+    Parameters
+    ----------
+    items: List[DoxygenItem]
+        Items to export.
+    project: str, optional
+        Name of the project, written in the header.
+
+    Return
+    ------
+    bytes
+        Content of the inventory.
+    """
+    payload = [[item.refid, item.name, item.kind, item.summary, item.argsstring,
+                item.return_type, item.args, item.bases, item.description,
+                item.protection, item.type] for item in items]
+    header = inventory_header.format(version=inventory_version,
+                                     project=' '.join(project.split()))
+    data = json.dumps(payload, separators=(',', ':'), ensure_ascii=False)
+    return header.encode('utf-8') + zlib.compress(data.encode('utf-8'), 9)
+
+
+def load_inventory(content: bytes) -> List[DoxygenItem]:
+    """Deserialize the items of an inventory.
+
+    Parameters
+    ----------
+    content: bytes
+        Content of the inventory.
+
+    Return
+    ------
+    List[DoxygenItem]
+        Items of the inventory.
+
+    Raises
+    ------
+    ValueError
+        When the content is not an inventory, or an inventory of an unsupported
+        version.
+    """
+    lines = content.split(b'\n', 2)
+    if len(lines) < 3 or not lines[0].startswith(b'# Doxysummary inventory version '):
+        raise ValueError('Not a doxysummary inventory')
+    version = lines[0].rsplit(b' ', 1)[-1].decode('utf-8', 'replace')
+    if version not in ('1', str(inventory_version)):
+        raise ValueError(f'Unsupported inventory version {version}')
+    try:
+        payload = json.loads(zlib.decompress(lines[2]).decode('utf-8'))
+    except (zlib.error, UnicodeDecodeError, json.JSONDecodeError) as err:
+        raise ValueError(f'Corrupted doxysummary inventory ({err})') from None
+
+    items: List[DoxygenItem] = []
+    for fields in payload:
+        refid, name, kind, summary, argsstring, return_type, args, bases = fields[:8]
+        item = DoxygenItem(refid=refid, name=name, kind=kind)
+        if len(fields) > 8:
+            item.description, item.protection, item.type = fields[8:11]
+        item.set_summary(summary)
+        item.argsstring = argsstring
+        item.return_type = return_type
+        if args is not None:
+            item.set_args([tuple(arg) for arg in args])
+        item.set_bases([tuple(base) for base in bases])
+        items.append(item)
+    return items
+
+
+def write_inventory(fname: str, items: List[DoxygenItem], project: str = '') -> None:
+    """Write items into an inventory file (see :func:`dump_inventory`)."""
+    with open(fname, 'wb') as f:
+        f.write(dump_inventory(items, project))
+
+
+def read_inventory(fname: str) -> List[DoxygenItem]:
+    """Read the items of an inventory file (see :func:`load_inventory`).
+
+    Raises
+    ------
+    ValueError
+        When the file is not a valid inventory.
+    """
+    with open(fname, 'rb') as f:
+        try:
+            return load_inventory(f.read())
+        except ValueError as err:
+            raise ValueError(f'{fname}: {err}') from None
+
+
+def process_export_inventory(app: Sphinx, exception: Exception) -> None:
+    """Write the items of all Doxygen projects into an inventory in the output
+    directory (event ``build-finished``).
+
+    The path of the inventory, relative to the output directory, is the config
+    variable ``doxysummary_inventory``. Nothing is written if it is not set.
+    """
+    if exception is not None or not app.config.doxysummary_inventory:
+        return
+    fname = os.path.join(app.outdir, app.config.doxysummary_inventory)
+    items = [item for items in symbol_index().xml_tree.values() for item in items]
+    write_inventory(fname, items, app.config.project)
+    logger.info('[doxysummary] %d items exported to %s', len(items), fname)
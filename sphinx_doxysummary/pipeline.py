@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pipelined build of the rst files of ``doxysummary`` entries.
+
+Instead of parsing all the Doxygen projects before resolving the entries, the
+directives are read while the ``index.xml`` files are parsed, and the compound
+files are then parsed in worker threads (lxml releases the GIL while parsing).
+The compound files defining the items of the entries are parsed first, and the
+rst file of an entry is written as soon as all the items bearing its name
+(i.e. all overloads of a function) are loaded.
+
+The pipeline is enabled by the config variable ``doxysummary_pipeline``. It
+does not use the symbol server (``doxysummary_server``).
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List
+
+from sphinx.application import Sphinx
+from sphinx.ext.autosummary import get_rst_suffix
+
+from sphinx_doxysummary.cache import get_record_cache
+from sphinx_doxysummary.generate import (DoxySummaryEntry, DoxySummaryRenderer,
+                                         GenerationPlan, find_genfiles,
+                                         scan_directives, write_generated_file)
+from sphinx_doxysummary.inventory import is_inventory, read_inventory
+from sphinx_doxysummary.utils import build_mode, doxygen_projects, split_name
+from sphinx_doxysummary.xmltree import (DoxygenItem, apply_record, clear_xml_tree,
+                                        compound_files, compound_refid,
+                                        extract_records, parse_index,
+                                        project_items, register_item)
+
+def process_pipelined_build(app: Sphinx) -> None:
+    """Read the Doxygen projects, resolve the entries and generate their rst
+    files in a single pipeline.
+
+    This function replaces :func:`sphinx_doxysummary.xmltree.process_generate_xmltree`
+    and :func:`sphinx_doxysummary.generate.process_generate_files` when the
+    config variable ``doxysummary_pipeline`` is set.
+
+    Parameters
+    ----------
+    app : Sphinx
+        Sphinx application.
+
+    Raises
+    ------
+    ValueError
+        When an entry cannot be resolved.
+
+    Notes
+    -----
+    Files are generated in the order their items are loaded. When two entries
+    are generated to the same file with different contents, the entry kept is
+    therefore the first one loaded, not necessarily the first one in the
+    documents.
+    """
+    if build_mode(app.config) != 'pipeline':
+        return
+
+    engine = app.config.doxysummary_xml_engine
+    cache = get_record_cache(app)
+    extract = cache.records if cache is not None else extract_records
+    clear_xml_tree()
+    projects = []
+    for project, xmldir in doxygen_projects(app.config):
+        if is_inventory(xmldir):  # nothing to parse
+            for item in read_inventory(xmldir):
+                register_item(item, project)
+        else:
+            projects.append((project, xmldir))
+    plan = GenerationPlan(app.srcdir, get_rst_suffix(app))
+    renderer = DoxySummaryRenderer(app)
+
+    def generate(doxysummary: DoxySummaryEntry) -> None:
+        doxysummary.resolve()
+        generated_filename = plan.add(doxysummary)
+        if generated_filename:
+            write_generated_file(renderer, generated_filename,
+                                 plan.jobs[generated_filename])
+
+    with ThreadPoolExecutor() as executor:
+        # step1: read the directives while the index files are parsed
+        index_jobs = [executor.submit(parse_index, xmldir) for _, xmldir in projects]
+        doxysummaries = scan_directives(app, find_genfiles(app))
+        indexes: List[Dict[str, DoxygenItem]] = [job.result() for job in index_jobs]
+        for (project, _), index_data in zip(projects, indexes):
+            for item in index_data.values():
+                register_item(item, project)
+
+        # step2: find the items each entry is waiting for
+        waiting: Dict[int, List[int]] = {}  # id(item) -> indices of entries
+        pending: List[int] = []  # number of items not loaded of each entry
+        done = [False] * len(doxysummaries)
+        wanted_compounds = set()
+        for i, doxysummary in enumerate(doxysummaries):
+            try:
+                item_name = split_name(doxysummary.fullname)[1]
+            except ValueError:  # reported when the entry is resolved
+                pending.append(-1)
+                continue
+            items = project_items(item_name, doxysummary.project)
+            pending.append(len(items))
+            for item in items:
+                waiting.setdefault(id(item), []).append(i)
+                wanted_compounds.add(compound_refid(item.refid))
+
+        # step3: parse the compound files, the wanted ones first
+        jobs = {}
+        for (_, xmldir), index_data in zip(projects, indexes):
+            xml_fnames = sorted(compound_files(xmldir),
+                                key=lambda f: Path(f).stem not in wanted_compounds)
+            for xml_fname in xml_fnames:
+                jobs[executor.submit(extract, xml_fname, engine)] = index_data
+
+        # step4: load the items, and generate each entry once all its items
+        # are loaded
+        for job in as_completed(jobs):
+            index_data = jobs[job]
+            ready = []
+            for record in job.result():
+                item = index_data.get(record['refid'])
+                if item is None:
+                    continue
+                apply_record(item, record)
+                for i in waiting.pop(id(item), []):
+                    pending[i] -= 1
+                    if pending[i] == 0:
+                        ready.append(i)
+            for i in ready:  # after the whole file, members of classes included
+                generate(doxysummaries[i])
+                done[i] = True
+
+    # step5: entries whose items are not all defined in compound files
+    for i, doxysummary in enumerate(doxysummaries):
+        if not done[i]:
+            generate(doxysummary)
+    if cache is not None:
+        cache.report()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prebuilt symbol index.
+
+The items of Doxygen projects can be parsed outside Sphinx (e.g. in a cached CI
+step) and saved in a symbol index file:
+
+.. code-block:: console
+
+   $ python -m sphinx_doxysummary index --output symbols.pickle ./xml
+
+If the config variable ``doxysummary_index`` is the path of this file, the
+items of each project are loaded from it instead of being parsed, as long as
+the xml files of the project have not been modified since the index was built
+(same number of files, latest modification time and total size).
+"""
+
+import os
+import pickle
+
+from typing import Any, Dict, List
+
+from sphinx.util import logging
+
+from sphinx_doxysummary.server import xml_fingerprint
+from sphinx_doxysummary.xmltree import DoxygenItem, parse_doxygen_xml
+
+logger = logging.getLogger(__name__)
+
+index_version = 3
+"""Version of the format of symbol index files."""
+
+
+def build_index(xmldirs: List[str], engine: str = 'python') -> Dict[str, Any]:
+    """Parse Doxygen projects into a symbol index.
+
+    Parameters
+    ----------
+    xmldirs: List[str]
+        Directories containing the xml files of the Doxygen projects.
+    engine: str, optional
+        XML extraction engine (see
+        :func:`sphinx_doxysummary.xmltree.extract_records`).
+
+    Return
+    ------
+    Dict[str, Any]
+        Symbol index with keys ``version``, ``engine`` and ``projects`` (map of
+        absolute xml directory -> (fingerprint, items)).
+    """
+    projects = {}
+    for xmldir in xmldirs:
+        xmldir = os.path.abspath(xmldir)
+        projects[xmldir] = (xml_fingerprint(xmldir), parse_doxygen_xml(xmldir, engine))
+    return {'version': index_version, 'engine': engine, 'projects': projects}
+
+
+def save_index(fname: str, index: Dict[str, Any]) -> None:
+    """Save a symbol index built by :func:`build_index`."""
+    with open(fname, 'wb') as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_index(fname: str) -> Dict[str, Any]:
+    """Load a symbol index saved by :func:`save_index`.
+
+    Return
+    ------
+    Dict[str, Any]
+        Symbol index, or ``None`` if the file does not exist or was saved by
+        another version of the format.
+    """
+    try:
+        with open(fname, 'rb') as f:
+            index = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if not isinstance(index, dict) or index.get('version') != index_version:
+        logger.warning('doxysummary: symbol index %s has an unsupported version, '
+                       'ignored', fname)
+        return None
+    return index
+
+
+def prebuilt_items(index: Dict[str, Any], xmldir: str) -> List[DoxygenItem]:
+    """Get the items of a Doxygen project from a symbol index.
+
+    Parameters
+    ----------
+    index: Dict[str, Any]
+        Symbol index.
+    xmldir: str
+        Directory containing the xml files of the Doxygen project.
+
+    Return
+    ------
+    List[DoxygenItem]
+        Items of the project, or ``None`` if the project is not in the index or
+        its xml files have been modified since the index was built.
+    """
+    xmldir = os.path.abspath(xmldir)
+    if xmldir not in index['projects']:
+        return None
+    fingerprint, items = index['projects'][xmldir]
+    if fingerprint != xml_fingerprint(xmldir):
+        logger.info('[doxysummary] symbol index outdated for %s', xmldir)
+        return None
+    return items
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Symbol server holding parsed Doxygen projects in memory.
+
+The server is started with ``python -m sphinx_doxysummary serve --socket PATH``
+and answers requests of Sphinx builds (or any other client) over a Unix socket.
+Each request and each response is a pickled Python ``dict`` prefixed by its
+length (8 bytes, big endian). The socket is created with permission ``0600``,
+so only the user who started the server can connect to it.
+
+Supported requests:
+
+- ``{'op': 'ping'}``: check that the server is alive.
+- ``{'op': 'load', 'xmldir': str}``: get all ``DoxygenItem`` of a project.
+  An optional key ``engine`` selects the XML extraction engine used when the
+  project is parsed.
+- ``{'op': 'lookup', 'xmldir': str, 'name': str}``: get the items of a name.
+- ``{'op': 'resolve', 'xmldir': str, 'name': str, 'args': str}``: get the
+  overload of a function matching the arguments.
+- ``{'op': 'shutdown'}``: stop the server.
+
+A project is parsed at its first request with an engine, and parsed again when
+one of its xml files (in any subdirectory) has been added, removed or modified.
+"""
+
+import os
+import pickle
+import socket
+import socketserver
+import stat
+import struct
+import threading
+
+from typing import Any, Dict, List, Tuple
+
+from sphinx.util import logging
+
+from sphinx_doxysummary.xmltree import DoxygenItem, compound_files, parse_doxygen_xml
+
+logger = logging.getLogger(__name__)
+
+
+def xml_fingerprint(xmldir: str) -> Tuple[int, int, int]:
+    """Get a cheap fingerprint of the xml files of a Doxygen project.
+
+    Parameters
+    ----------
+    xmldir : str
+        Directory containing the xml files of the Doxygen project.
+
+    Return
+    ------
+    Tuple[int, int, int]
+        Number of xml files, latest modification time (in nanoseconds) and
+        total size of the files, walking the same files as the parser (see
+        :func:`sphinx_doxysummary.xmltree.compound_files`).
+    """
+    count, mtime, size = 0, 0, 0
+    for fname in compound_files(xmldir) + [os.path.join(xmldir, 'index.xml')]:
+        try:
+            stat = os.stat(fname)
+        except OSError:
+            continue
+        count += 1
+        mtime = max(mtime, stat.st_mtime_ns)
+        size += stat.st_size
+    return count, mtime, size
+
+
+def send_message(sock: socket.socket, message: Dict[str, Any]) -> None:
+    """Send a length-prefixed pickled message through a socket."""
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(struct.pack('>Q', len(data)) + data)
+
+
+def receive_message(sock: socket.socket) -> Dict[str, Any]:
+    """Receive a length-prefixed pickled message from a socket.
+
+    Raises
+    ------
+    ConnectionError
+        When the connection is closed before the end of the message.
+    """
+    def receive_exactly(size: int) -> bytes:
+        chunks: List[bytes] = []
+        while size > 0:
+            chunk = sock.recv(min(size, 1 << 20))
+            if not chunk:
+                raise ConnectionError('Connection closed by the symbol server')
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    size, = struct.unpack('>Q', receive_exactly(8))
+    return pickle.loads(receive_exactly(size))
+
+
+class SymbolStore:
+    """Thread-safe cache of parsed Doxygen projects.
+
+    Attributes
+    ----------
+    projects: Dict[Tuple[str, str], Tuple[Tuple[int, int, int], Dict[str, List[DoxygenItem]]]]
+        Map of (xml directory, XML engine) -> (fingerprint, map of name -> items).
+    """
+
+    def __init__(self):
+        self.projects = {}
+        self._lock = threading.Lock()
+
+    def get(self, xmldir: str, engine: str = 'python') -> Dict[str, List[DoxygenItem]]:
+        """Get the items of a project, parsing it if it is new or modified.
+
+        Parameters
+        ----------
+        xmldir : str
+            Directory containing the xml files of the Doxygen project.
+        engine : str, optional
+            XML extraction engine (see
+            :func:`sphinx_doxysummary.xmltree.extract_records`).
+
+        Return
+        ------
+        Dict[str, List[DoxygenItem]]
+            Map of item names to items.
+        """
+        xmldir = os.path.abspath(xmldir)
+        with self._lock:
+            fingerprint = xml_fingerprint(xmldir)
+            cached = self.projects.get((xmldir, engine))
+            if cached is None or cached[0] != fingerprint:
+                logger.info('[doxysummary] parsing %s', xmldir)
+                tree: Dict[str, List[DoxygenItem]] = {}
+                for item in parse_doxygen_xml(xmldir, engine):
+                    tree.setdefault(item.name, []).append(item)
+                cached = (fingerprint, tree)
+                self.projects[xmldir, engine] = cached
+            return cached[1]
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer a request.
+
+        Parameters
+        ----------
+        request: Dict[str, Any]
+            Request (see the module documentation).
+
+        Return
+        ------
+        Dict[str, Any]
+            Response, with key ``result`` on success or ``error`` on failure.
+        """
+        op = request.get('op')
+        if op == 'ping':
+            return {'result': 'pong'}
+        if op not in ('load', 'lookup', 'resolve'):
+            return {'error': f'Unknown request "{op}"'}
+        tree = self.get(request['xmldir'], request.get('engine', 'python'))
+        if op == 'load':
+            return {'result': [item for items in tree.values() for item in items]}
+        items = tree.get(request['name'], [])
+        if op == 'lookup':
+            return {'result': items}
+        for item in items:
+            if item.kind == 'function' and item.check_args(request['args']):
+                return {'result': item}
+        return {'result': None}
+
+
+class SymbolRequestHandler(socketserver.StreamRequestHandler):
+    """Handler of a client connection (several requests may be sent)."""
+
+    def handle(self):
+        while True:
+            try:
+                request = receive_message(self.request)
+            except ConnectionError:
+                return
+            if request.get('op') == 'shutdown':
+                send_message(self.request, {'result': 'bye'})
+                threading.Thread(target=self.server.shutdown).start()
+                return
+            try:
+                response = self.server.store.handle(request)
+            except Exception as err:  # report errors to the client
+                response = {'error': f'{type(err).__name__}: {err}'}
+            send_message(self.request, response)
+
+
+def serve(socket_path: str, xmldirs: List[str] = None) -> None:
+    """Run the symbol server until it receives a ``shutdown`` request.
+
+    Parameters
+    ----------
+    socket_path: str
+        Path of the Unix socket to listen to.
+    xmldirs: List[str], optional
+        Doxygen projects parsed before accepting connections.
+
+    Raises
+    ------
+    ValueError
+        When the path exists and is not a socket, or another server answers on
+        it. The socket of a stopped server is replaced.
+    """
+    if os.path.lexists(socket_path):
+        if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+            raise ValueError(f'{socket_path} exists and is not a socket')
+        try:
+            request_server(socket_path, {'op': 'ping'}, timeout=5.0)
+        except ConnectionRefusedError:  # left by a stopped server
+            os.remove(socket_path)
+        except (OSError, RuntimeError) as err:
+            raise ValueError(f'Socket {socket_path} is in use ({err})') from err
+        else:
+            raise ValueError(f'A symbol server already listens on {socket_path}')
+    old_umask = os.umask(0o177)  # socket readable and writable by owner only
+    try:
+        server = socketserver.ThreadingUnixStreamServer(socket_path,
+                                                        SymbolRequestHandler)
+    finally:
+        os.umask(old_umask)
+    server.daemon_threads = True
+    server.store = SymbolStore()
+    for xmldir in xmldirs or []:
+        server.store.get(xmldir)
+    logger.info('[doxysummary] symbol server listening on %s', socket_path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.remove(socket_path)
+
+
+def request_server(socket_path: str, request: Dict[str, Any],
+                   timeout: float = 60.0) -> Any:
+    """Send a request to a symbol server and return its result.
+
+    Parameters
+    ----------
+    socket_path: str
+        Path of the Unix socket of the server.
+    request: Dict[str, Any]
+        Request (see the module documentation).
+    timeout: float, optional
+        Timeout of the socket operations, in seconds. If ``None``, wait for the
+        answer indefinitely.
+
+    Return
+    ------
+    Any
+        Result of the request.
+
+    Raises
+    ------
+    OSError
+        When the server is unreachable, or does not answer in time.
+    RuntimeError
+        When the server fails to answer the request.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        send_message(sock, request)
+        response = receive_message(sock)
+    if 'error' in response:
+        raise RuntimeError(response['error'])
+    return response['result']
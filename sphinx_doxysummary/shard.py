@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sharded build of the symbol store and of the rst files.
+
+A build is split into ``n`` shards by the config variable
+``doxysummary_shard = (i, n)``. Shard ``i`` parses the index of each Doxygen
+project, but only the compound files whose refid is assigned to it (plus the
+compound files defining its entries), and renders only the rst files of the
+entries whose first item is defined in one of its compounds. Entries which
+cannot be resolved from the index alone (e.g. inherited members) require the
+compound files of all classes, where base classes are recorded. The assignment
+uses the CRC-32 of the refids, so that it is stable across machines and Python
+processes.
+
+Instead of writing the rst files in the source directory, each shard saves an
+artifact in the directory ``doxysummary_shard_dir``::
+
+    shard-<i>-of-<n>/
+        store.pickle    # items of the Doxygen projects, and refids loaded
+        stubs/...       # rst files, relative to the source directory
+
+The artifacts are combined, without parsing any XML file, by the command
+``python -m sphinx_doxysummary merge`` (which writes a single artifact
+``shard-0-of-1``), or by a Sphinx build with ``doxysummary_merge_shards =
+True`` (which registers the items and writes the rst files in the source
+directory).
+"""
+
+import os
+import pickle
+import re
+import zlib
+
+from typing import Any, Dict, List, Tuple
+
+from sphinx.application import Sphinx
+from sphinx.config import Config
+from sphinx.ext.autosummary import get_rst_suffix
+from sphinx.util import logging
+from sphinx.util.osutil import ensuredir
+
+from sphinx_doxysummary.cache import get_record_cache
+from sphinx_doxysummary.generate import (DoxySummaryEntry, DoxySummaryRenderer,
+                                         GenerationPlan, find_genfiles,
+                                         preflight_entries, render_generated_files,
+                                         scan_directives, write_if_changed)
+from sphinx_doxysummary.inventory import is_inventory, read_inventory
+from sphinx_doxysummary.utils import build_mode, doxygen_projects, split_name
+from sphinx_doxysummary.xmltree import (apply_record, clear_xml_tree, compound_files,
+                                        compound_refid, extract_records,
+                                        parse_index, project_items, register_item)
+
+logger = logging.getLogger(__name__)
+
+artifact_version = 3
+"""Version of the format of shard artifacts."""
+
+artifact_re = re.compile(r'^shard-(\d+)-of-(\d+)$')
+"""Regex of the directory name of a shard artifact."""
+
+
+def shard_of(key: str, n: int) -> int:
+    """Get the shard to which a key (e.g. a refid) is assigned.
+
+    Examples
+    --------
+    >>> shard_of('classexample_1_1Example', 4)
+    1
+    """
+    return zlib.crc32(key.encode('utf-8')) % n
+
+
+def parse_shard(value: Any) -> Tuple[int, int]:
+    """Read the value of the config variable ``doxysummary_shard``.
+
+    Parameters
+    ----------
+    value: Any
+        Tuple ``(i, n)``, or string ``"i/n"`` or ``"i,n"`` (e.g. given with
+        ``-D doxysummary_shard=0/4``).
+
+    Return
+    ------
+    Tuple[int, int]
+        Index of the shard and number of shards.
+
+    Raises
+    ------
+    ValueError
+        When the value is not a valid shard.
+
+    Examples
+    --------
+    >>> parse_shard('1/4')
+    (1, 4)
+    >>> parse_shard((0, 2))
+    (0, 2)
+    """
+    if isinstance(value, str):
+        value = re.split(r'\s*[/,]\s*', value.strip())
+    try:
+        index, count = (int(x) for x in value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid shard {value!r}, expected (i, n)') from None
+    if not 0 <= index < count:
+        raise ValueError(f'Invalid shard {value!r}, expected 0 <= i < n')
+    return index, count
+
+
+def artifact_path(shard_dir: str, index: int, count: int) -> str:
+    """Get the directory of the artifact of a shard."""
+    return os.path.join(shard_dir, f'shard-{index}-of-{count}')
+
+
+def save_artifact(path: str, artifact: Dict[str, Any]) -> None:
+    """Save a shard artifact.
+
+    Parameters
+    ----------
+    path: str
+        Directory of the artifact.
+    artifact: Dict[str, Any]
+        Artifact with keys ``version``, ``shard`` (tuple ``(i, n)``),
+        ``projects`` (list of ``(items, refids loaded)`` ordered as the config
+        variable ``doxygen_xml``) and ``stubs`` (map of rst file path relative
+        to the source directory -> content).
+    """
+    stubs = artifact['stubs']
+    ensuredir(path)
+    with open(os.path.join(path, 'store.pickle'), 'wb') as store_file:
+        pickle.dump({key: value for key, value in artifact.items() if key != 'stubs'},
+                    store_file, protocol=pickle.HIGHEST_PROTOCOL)
+    for stub_name, content in stubs.items():
+        stub_fname = os.path.join(path, 'stubs', *stub_name.split('/'))
+        ensuredir(os.path.dirname(stub_fname))
+        with open(stub_fname, 'w') as stub_file:
+            stub_file.write(content)
+
+
+def load_artifact(path: str) -> Dict[str, Any]:
+    """Load a shard artifact saved by :func:`save_artifact`.
+
+    Raises
+    ------
+    ValueError
+        When the artifact has been saved by another version of the format.
+    """
+    with open(os.path.join(path, 'store.pickle'), 'rb') as store_file:
+        artifact = pickle.load(store_file)
+    if artifact.get('version') != artifact_version:
+        raise ValueError(f'Shard artifact {path} has an unsupported version')
+    stubs_dir = os.path.join(path, 'stubs')
+    artifact['stubs'] = {}
+    for dirpath, _, filenames in sorted(os.walk(stubs_dir)):
+        for filename in sorted(filenames):
+            stub_fname = os.path.join(dirpath, filename)
+            stub_name = os.path.relpath(stub_fname, stubs_dir).replace(os.sep, '/')
+            with open(stub_fname, 'r') as stub_file:
+                artifact['stubs'][stub_name] = stub_file.read()
+    return artifact
+
+
+def load_artifacts(shard_dir: str) -> List[Dict[str, Any]]:
+    """Load all artifacts of a sharded build.
+
+    Parameters
+    ----------
+    shard_dir: str
+        Directory containing the artifacts ``shard-<i>-of-<n>``.
+
+    Return
+    ------
+    List[Dict[str, Any]]
+        Artifacts, sorted by shard index.
+
+    Raises
+    ------
+    ValueError
+        When shards are missing, or belong to builds with different numbers of
+        shards.
+    """
+    found: Dict[Tuple[int, int], str] = {}
+    for name in os.listdir(shard_dir):
+        m = artifact_re.match(name)
+        if m:
+            found[(int(m.group(1)), int(m.group(2)))] = os.path.join(shard_dir, name)
+    counts = {count for _, count in found}
+    if len(counts) != 1:
+        raise ValueError(f'Expected the artifacts of one sharded build in '
+                         f'{shard_dir}, found {sorted(found)}')
+    count = counts.pop()
+    missing = [index for index in range(count) if (index, count) not in found]
+    if missing:
+        raise ValueError(f'Missing shards {missing} of {count} in {shard_dir}')
+    return [load_artifact(found[(index, count)]) for index in range(count)]
+
+
+def merge_artifacts(artifacts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine the artifacts of all shards into the artifact of a single shard.
+
+    The data of an item is taken from the shard which loaded it. When two
+    shards rendered the same rst file with different contents, the file of the
+    first shard is kept.
+
+    Parameters
+    ----------
+    artifacts: List[Dict[str, Any]]
+        Artifacts of the shards, sorted by shard index.
+
+    Return
+    ------
+    Dict[str, Any]
+        Merged artifact (shard ``(0, 1)``).
+
+    Raises
+    ------
+    ValueError
+        When the artifacts do not have the same Doxygen projects.
+    """
+    if len({len(artifact['projects']) for artifact in artifacts}) != 1:
+        raise ValueError('Shard artifacts have different numbers of Doxygen projects')
+
+    projects = []
+    for project_shards in zip(*(artifact['projects'] for artifact in artifacts)):
+        merged = {item.refid: item for item in project_shards[0][0]}
+        loaded = set()
+        for items, shard_loaded in project_shards:
+            for item in items:
+                if item.refid in shard_loaded:
+                    merged[item.refid] = item
+            loaded |= shard_loaded
+        projects.append((list(merged.values()), loaded))
+
+    stubs: Dict[str, str] = {}
+    for artifact in artifacts:
+        for stub_name, content in artifact['stubs'].items():
+            if stub_name not in stubs:
+                stubs[stub_name] = content
+            elif stubs[stub_name] != content:
+                logger.warning('doxysummary: %s rendered differently by shard %d '
+                               'of %d, file of the first shard kept', stub_name,
+                               *artifact['shard'])
+    return {'version': artifact_version, 'shard': (0, 1), 'projects': projects,
+            'stubs': stubs}
+
+
+def get_shard_dir(app: Sphinx) -> str:
+    """Get the directory of shard artifacts (config variable
+    ``doxysummary_shard_dir``, relative to the configuration directory)."""
+    return os.path.join(app.confdir, app.config.doxysummary_shard_dir)
+
+
+def process_exclude_shard_dir(app: Sphinx, config: Config) -> None:
+    """Exclude the directory of shard artifacts from the documents, when it
+    is in the source directory.
+
+    The rst files saved in the artifacts are copies of generated files, so that
+    reading them would declare each C++ item twice. This function must be
+    called when the configuration is initialized.
+
+    Parameters
+    ----------
+    app : Sphinx
+        Sphinx application.
+    config : Config
+        Configuration of the application.
+    """
+    shard_dir = os.path.join(app.confdir, config.doxysummary_shard_dir)
+    relpath = os.path.relpath(shard_dir, app.srcdir)
+    if relpath == os.curdir or relpath.split(os.sep)[0] == os.pardir:
+        return
+    pattern = relpath.replace(os.sep, '/')
+    if pattern not in config.exclude_patterns:
+        config.exclude_patterns = [*config.exclude_patterns, pattern]
+
+
+def process_build_shard(app: Sphinx) -> None:
+    """Parse the compound files and render the rst files of one shard, and
+    save them as an artifact.
+
+    This function must be called at initialization of Sphinx's building
+    process. It does nothing if the config variable ``doxysummary_shard`` is
+    not set. No rst file is written in the source directory.
+
+    Parameters
+    ----------
+    app : Sphinx
+        Sphinx application.
+
+    Raises
+    ------
+    ValueError
+        When the shard is invalid, or an entry cannot be resolved.
+    """
+    if build_mode(app.config) != 'shard':
+        return
+
+    index, count = parse_shard(app.config.doxysummary_shard)
+    engine = app.config.doxysummary_xml_engine
+    cache = get_record_cache(app)
+    extract = cache.records if cache is not None else extract_records
+    clear_xml_tree()
+    config_projects = doxygen_projects(app.config)
+    xmldirs = [xmldir for _, xmldir in config_projects]
+
+    # step1: read the names of all items, needed to resolve the entries
+    indexes = [{item.refid: item for item in read_inventory(xmldir)}
+               if is_inventory(xmldir) else parse_index(xmldir)
+               for xmldir in xmldirs]
+    for (project, _), index_data in zip(config_projects, indexes):
+        for item in index_data.values():
+            register_item(item, project)
+
+    # step2: keep the entries whose first item is in a compound of the shard,
+    # and load the compounds of the shard and the compounds of its entries
+    doxysummaries = []
+    deferred = []
+    wanted_compounds = set()
+
+    def keep_if_owned(doxysummary: DoxySummaryEntry) -> None:
+        items = project_items(split_name(doxysummary.fullname)[1], doxysummary.project)
+        if shard_of(compound_refid(items[0].refid), count) == index:
+            doxysummaries.append(doxysummary)
+            wanted_compounds.update(compound_refid(item.refid) for item in items)
+
+    for doxysummary in scan_directives(app, find_genfiles(app)):
+        try:
+            keep_if_owned(doxysummary)
+        except ValueError:  # may be inherited, bases are in compound files
+            deferred.append(doxysummary)
+    if deferred:
+        wanted_compounds.update(item.refid for index_data in indexes
+                                for item in index_data.values()
+                                if item.kind in ('class', 'struct', 'union'))
+
+    projects = []
+    parsed = 0
+    for xmldir, index_data in zip(xmldirs, indexes):
+        if is_inventory(xmldir):  # items of inventories are complete
+            projects.append((list(index_data.values()), set(index_data)))
+            continue
+        loaded = set()
+        for xml_fname in compound_files(xmldir):
+            compound = os.path.splitext(os.path.basename(xml_fname))[0]
+            if shard_of(compound, count) != index and compound not in wanted_compounds:
+                continue
+            parsed += 1
+            for record in extract(xml_fname, engine):
+                if record['refid'] in index_data:
+                    apply_record(index_data[record['refid']], record)
+                    loaded.add(record['refid'])
+        projects.append((list(index_data.values()), loaded))
+    if cache is not None:
+        cache.report()
+
+    for doxysummary in deferred:
+        keep_if_owned(doxysummary)
+
+    # step3: render the rst files of the entries
+    plan = GenerationPlan(app.srcdir, get_rst_suffix(app))
+    for doxysummary in doxysummaries:
+        doxysummary.resolve()
+        plan.add(doxysummary)
+    renderer = DoxySummaryRenderer(app)
+    stubs = {}
+    for generated_filename, job in plan.jobs.items():
+        for filename, content in render_generated_files(renderer, generated_filename,
+                                                        job).items():
+            stub_name = os.path.relpath(filename, app.srcdir).replace(os.sep, '/')
+            stubs[stub_name] = content
+
+    path = artifact_path(get_shard_dir(app), index, count)
+    save_artifact(path, {'version': artifact_version, 'shard': (index, count),
+                         'projects': projects, 'stubs': stubs})
+    logger.info('[doxysummary] shard %d of %d: %d compound files, %d rst files '
+                'saved in %s', index, count, parsed, len(stubs), path)
+
+
+def process_merge_shards(app: Sphinx) -> None:
+    """Combine the artifacts of a sharded build: register the items of the
+    Doxygen projects and write the rst files in the source directory.
+
+    This function must be called at initialization of Sphinx's building
+    process. It does nothing if the config variable
+    ``doxysummary_merge_shards`` is not set. No XML file is parsed.
+
+    Parameters
+    ----------
+    app : Sphinx
+        Sphinx application.
+
+    Raises
+    ------
+    ValueError
+        When artifacts are missing or do not match the Doxygen projects of the
+        configuration, or an entry cannot be resolved.
+    """
+    if build_mode(app.config) != 'merge':
+        return
+
+    artifact = merge_artifacts(load_artifacts(get_shard_dir(app)))
+    projects = doxygen_projects(app.config)
+    if len(artifact['projects']) != len(projects):
+        raise ValueError('Shard artifacts do not match the Doxygen projects of '
+                         'the config variable doxygen_xml')
+    clear_xml_tree()
+    for (project, _), (items, _) in zip(projects, artifact['projects']):
+        for item in items:
+            register_item(item, project)
+
+    # entries are resolved for the directives, rst files come from the shards
+    preflight_entries(scan_directives(app, find_genfiles(app)),
+                      app.config.doxysummary_preflight)
+    for stub_name, content in artifact['stubs'].items():
+        write_if_changed(os.path.join(app.srcdir, *stub_name.split('/')), content,
+                         force=True)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Side-store of the data of doxysummary, kept out of the build environment.
+
+Sphinx unpickles the whole build environment when it starts and pickles it
+after reading the documents, even in builds which read no document with a
+``doxysummary`` directive. The bulk data of the extension is therefore saved
+in separate files of the doctree directory, one per key, each loaded at its
+first use and written only if it changed::
+
+    doxysummary_store/
+        entries.pickle    # resolved entries of each document
+        refids.pickle     # refids of the items listed by each document
+        xml.pickle        # fingerprints and digests of the xml files
+
+The build environment only holds a small handle (``env.doxysummary_store``):
+the format version, a token identifying the store of the environment, and the
+keys of the stored data (names of documents, or xml directories). Files
+written with another token (e.g. when the environment was not saved after a
+failed build, or with ``sphinx-build -E``) are ignored.
+"""
+
+import os
+import pickle
+import uuid
+
+from typing import Any, Callable, Dict, Set, Tuple
+
+from sphinx.application import Sphinx
+from sphinx.environment import BuildEnvironment
+from sphinx.util import logging
+from sphinx.util.osutil import ensuredir
+
+logger = logging.getLogger(__name__)
+
+store_version = 2
+"""Version of the format of the side-store."""
+
+store_dirname = 'doxysummary_store'
+"""Name of the directory of the side-store in the doctree directory."""
+
+
+class SideStore:
+    """Values saved in files next to the build environment, loaded on demand.
+
+    Attributes
+    ----------
+    directory: str
+        Directory of the files of the store.
+    token: str
+        Token identifying the store of a build environment.
+    values: Dict[str, Any]
+        Values loaded or set in this process.
+    dirty: Set[str]
+        Keys of the values to be saved.
+    documents: Dict[str, Set[str]]
+        Map of key -> documents with data in the saved value (copied to the
+        handle of the build environment).
+    purged: Set[str]
+        Documents read again, whose refids are removed when the store is saved.
+    """
+
+    def __init__(self, directory: str, token: str,
+                 documents: Dict[str, Set[str]] = None):
+        """
+        Parameters
+        ----------
+        directory: str
+            Directory of the files of the store.
+        token: str
+            Token of the store. Files written with another token are ignored.
+        documents: Dict[str, Set[str]], optional
+            Documents with data in the saved values (from the handle).
+        """
+        self.directory = directory
+        self.token = token
+        self.values: Dict[str, Any] = {}
+        self.dirty: Set[str] = set()
+        self.documents: Dict[str, Set[str]] = documents or {}
+        self.purged: Set[str] = set()
+
+    def path(self, key: str) -> str:
+        """Get the path of the file of a key."""
+        return os.path.join(self.directory, key + '.pickle')
+
+    def load(self, key: str, default: Callable[[], Any] = dict) -> Any:
+        """Read the saved value of a key (``default()`` if there is none)."""
+        try:
+            with open(self.path(key), 'rb') as f:
+                version, token, value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return default()
+        if version != store_version or token != self.token:
+            return default()
+        return value
+
+    def get(self, key: str, default: Callable[[], Any] = dict) -> Any:
+        """Get the value of a key, loading it at its first use. The returned
+        value may be modified in place, see :meth:`touch`."""
+        if key not in self.values:
+            self.values[key] = self.load(key, default)
+        return self.values[key]
+
+    def set(self, key: str, value: Any) -> None:
+        """Replace the value of a key."""
+        self.values[key] = value
+        self.dirty.add(key)
+
+    def touch(self, key: str) -> None:
+        """Mark the value of a key as modified."""
+        self.dirty.add(key)
+
+    def discard(self, key: str) -> None:
+        """Forget the value of a key set in this process, so that the saved
+        value is kept."""
+        self.values.pop(key, None)
+        self.dirty.discard(key)
+
+    def save(self) -> None:
+        """Write the modified values (to a temporary file renamed, so that a
+        failed write leaves the previous file)."""
+        if not self.dirty:
+            return
+        ensuredir(self.directory)
+        for key in sorted(self.dirty):
+            value = self.values[key]
+            tmp_path = f'{self.path(key)}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((store_version, self.token, value), f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path(key))
+            self.documents[key] = set(value)
+        self.dirty.clear()
+
+    def handle(self) -> Tuple[int, str, Dict[str, Set[str]]]:
+        """Get the handle stored in the build environment."""
+        return store_version, self.token, self.documents
+
+
+_stores: Dict[str, SideStore] = {}  # stores of this process, by doctree directory
+
+
+def get_store(env: BuildEnvironment) -> SideStore:
+    """
+    Get the side-store of a build environment.
+
+    A new store is created (and the handle of the environment set) if the
+    environment has no handle yet or a handle of another format version.
+    Forked processes of parallel builds inherit the values already loaded.
+
+    Parameters
+    ----------
+    env: BuildEnvironment
+        Build environment.
+
+    Return
+    ------
+    SideStore
+        Store of the environment.
+    """
+    handle = getattr(env, 'doxysummary_store', None)
+    if handle is None or handle[0] != store_version:
+        store = SideStore(os.path.join(env.doctreedir, store_dirname), uuid.uuid4().hex)
+        env.doxysummary_store = store.handle()
+        _stores[str(env.doctreedir)] = store
+        return store
+    store = _stores.get(str(env.doctreedir))
+    if store is None or store.token != handle[1]:  # store of another environment
+        store = SideStore(os.path.join(env.doctreedir, store_dirname), handle[1],
+                          {key: set(docnames) for key, docnames in handle[2].items()})
+        _stores[str(env.doctreedir)] = store
+    return store
+
+
+def process_save_store(app: Sphinx, env: BuildEnvironment) -> None:
+    """
+    Save the side-store after the documents are read, before the build
+    environment is pickled (event ``env-updated``).
+
+    The refids recorded by the directives of the documents read in this build
+    (``env.doxysummary_refids``, see
+    :func:`sphinx_doxysummary.generate.document_refids`) are moved to the
+    store, replacing the refids of the documents read again.
+    """
+    store = get_store(env)
+    new_refids = getattr(env, 'doxysummary_refids', {})
+    if new_refids or store.purged & store.documents.get('refids', set()):
+        refids = store.get('refids')
+        for docname in store.purged:
+            refids.pop(docname, None)
+        refids.update(new_refids)
+        store.touch('refids')
+    store.purged.clear()
+    env.doxysummary_refids = {}
+    store.save()
+    env.doxysummary_store = store.handle()
@@ -6,12 +6,16 @@ Created on Tue Jun 21 21:36:51 2022
 @author: quocdang
 """
 
+import hashlib
+import os
 import re
 
-from typing import Any, Dict, List, Tuple, Set
+from typing import Any, List, Tuple, Set
 
 from lxml import etree
 
+from sphinx_doxysummary.declarator import canonical_type
+
 keywords = [
     'alignas', 'alignof', 'and', 'and_eq', 'asm', 'auto', 'bitand', 'bitor',
     'bool', 'break', 'case', 'catch', 'char', 'char8_t', 'char16_t', 'char32_t',
@@ -112,7 +116,11 @@ def tokenize_arg(argument: str) -> List[Set[str]]:
 
 def compare_type(arg1: str, arg2: str, arg2_declarator: str = '') -> bool:
     """Check if type of 2 arguments are the same.
-    
+
+    Both arguments are reduced to their canonical keys by the declarator
+    parser (see :func:`sphinx_doxysummary.declarator.canonical_type`) and the
+    keys are compared.
+
     Parameters
     ----------
     arg1: str
@@ -123,12 +131,12 @@ def compare_type(arg1: str, arg2: str, arg2_declarator: str = '') -> bool:
         Full declarator of the second argument. This is useful for declarations
         whose array bounds or argument name are outside Doxygen's ``type`` XML
         node.
-    
+
     Return
     ------
     bool
         True if 2 arguments have the same type.
-    
+
     Examples
     --------
     >>> compare_type('const int a', 'int const')  # normal case
@@ -146,6 +154,52 @@ def compare_type(arg1: str, arg2: str, arg2_declarator: str = '') -> bool:
     >>> compare_type('void', '')
     True
     """
+    key1 = canonical_type(arg1)
+    if key1 == canonical_type(arg2):
+        return True
+    return bool(arg2_declarator) and key1 == canonical_type(arg2_declarator)
+
+
+def compare_type_heuristic(arg1: str, arg2: str, arg2_declarator: str = '') -> bool:
+    """Check if type of 2 arguments are the same with the regex heuristics
+    used before the declarator parser.
+
+    This function is kept as a reference for checking that the parser picks
+    the same overloads.
+    
+    Parameters
+    ----------
+    arg1: str
+        First argument.
+    arg2: str
+        Second argument.
+    arg2_declarator: str, optional
+        Full declarator of the second argument. This is useful for declarations
+        whose array bounds or argument name are outside Doxygen's ``type`` XML
+        node.
+    
+    Return
+    ------
+    bool
+        True if 2 arguments have the same type.
+    
+    Examples
+    --------
+    >>> compare_type_heuristic('const int a', 'int const')  # normal case
+    True
+    >>> compare_type_heuristic('const int * a', 'int *')  # without specifier
+    False
+    >>> compare_type_heuristic('const int &', 'int const &')  # change specifier position
+    True
+    >>> compare_type_heuristic('std::vector<const double *> &', 'std::vector<double const> &')  # template
+    False
+    >>> compare_type_heuristic('int(&)[3]', 'int(&) a', 'int(&a)[3]')
+    True
+    >>> compare_type_heuristic('int(*)(double)', 'int(*)(double) callback')
+    True
+    >>> compare_type_heuristic('void', '')
+    True
+    """
     def compare_declarator() -> bool:
         """Patch for array declaration."""
         return (normalize_declarator_args(arg1) ==
@@ -224,7 +278,7 @@ def compare_type(arg1: str, arg2: str, arg2_declarator: str = '') -> bool:
                 if len(template1) != len(template2):
                     return False
                 for tparam1, tparam2 in zip(template1, template2):
-                    if not compare_type(tparam1, tparam2):
+                    if not compare_type_heuristic(tparam1, tparam2):
                         return False
             else:
                 return compare_declarator()
@@ -312,6 +366,69 @@ def split_name(name: str) -> List[str]:
     return [restype, func_name, args]
 
 
+def split_scope(name: str) -> List[str]:
+    """Split a scoped item name into its scope components.
+
+    Separators ``::`` inside template brackets are ignored, and an operator
+    name is always kept as the last component.
+
+    Parameters
+    ----------
+    name: str
+        Scoped name of the item (without return type and arguments).
+
+    Return
+    ------
+    List[str]
+        List of components from the outermost scope to the item name.
+
+    Examples
+    --------
+    >>> split_scope('spam::Spam::operator<')
+    ['spam', 'Spam', 'operator<']
+    >>> split_scope('std::map<int, std::string>::iterator')
+    ['std', 'map<int, std::string>', 'iterator']
+    >>> split_scope('Foo')
+    ['Foo']
+    """
+    operator = ''
+    m = re.search(r'(?:^|::)(operator\b.*)$', name)
+    if m:
+        operator = m.group(1)
+        name = name[:m.start()]
+    components: List[str] = []
+    depth = 0
+    start = 0
+    i = 0
+    while i < len(name):
+        c = name[i]
+        if c == '<':
+            depth += 1
+        elif c == '>':
+            depth -= 1
+        elif depth == 0 and name.startswith('::', i):
+            components.append(name[start:i])
+            start = i + 2
+            i += 1
+        i += 1
+    if start < len(name):
+        components.append(name[start:])
+    if operator:
+        components.append(operator)
+    return components
+
+
+def split_using(option: str) -> List[str]:
+    """Split the value of the ``:using:`` option into namespace names.
+
+    Examples
+    --------
+    >>> split_using('std, example::inner')
+    ['std', 'example::inner']
+    """
+    return [ns for ns in re.split(r'[\s,]+', option.strip()) if ns]
+
+
 def fullname_to_filename(item_name: str, suffix: str):
     """
     Convert special characters in item fullname to valid filename characters.
@@ -341,3 +458,131 @@ def fullname_to_filename(item_name: str, suffix: str):
 
     return file_name + suffix
 
+
+stub_layouts = ('flat', 'scope', 'hash')
+"""Layouts of the generated rst files (see :func:`stub_docname`)."""
+
+
+def bound_filename(file_name: str, max_length: int) -> str:
+    """
+    Shorten a filename longer than ``max_length`` characters: it is cut and
+    ended by a hash of the full name, so shortened names stay distinct (a
+    shortened name has at least 10 characters).
+
+    Examples
+    --------
+    >>> bound_filename('a_very_long_function_name', 20)
+    'a_very_long-908c7efd'
+    """
+    if not max_length or len(file_name) <= max_length:
+        return file_name
+    digest = hashlib.sha1(file_name.encode('utf-8')).hexdigest()[:8]
+    return file_name[:max(max_length - 9, 1)] + '-' + digest
+
+
+def stub_docname(fullname: str, layout: str = 'flat', max_length: int = 0) -> str:
+    """
+    Get the path of the generated rst file of an item, relative to the
+    ``toctree`` directory and without suffix.
+
+    Parameters
+    ----------
+    fullname: str
+        Full name of the item, with the arguments of a function.
+    layout: str, optional
+        ``'flat'`` puts all files in the ``toctree`` directory, ``'scope'``
+        puts them in one subdirectory per enclosing scope, and ``'hash'`` in
+        256 subdirectories named after a hash of the full name.
+    max_length: int, optional
+        Maximal length of each component of the path (no limit if 0, see
+        :func:`bound_filename`).
+
+    Return
+    ------
+    str
+        Path with ``/`` separators.
+
+    Raises
+    ------
+    ValueError
+        When the layout is unknown.
+
+    Examples
+    --------
+    >>> stub_docname('spam::Spam::eat(int)')
+    'spam.Spam.eat6int9'
+    >>> stub_docname('spam::Spam::eat(int)', 'scope')
+    'spam/Spam/eat6int9'
+    >>> stub_docname('spam::Spam::eat(int)', 'hash')
+    'ac/spam.Spam.eat6int9'
+    """
+    file_name = fullname_to_filename(fullname, '')
+    if layout == 'flat':
+        components = [file_name]
+    elif layout == 'hash':
+        components = [hashlib.sha1(file_name.encode('utf-8')).hexdigest()[:2], file_name]
+    elif layout == 'scope':
+        _, item_name, func_args = split_name(fullname)
+        components = [fullname_to_filename(c, '') for c in split_scope(item_name)]
+        components[-1] = fullname_to_filename(split_scope(item_name)[-1] + func_args, '')
+    else:
+        raise ValueError(f'Unknown stub layout "{layout}", expected one of '
+                         + ', '.join(stub_layouts))
+    return '/'.join(bound_filename(c, max_length) for c in components)
+
+
+def build_mode(config: Any) -> str:
+    """
+    Get the way XML files are read and rst files are generated, from the config
+    variables ``doxysummary_merge_shards``, ``doxysummary_shard`` and
+    ``doxysummary_pipeline`` and ``doxysummary_incremental`` (in order of
+    precedence).
+
+    Parameters
+    ----------
+    config: sphinx.config.Config
+        Sphinx configuration.
+
+    Return
+    ------
+    str
+        ``'merge'``, ``'shard'``, ``'pipeline'``, ``'incremental'`` or
+        ``'default'``.
+    """
+    if config.doxysummary_merge_shards:
+        return 'merge'
+    if config.doxysummary_shard:
+        return 'shard'
+    if config.doxysummary_pipeline:
+        return 'pipeline'
+    if config.doxysummary_incremental:
+        return 'incremental'
+    return 'default'
+
+
+def doxygen_projects(config: Any) -> List[Tuple[str, str]]:
+    """
+    Get the names and locations of the Doxygen projects of the config variable
+    ``doxygen_xml``.
+
+    ``doxygen_xml`` is either a map of project name -> location, or a list of
+    locations. In the latter case, a project is named after the entry of
+    ``breathe_projects`` with the same location, or after its location as
+    written in ``doxygen_xml``.
+
+    Parameters
+    ----------
+    config: sphinx.config.Config
+        Sphinx configuration.
+
+    Return
+    ------
+    List[Tuple[str, str]]
+        Pairs (name, absolute location) of the projects.
+    """
+    if isinstance(config.doxygen_xml, dict):
+        return [(name, os.path.abspath(path)) for name, path in config.doxygen_xml.items()]
+    breathe_names = {os.path.abspath(path): name for name, path
+                     in (getattr(config, 'breathe_projects', None) or {}).items()}
+    return [(breathe_names.get(os.path.abspath(path), path), os.path.abspath(path))
+            for path in config.doxygen_xml]
@@ -6,17 +6,24 @@ Created on Tue Jun 21 21:36:51 2022
 @author: quocdang
 """
 
+import difflib
 import os
+import re
+import threading
 from pathlib import Path
 
-from typing import Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Tuple
 
 from sphinx.application import Sphinx
+from sphinx.util import logging
 
 from xml.dom.minidom import parse
 from lxml import etree
 
-from sphinx_doxysummary.utils import compare_type, get_first_child_by_tag_name
+from sphinx_doxysummary.declarator import canonical_args, canonical_type
+from sphinx_doxysummary.utils import build_mode, doxygen_projects, split_scope
+
+logger = logging.getLogger(__name__)
 
 class DoxygenItem:
     """Item read from Doxygen generated xml.
@@ -31,11 +38,22 @@ class DoxygenItem:
         Reference ID of the item.
     summary: str
         Brief description of the item.
+    description: str
+        Detailed description of the item (paragraphs separated by blank
+        lines).
+    protection: str
+        Protection of the item (``public``, ``protected``, ``private``, or
+        empty for items outside classes).
+    type: str
+        Type of a variable or of a typedef.
     args: List[Tuple[str, str]]
         Arguments of a function in the form of a list of pairs (argtype,
-        argname).
+        argname). Array bounds of the argument are part of the argtype.
     return_type: str
         Return type of the function.
+    bases: List[Tuple[str, str]]
+        Direct base classes of a class, as pairs (refid, name). The refid is
+        empty for classes not documented by Doxygen.
     overload: bool
         Wether function is overloaded by another function or not.
     """
@@ -60,21 +78,15 @@ class DoxygenItem:
 
         # initialize default attributes
         self.summary = ''
+        self.description = ''
+        self.protection = ''
+        self.type = ''
         self.args: List[Tuple[str, str]] = None
         self.argsstring: str = ''
         self.return_type: str = ''
+        self.bases: List[Tuple[str, str]] = []
         self.overloaded: bool = False
 
-        # append name to all_functions to set overload property
-        if self.kind == 'function':
-            global all_functions
-            # firstly appear
-            if self.name not in all_functions.keys():
-                all_functions[self.name] = self
-            else:
-                all_functions[self.name].overloaded = True
-                self.overloaded = True
-
     def __repr__(self):
         """Output when print this object."""
         return f'{self.name:<30s} {self.kind:<10s} {self.summary}'
@@ -92,6 +104,16 @@ class DoxygenItem:
         """
         self.summary = summary
 
+    def set_bases(self, bases: List[Tuple[str, str]]):
+        """Set the direct base classes of the item if the item is a class.
+
+        Parameters
+        ----------
+        bases: List[Tuple[str, str]]
+            Pairs (refid, name) of the base classes.
+        """
+        self.bases = bases
+
     @property
     def has_summary(self) -> bool:
         """Check if the item has a summary or not."""
@@ -154,31 +176,770 @@ class DoxygenItem:
         >>> d.check_args('(char a, char b)')
         >>> d.check_args('(double *, int)')
         """
-        args = args[1:-1]  # trim off ()
-        args: List[str] = [x.strip() for x in args.split(',')]
+        return canonical_args(args) == self.arg_keys
 
-        # perform simple heuristic check
-        if len(args) != len(self.args):
-            return False
-        for arg, xml_arg in zip(args, self.args):
-            xml_arg_copy = ' '.join(xml_arg)
-            if not compare_type(arg, xml_arg_copy, self.argsstring):
-                return False
-        return True
+    @property
+    def arg_keys(self) -> List[str]:
+        """Canonical keys of the argument types (see
+        :func:`sphinx_doxysummary.declarator.canonical_type`), computed once.
+        """
+        keys = self.__dict__.get('_arg_keys')
+        if keys is None:
+            keys = [canonical_type(argtype) for argtype, _ in self.args or []]
+            if keys == ['void']:
+                keys = []
+            self._arg_keys = keys
+        return keys
+
+
+class SymbolIndex:
+    """Look-up tables of the items of one or several Doxygen projects.
+
+    Attributes
+    ----------
+    xml_tree: Dict[str, List[DoxygenItem]]
+        Map of item names to a list of corresponding DoxygenItem objects.
+    scope_index: Dict[str, Dict[str, str]]
+        Map of scope names to their direct children (local name -> full name).
+    refid_names: Dict[str, str]
+        Map of refids to item names.
+    linearized_bases: Dict[str, List[str]]
+        Memo of :meth:`base_classes` (class name -> names of all its bases).
+    all_functions: Dict[str, DoxygenItem]
+        First function registered with each name, to detect overloads.
+    """
+
+    def __init__(self):
+        self.xml_tree: Dict[str, List[DoxygenItem]] = {}
+        self.scope_index: Dict[str, Dict[str, str]] = {}
+        self.refid_names: Dict[str, str] = {}
+        self.linearized_bases: Dict[str, List[str]] = {}
+        self.all_functions: Dict[str, DoxygenItem] = {}
 
+    def register(self, item: DoxygenItem) -> None:
+        """Add an item to ``xml_tree`` and to the hierarchical ``scope_index``.
+
+        Parameters
+        ----------
+        item: DoxygenItem
+            Item read from Doxygen XML.
+        """
+        # append name to all_functions to set overload property
+        if item.kind == 'function':
+            # firstly appear
+            if item.name not in self.all_functions.keys():
+                self.all_functions[item.name] = item
+            else:
+                self.all_functions[item.name].overloaded = True
+                item.overloaded = True
+        if item.name not in self.xml_tree.keys():
+            self.xml_tree[item.name] = [item]
+        else:
+            self.xml_tree[item.name].append(item)
+        self.refid_names[item.refid] = item.name
+        self.linearized_bases.clear()  # the inheritance graph may change
+        components = split_scope(item.name)
+        if not components:
+            return
+        scope = '::'.join(components[:-1])
+        self.scope_index.setdefault(scope, {})[components[-1]] = item.name
+
+    def clear(self) -> None:
+        """Remove all items."""
+        self.all_functions.clear()
+        self.xml_tree.clear()
+        self.scope_index.clear()
+        self.refid_names.clear()
+        self.linearized_bases.clear()
+
+    def suggest_names(self, name: str, scope: str = '', n: int = 3) -> List[str]:
+        """Get the known names closest to an unresolved name.
+
+        Only the children of the scope the name points to (in the scope and in
+        its enclosing scopes) are compared, so the cost of a suggestion does
+        not depend on the size of the whole project. The candidates of all
+        enclosing scopes are ranked together by similarity, the innermost
+        scope breaking ties.
+
+        Parameters
+        ----------
+        name: str
+            Unresolved name (without return type and arguments).
+        scope: str, optional
+            Scope in which the name was looked up.
+        n: int, optional
+            Maximum number of suggestions.
+
+        Return
+        ------
+        List[str]
+            Full names of the closest matches, best first.
+        """
+        components = split_scope(name)
+        if not components:
+            return []
+        local_name = components[-1]
+        qualifier = '::'.join(components[:-1])
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(local_name)
+        scores: Dict[str, Tuple[float, int]] = {}
+        for distance, enclosing in enumerate(enclosing_scopes(scope)):
+            bucket_name = '::'.join([s for s in (enclosing, qualifier) if s])
+            for candidate, fullname in self.scope_index.get(bucket_name, {}).items():
+                matcher.set_seq1(candidate)
+                if (matcher.real_quick_ratio() < 0.6 or matcher.quick_ratio() < 0.6
+                        or matcher.ratio() < 0.6):
+                    continue
+                score = (-matcher.ratio(), distance)
+                if fullname not in scores or score < scores[fullname]:
+                    scores[fullname] = score
+        return sorted(scores, key=lambda fullname: (scores[fullname], fullname))[:n]
+
+    def direct_bases(self, name: str) -> List[str]:
+        """Get the names of the direct base classes of a class.
+
+        Bases documented by Doxygen are named by their refid; the template
+        arguments of the other bases are removed.
+        """
+        bases: List[str] = []
+        for item in self.xml_tree.get(name, []):
+            for refid, base_name in item.bases:
+                base = (self.refid_names.get(refid)
+                        or re.sub(r'\s+', '', base_name).split('<')[0])
+                if base not in bases:
+                    bases.append(base)
+        return bases
+
+    def base_classes(self, name: str) -> List[str]:
+        """Get the names of all base classes of a class, in lookup order.
+
+        The inheritance graph is linearised depth-first, from left to right,
+        and each base (e.g. a virtual base reached by two paths) is kept once.
+        The result is memoized in ``linearized_bases``, which is cleared when
+        items are registered or the bases of an item are set.
+
+        Parameters
+        ----------
+        name: str
+            Full name of the class.
+
+        Return
+        ------
+        List[str]
+            Full names of the base classes.
+        """
+        bases = self.linearized_bases.get(name)
+        if bases is None:
+            self.linearized_bases[name] = []  # protect against cyclic graphs
+            bases = []
+            for base in self.direct_bases(name):
+                for ancestor in [base] + self.base_classes(base):
+                    if ancestor != name and ancestor not in bases:
+                        bases.append(ancestor)
+            self.linearized_bases[name] = bases
+        return bases
+
+    def resolve_inherited(self, fullname: str) -> str:
+        """Find a member inherited by a class.
 
-all_functions = {}  # Dict[str, List[DoxygenItem]]
-xml_tree = {}  # Dict[str, List[DoxygenItem]]
+        Parameters
+        ----------
+        fullname: str
+            Name of the member, qualified by the derived class (e.g.
+            ``Derived::method``).
+
+        Return
+        ------
+        str
+            Name of the member in the first base class declaring it (e.g.
+            ``Base::method``), or ``None`` if no base declares it.
+        """
+        components = split_scope(fullname)
+        if len(components) < 2:
+            return None
+        for base in self.base_classes('::'.join(components[:-1])):
+            inherited = '::'.join([base, components[-1]])
+            if inherited in self.xml_tree:
+                return inherited
+        return None
+
+    def resolve_name(self, name: str, scope: str = '', using: List[str] = None) -> str:
+        """Find the full name of an item as C++ unqualified name lookup would.
+
+        The name is looked up in ``scope``, then in each of its enclosing
+        scopes, and finally in the namespaces listed in ``using``. Each
+        candidate is a single dictionary lookup, so the cost is proportional
+        to the scope depth. When a candidate is a member of a class which does
+        not declare it, the base classes of the class are searched (see
+        :meth:`resolve_inherited`).
+
+        Parameters
+        ----------
+        name: str
+            Name of the item (without return type and arguments). A leading
+            ``::`` forces the lookup in the global scope.
+        scope: str, optional
+            Scope in which the name is written.
+        using: List[str], optional
+            Namespaces made visible by a ``using`` directive.
+
+        Return
+        ------
+        str
+            Full scope name of the item, as stored in ``xml_tree``.
+
+        Raises
+        ------
+        ValueError
+            When the name is not found. The message lists the closest names.
+        """
+        if name.startswith('::'):
+            name, scope, using = name[2:], '', None
+        candidates = enclosing_scopes(scope) + [u.strip() for u in using or []]
+        for enclosing in candidates:
+            fullname = '::'.join([s for s in (enclosing, name) if s])
+            if fullname in self.xml_tree:
+                return fullname
+            inherited = self.resolve_inherited(fullname)
+            if inherited is not None:
+                return inherited
+        message = f'Item "{name}" not found'
+        if scope:
+            message += f' in scope "{scope}"'
+        suggestions = self.suggest_names(name, scope)
+        if suggestions:
+            message += ', did you mean: ' + ', '.join(suggestions) + '?'
+        raise ValueError(message)
+
+
+symbols = SymbolIndex()
+"""Items of all loaded Doxygen projects."""
+all_functions = symbols.all_functions  # Dict[str, DoxygenItem]
+xml_tree = symbols.xml_tree  # Dict[str, List[DoxygenItem]]
 """Map of item names to a list of corresponding DoxygenItem objects."""
+scope_index = symbols.scope_index  # Dict[str, Dict[str, str]]
+"""Map of scope names to their direct children (local name -> full name)."""
+refid_names = symbols.refid_names  # Dict[str, str]
+"""Map of refids to item names."""
+linearized_bases = symbols.linearized_bases  # Dict[str, List[str]]
+"""Memo of :func:`base_classes` (class name -> names of all its bases)."""
+partitions: Dict[str, SymbolIndex] = {}
+"""Map of project names to the items of each Doxygen project."""
+project_loaders: Dict[str, Callable[[], List[DoxygenItem]]] = {}
+"""Map of project names to the functions loading the projects not loaded
+yet."""
+
+
+def register_item(item: DoxygenItem, project: str = None) -> None:
+    """Add an item to ``xml_tree`` and to the hierarchical ``scope_index``.
+
+    Parameters
+    ----------
+    item: DoxygenItem
+        Item read from Doxygen XML.
+    project: str, optional
+        Name of the Doxygen project of the item. The item is also added to the
+        partition of the project.
+    """
+    symbols.register(item)
+    if project is not None:
+        partitions.setdefault(project, SymbolIndex()).register(item)
+
+
+def add_project(project: str, loader: Callable[[], List[DoxygenItem]]) -> None:
+    """Declare a Doxygen project whose items are loaded on first use.
+
+    Parameters
+    ----------
+    project: str
+        Name of the project.
+    loader: Callable[[], List[DoxygenItem]]
+        Function returning the items of the project.
+    """
+    partitions.setdefault(project, SymbolIndex())
+    project_loaders[project] = loader
+
+
+def load_project(project: str) -> None:
+    """Load the items of a project declared by :func:`add_project`, if they
+    are not loaded yet."""
+    loader = project_loaders.pop(project, None)
+    if loader is not None:
+        for item in loader():
+            register_item(item, project)
+
+
+def symbol_index(project: str = None) -> SymbolIndex:
+    """Get the items of a Doxygen project, loading them if needed.
+
+    Parameters
+    ----------
+    project: str, optional
+        Name of the project. If ``None``, all projects are loaded and the
+        index of all their items is returned.
+
+    Return
+    ------
+    SymbolIndex
+        Items of the project.
+
+    Raises
+    ------
+    ValueError
+        When the project is unknown.
+    """
+    if project is None:
+        for name in list(project_loaders):
+            load_project(name)
+        return symbols
+    if project not in partitions:
+        raise ValueError(f'Unknown Doxygen project "{project}", known projects: '
+                         + ', '.join(partitions))
+    load_project(project)
+    return partitions[project]
+
+
+def project_items(name: str, project: str = None) -> List[DoxygenItem]:
+    """Get the items bearing a full name in a Doxygen project (in all projects
+    if ``project`` is ``None``)."""
+    return symbol_index(project).xml_tree.get(name, [])
+
+
+def clear_xml_tree() -> None:
+    """Remove all items from ``xml_tree``, ``scope_index`` and the partitions
+    (e.g. before reloading the Doxygen projects in the same process)."""
+    symbols.clear()
+    partitions.clear()
+    project_loaders.clear()
+
+
+def suggest_names(name: str, scope: str = '', n: int = 3) -> List[str]:
+    """Get the known names closest to an unresolved name, among the items of
+    all projects (see :meth:`SymbolIndex.suggest_names`)."""
+    return symbols.suggest_names(name, scope, n)
+
+
+def enclosing_scopes(scope: str) -> List[str]:
+    """List a scope and all of its enclosing scopes, innermost first.
+
+    Examples
+    --------
+    >>> enclosing_scopes('spam::Spam')
+    ['spam::Spam', 'spam', '']
+    """
+    components = split_scope(scope.strip())
+    return ['::'.join(components[:i]) for i in range(len(components), -1, -1)]
+
+
+def direct_bases(name: str) -> List[str]:
+    """Get the names of the direct base classes of a class (see
+    :meth:`SymbolIndex.direct_bases`)."""
+    return symbols.direct_bases(name)
+
+
+def base_classes(name: str) -> List[str]:
+    """Get the names of all base classes of a class, in lookup order (see
+    :meth:`SymbolIndex.base_classes`)."""
+    return symbols.base_classes(name)
+
+
+def resolve_inherited(fullname: str) -> str:
+    """Find a member inherited by a class (see
+    :meth:`SymbolIndex.resolve_inherited`)."""
+    return symbols.resolve_inherited(fullname)
+
+
+def resolve_name(name: str, scope: str = '', using: List[str] = None,
+                 project: str = None) -> str:
+    """Find the full name of an item as C++ unqualified name lookup would (see
+    :meth:`SymbolIndex.resolve_name`).
+
+    Parameters
+    ----------
+    name: str
+        Name of the item (without return type and arguments).
+    scope: str, optional
+        Scope in which the name is written.
+    using: List[str], optional
+        Namespaces made visible by a ``using`` directive.
+    project: str, optional
+        Name of the Doxygen project in which the name is looked up. All
+        projects are searched if ``None``.
+
+    Return
+    ------
+    str
+        Full scope name of the item.
+
+    Raises
+    ------
+    ValueError
+        When the name is not found, or the project is unknown.
+    """
+    return symbol_index(project).resolve_name(name, scope, using)
+
+
+record_xslt = etree.XML('''\
+<xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+  <xsl:output method="xml" encoding="UTF-8"/>
+  <xsl:template match="/">
+    <records>
+      <xsl:for-each select="descendant::*[self::compounddef or self::memberdef or self::enumvalue]">
+        <r id="{@id}" prot="{@prot}">
+          <b><xsl:value-of select="briefdescription/*[1]"/></b>
+          <d><xsl:value-of select="detaileddescription/*[1]"/></d>
+          <a><xsl:value-of select="argsstring"/></a>
+          <t><xsl:value-of select="type"/></t>
+          <xsl:for-each select="detaileddescription/para">
+            <x><xsl:value-of select="."/></x>
+          </xsl:for-each>
+          <xsl:for-each select="param">
+            <p n="{declname}"><xsl:value-of select="type"/><xsl:value-of select="array"/></p>
+          </xsl:for-each>
+          <xsl:for-each select="basecompoundref">
+            <i r="{@refid}"><xsl:value-of select="."/></i>
+          </xsl:for-each>
+        </r>
+      </xsl:for-each>
+    </records>
+  </xsl:template>
+</xsl:stylesheet>
+''')
+"""XSLT stylesheet flattening a compound file into one ``<r>`` element per
+item: brief and detailed first paragraphs, argument string, return type, one
+``<x>`` element per paragraph of the detailed description, one ``<p>`` element
+per parameter and one ``<i>`` element per base class."""
+
+_xslt_local = threading.local()
+
+
+def first_line(text: str) -> str:
+    """Get the first line of a stripped text (empty string if none)."""
+    lines = text.strip().splitlines()
+    return lines[0] if lines else ''
+
+
+def join_paragraphs(paragraphs: List[str]) -> str:
+    """Join paragraphs with blank lines, normalizing the spaces of each
+    paragraph and dropping empty ones."""
+    paragraphs = [' '.join(p.split()) for p in paragraphs]
+    return '\n\n'.join(p for p in paragraphs if p)
+
+
+def extract_records(xml_fname: str, engine: str = 'python') -> List[Dict[str, Any]]:
+    """Extract the data of all items defined in a Doxygen compound file.
+
+    Parameters
+    ----------
+    xml_fname: str
+        Path to the compound xml file.
+    engine: str, optional
+        ``'python'`` reads each item definition in a single pass over its
+        children. ``'xslt'`` applies the precompiled stylesheet
+        ``record_xslt`` (run by libxslt) and only assembles its flat output.
+
+    Return
+    ------
+    List[Dict[str, Any]]
+        One record per item, with keys ``refid``, ``summary`` (first line of
+        the first paragraph of the brief description, or of the detailed
+        description if the former is empty), ``description`` (paragraphs of
+        the detailed description), ``protection``, ``argsstring``, ``params``
+        (list of pairs (argtype, argname), or ``None`` if the item has no
+        ``param``), ``return_type`` (type of the item) and ``bases`` (list of
+        pairs (refid, name) of the base classes).
+
+    Raises
+    ------
+    ValueError
+        When the engine is unknown.
+    """
+    xml_file = etree.parse(xml_fname)
+    records: List[Dict[str, Any]] = []
+
+    if engine == 'xslt':
+        transform = getattr(_xslt_local, 'transform', None)
+        if transform is None:  # XSLT objects are compiled once per thread
+            transform = _xslt_local.transform = etree.XSLT(record_xslt)
+        for r in transform(xml_file).getroot():
+            brief, detail, argsstring, return_type = r[:4]
+            params = [(p.text or '', p.get('n')) for p in r[4:] if p.tag == 'p']
+            bases = [(i.get('r'), i.text or '') for i in r[4:] if i.tag == 'i']
+            records.append({
+                'refid': r.get('id'),
+                'summary': first_line(brief.text or '') or first_line(detail.text or ''),
+                'description': join_paragraphs([x.text or '' for x in r[4:] if x.tag == 'x']),
+                'protection': r.get('prot', ''),
+                'argsstring': argsstring.text or '',
+                'params': params or None,
+                'return_type': return_type.text or '',
+                'bases': bases,
+            })
+        return records
+
+    if engine != 'python':
+        raise ValueError(f'Unknown XML extraction engine "{engine}"')
+    for itemdef in xml_file.iter('compounddef', 'memberdef', 'enumvalue'):
+        record = {'refid': itemdef.get('id'), 'summary': '', 'description': '',
+                  'protection': itemdef.get('prot', ''), 'argsstring': '',
+                  'params': None, 'return_type': '', 'bases': []}
+        brief = detail = ''
+        paragraphs: List[str] = []
+        for child in itemdef:  # single pass over the children
+            tag = child.tag
+            if tag == 'briefdescription' and len(child):
+                brief = child[0].xpath('string()')
+            elif tag == 'detaileddescription' and len(child):
+                detail = child[0].xpath('string()')
+                paragraphs = [para.xpath('string()') for para in child.iter('para')
+                              if para.getparent() is child]
+            elif tag == 'argsstring':
+                record['argsstring'] = child.xpath('string()')
+            elif tag == 'type':
+                record['return_type'] = child.xpath('string()')
+            elif tag == 'param':
+                argtype, argname = '', ''
+                for node in child:
+                    if node.tag in ('type', 'array'):
+                        argtype += node.xpath('string()')
+                    elif node.tag == 'declname':
+                        argname = node.text or ''
+                if record['params'] is None:
+                    record['params'] = []
+                record['params'].append((argtype, argname))
+            elif tag == 'basecompoundref':
+                record['bases'].append((child.get('refid', ''), child.text or ''))
+        record['summary'] = first_line(brief) or first_line(detail)
+        record['description'] = join_paragraphs(paragraphs)
+        records.append(record)
+    return records
+
+
+def apply_record(item: DoxygenItem, record: Dict[str, Any]) -> None:
+    """Set the summary, the description, the protection, the arguments and
+    return type of a function (or the type of another member), and the base
+    classes of a class, from a record returned by :func:`extract_records`.
+
+    Parameters
+    ----------
+    item: DoxygenItem
+        Item read from the index of the Doxygen project.
+    record: Dict[str, Any]
+        Record of the item.
+    """
+    item.set_summary(record['summary'])
+    item.description = record.get('description', '')
+    item.protection = record.get('protection', '')
+    if item.kind in ('variable', 'typedef'):
+        item.type = record['return_type']
+        item.argsstring = record['argsstring']  # array bounds, function types
+    if item.kind == 'function':
+        item.set_argsstring(record['argsstring'])
+        # empty argument list -> void
+        item.set_args(record['params'] or [('void', '')])
+        item.set_return_type(record['return_type'])
+    if record.get('bases'):
+        item.set_bases(record['bases'])
+        for index in [symbols, *partitions.values()]:
+            index.linearized_bases.clear()  # the inheritance graph changed
+
+
+def parse_index(xmldir: str) -> Dict[str, DoxygenItem]:
+    """Read the names and kinds of all items of a Doxygen project from its
+    ``index.xml``.
+
+    Parameters
+    ----------
+    xmldir : str
+        Directory containing the xml files of the Doxygen project.
+
+    Return
+    ------
+    Dict[str, DoxygenItem]
+        Map of refid -> item (without summary, arguments and return type).
+
+    Raises
+    ------
+    ValueError
+        When the behavior of Doxygen-created XML elements are not as expected.
+    """
+    # step1: retrieve reference IDs from index.xml of the Doxygen project
+    index_fname = os.path.join(xmldir, 'index.xml')
+    index_file = parse(index_fname)
+    doxygenindex = index_file.firstChild
+
+    # step2: loop over each "compound" in index and get its information
+    # index_data = dict of refid -> DoxygenItem(name, kind)
+    index_data: Dict[str, DoxygenItem] = {}
+    for compound in doxygenindex.getElementsByTagName('compound'):
+        # step2.1: get the information of the 'compound' node
+        refid = compound.getAttribute('refid')
+        compound_kind = compound.getAttribute('kind')
+        if not (refid or compound_kind):
+            raise ValueError('Cannot detect the compound')
+        compound_name = compound.firstChild
+        if compound_name.tagName != 'name':
+            raise ValueError('Expected first child of "compound" tagged "name"')
+        compound_name = compound_name.firstChild.data
+        index_data[refid] = DoxygenItem(refid=refid, name=compound_name, kind=compound_kind)
+
+        # step2.2: get information of childnode 'member' of 'compound'
+        enumname = ''
+        for member in compound.getElementsByTagName("member"):
+            refid = member.getAttribute('refid')
+            member_kind = member.getAttribute('kind')
+            member_name = member.firstChild.firstChild.data
+            # enumvalue name must be scoped in the enum name
+            if compound_kind == 'enum':
+                enumname = member_name
+            elif compound_kind == 'enumvalue':
+                member_name = '::'.join([enumname, member_name])
+            # if compound is not a file, add scope name to member name
+            if compound_kind != 'file':
+                member_name = '::'.join([compound_name, member_name])
+            index_data[refid] = DoxygenItem(refid=refid, name=member_name, kind=member_kind)
+
+    return index_data
+
+
+def compound_files(xmldir: str) -> List[str]:
+    """Get the compound files of a Doxygen project (all xml files except
+    ``index.xml``), sorted by path.
+
+    Parameters
+    ----------
+    xmldir : str
+        Directory containing the xml files of the Doxygen project.
+
+    Return
+    ------
+    List[str]
+        Paths of the compound files.
+    """
+    return [str(xml_fname) for xml_fname in sorted(Path(xmldir).rglob('*.xml'))
+            if xml_fname.name != 'index.xml']
+
+
+member_refid_re = re.compile(r'^(.+)_1[a-z]{1,2}[0-9a-f]{32}(?:[a-z][0-9a-f]{32})?$')
+"""Regex of the refid of a member: the refid of its compound followed by
+``_1``, a kind letter (two in groups) and the 32 hexadecimal digits of an MD5
+hash, and by a second letter and hash for enum values."""
+
+
+def compound_refid(refid: str) -> str:
+    """Get the refid of the compound (i.e. the name of the xml file) in which
+    an item is defined.
+
+    Examples
+    --------
+    >>> compound_refid('classexample_1_1Example_1a9b6f5d39a2e6f2c1a8fd1b2c3d4e5f60')
+    'classexample_1_1Example'
+    >>> compound_refid('namespaceexample')
+    'namespaceexample'
+    >>> compound_refid('classgeom_1_1aabb')  # class name looking like a hash
+    'classgeom_1_1aabb'
+    >>> compound_refid('classgeom_1_1aabb_1a0c4f9b5e2d7a8c1b3e6f9a2d5c8b1e4f')
+    'classgeom_1_1aabb'
+    >>> compound_refid('group__io_1ga0c4f9b5e2d7a8c1b3e6f9a2d5c8b1e4f')
+    'group__io'
+    >>> compound_refid('example_8hpp_1a0c4f9b5e2d7a8c1b3e6f9a2d5c8b1e4fa'
+    ...                '9b6f5d39a2e6f2c1a8fd1b2c3d4e5f60')  # enum value
+    'example_8hpp'
+    """
+    m = member_refid_re.match(refid)
+    return m.group(1) if m else refid
+
+
+def parse_doxygen_xml(xmldir: str, engine: str = 'python',
+                      cache: Any = None) -> List[DoxygenItem]:
+    """Read all items of a Doxygen project.
+
+    Parameters
+    ----------
+    xmldir : str
+        Directory containing the xml files of the Doxygen project.
+    engine : str, optional
+        Engine extracting the data of the items from compound files
+        (``'python'`` or ``'xslt'``, see :func:`extract_records`).
+    cache : sphinx_doxysummary.cache.RecordCache, optional
+        Cache of the records of compound files.
+
+    Return
+    ------
+    List[DoxygenItem]
+        Items of the project, with their summary, arguments and return type.
+
+    Raises
+    ------
+    ValueError
+        When the behavior of Doxygen-created XML elements are not as expected.
+    """
+    index_data = parse_index(os.path.abspath(xmldir))
+    extract = cache.records if cache is not None else extract_records
+
+    # step3: get item summary (first paragraph of the brief description, or
+    # first paragraph of the detatiled description if the former choice is
+    # empty) and item arguments (if item is function) in all other xml files
+    for xml_fname in compound_files(os.path.abspath(xmldir)):
+        for record in extract(xml_fname, engine):
+            if record['refid'] in index_data:  # definition node found in the file
+                apply_record(index_data[record['refid']], record)
+
+    return list(index_data.values())
+
+
+def load_from_server(socket_path: str, xmldir: str, engine: str = 'python',
+                     timeout: float = 60.0) -> List[DoxygenItem]:
+    """Request the items of a Doxygen project from a symbol server.
+
+    Parameters
+    ----------
+    socket_path: str
+        Path of the Unix socket of the server.
+    xmldir : str
+        Directory containing the xml files of the Doxygen project.
+    engine : str, optional
+        XML extraction engine used if the server parses the project.
+    timeout : float, optional
+        Time to wait for the answer of the server, in seconds.
+
+    Return
+    ------
+    List[DoxygenItem]
+        Items of the project, or ``None`` if the server cannot be used or does
+        not answer in time.
+    """
+    from sphinx_doxysummary.server import request_server
+    try:
+        return request_server(socket_path, {'op': 'load', 'xmldir': xmldir,
+                                            'engine': engine}, timeout)
+    except (AttributeError, OSError, RuntimeError) as err:
+        logger.warning('doxysummary: symbol server %s unavailable (%s), '
+                       'parsing %s in process', socket_path, err, xmldir)
+        return None
 
 
 def process_generate_xmltree(app: Sphinx) -> None:
     """Create a tree of name -> ``DoxygenItem``.
 
-    This process parses through all xml files in all Doxygen projects which are
-    declared in the config variable ``doxygen_xml``, and creates a look-up
-    table (i.e. a map of item full scope name to its corresponding DexygenItem
-    objects) stored in the extern variable ``xml_tree``.
+    This process declares all Doxygen projects of the config variable
+    ``doxygen_xml``. The xml files of a project are parsed when an entry is
+    first looked up in it (see :func:`symbol_index`), and its items are stored
+    in a look-up table (i.e. a map of item full scope name to its corresponding
+    DexygenItem objects) of the project in ``partitions``, and in the extern
+    variable ``xml_tree``. Projects referenced by no page are never parsed.
+
+    Entries of ``doxygen_xml`` which are files are read as symbol inventories
+    (see :mod:`sphinx_doxysummary.inventory`). If the config variable
+    ``doxysummary_index`` is set, the items of the
+    projects which have not been modified since the symbol index was built are
+    loaded from the index (see :mod:`sphinx_doxysummary.prebuilt`). Otherwise,
+    if the config variable ``doxysummary_server`` is set, the items are
+    requested from a running symbol server (see
+    :mod:`sphinx_doxysummary.server`), and parsed in process only when the
+    server is unreachable. Compound files already parsed by any build are
+    read from the cache of the config variable ``doxysummary_cache_dir`` (see
+    :mod:`sphinx_doxysummary.cache`).
 
     Parameters
     ----------
@@ -196,103 +957,45 @@ def process_generate_xmltree(app: Sphinx) -> None:
       process of Sphinx.
 
     - The name saved in ``xml_tree`` is the full scope name of item.
+
+    - When the config variable ``doxysummary_pipeline`` is set, the Doxygen
+      projects are read by :func:`sphinx_doxysummary.pipeline.process_pipelined_build`
+      instead (and by the functions of :mod:`sphinx_doxysummary.shard` in
+      sharded builds).
     """
-    for xmldir in app.config.doxygen_xml:
-        # step1: retrieve reference IDs from index.xml of the Doxygen project
-        xmldir = os.path.abspath(xmldir)
-        index_fname = os.path.join(xmldir, 'index.xml')
-        index_file = parse(index_fname)
-        doxygenindex = index_file.firstChild
-
-        # step2: loop over each "compound" in index and get its information
-        # index_data = dict of refid -> DoxygenItem(name, kind)
-        index_data: Dict[str, DoxygenItem] = {}
-        for compound in doxygenindex.getElementsByTagName('compound'):
-            # step2.1: get the information of the 'compound' node
-            refid = compound.getAttribute('refid')
-            compound_kind = compound.getAttribute('kind')
-            if not (refid or compound_kind):
-                raise ValueError('Cannot detect the compound')
-            compound_name = compound.firstChild
-            if compound_name.tagName != 'name':
-                raise ValueError('Expected first child of "compound" tagged "name"')
-            compound_name = compound_name.firstChild.data
-            index_data[refid] = DoxygenItem(refid=refid, name=compound_name, kind=compound_kind)
-
-            # step2.2: get information of childnode 'member' of 'compound'
-            enumname = ''
-            for member in compound.getElementsByTagName("member"):
-                refid = member.getAttribute('refid')
-                member_kind = member.getAttribute('kind')
-                member_name = member.firstChild.firstChild.data
-                # enumvalue name must be scoped in the enum name
-                if compound_kind == 'enum':
-                    enumname = member_name
-                elif compound_kind == 'enumvalue':
-                    member_name = '::'.join([enumname, member_name])
-                # if compound is not a file, add scope name to member name
-                if compound_kind != 'file':
-                    member_name = '::'.join([compound_name, member_name])
-                index_data[refid] = DoxygenItem(refid=refid, name=member_name, kind=member_kind)
-
-        # step3: get item summary (first paragraph of the brief description, or
-        # first paragraph of the detatiled description if the former choice is
-        # empty) and item arguments (if item is function) in all other xml files
-        for xml_fname in Path(xmldir).rglob('*.xml'):
-            xml_file = etree.parse(str(xml_fname))
-            for refid in index_data.keys():
-                itemdef = xml_file.xpath(f'''.//*[@id='{refid}']''')
-                if itemdef:  # definition node found in the file
-                    itemdef = itemdef[0]
-                    # step3.1: get item summary
-                    # get brief description
-                    brief = get_first_child_by_tag_name(itemdef, 'briefdescription')[0]
-                    paragraph = brief.getchildren()
-                    if paragraph:
-                        summary = brief.getchildren()[0].xpath("string()")
-                        summary = summary.strip().splitlines()[0]
-                    else:
-                        summary = ''
-                    # in case of an empty brief descrip[tion, use detailed
-                    # description instead
-                    if summary == '':
-                        detail = get_first_child_by_tag_name(itemdef, 'detaileddescription')[0]
-                        paragraph = detail.getchildren()
-                        if paragraph:
-                            summary = paragraph[0].xpath("string()")
-                            summary = summary.strip().splitlines()[0]
-                        else:
-                            summary = ''
-                    index_data[refid].set_summary(summary)
-
-                    # step3.2: get argument and return type if kind is 'function'
-                    if index_data[refid].kind == 'function':
-                        argsstring = get_first_child_by_tag_name(itemdef, 'argsstring')
-                        index_data[refid].set_argsstring(argsstring[0].xpath("string()"))
-                        params = get_first_child_by_tag_name(itemdef, 'param')
-                        arguments: List[Tuple[str, str]] = []  # args of func
-                        if len(params) == 0:  # empty argument list
-                            index_data[refid].set_args([('void', '')])
-                            continue
-                        # get argtype and argname
-                        for param in params:
-                            argtype = param.xpath('.//type')[0].xpath("string()")
-                            argname = param.xpath('.//declname')
-                            if argname:  # argname is not empty
-                                argname = argname[0].text
-                            else:  # declare function prototype only
-                                argname = ''
-                            arguments.append((argtype, argname))
-                        index_data[refid].set_args(arguments)
-                        # get return type
-                        return_type = get_first_child_by_tag_name(itemdef, 'type')
-                        return_type = return_type[0].xpath("string()")
-                        index_data[refid].set_return_type(return_type)
-
-        # step4: integrate all items to the global variable xmltree
-        global xml_tree
-        for refid in index_data.keys():
-            if index_data[refid].name not in xml_tree.keys():
-                xml_tree[index_data[refid].name] = [index_data[refid]]
-            else:
-                xml_tree[index_data[refid].name].append(index_data[refid])
+    if build_mode(app.config) != 'default':
+        return  # see pipeline, shard and incremental modules
+
+    index = None
+    if app.config.doxysummary_index:
+        from sphinx_doxysummary.prebuilt import load_index
+        index = load_index(os.path.join(app.confdir, app.config.doxysummary_index))
+    from sphinx_doxysummary.cache import get_record_cache
+    cache = get_record_cache(app)
+
+    def loader(xmldir: str) -> Callable[[], List[DoxygenItem]]:
+        def load() -> List[DoxygenItem]:
+            items: List[DoxygenItem] = None
+            from sphinx_doxysummary.inventory import is_inventory, read_inventory
+            if is_inventory(xmldir):
+                items = read_inventory(xmldir)
+            if items is None and index is not None:
+                from sphinx_doxysummary.prebuilt import prebuilt_items
+                items = prebuilt_items(index, xmldir)
+            if items is None and app.config.doxysummary_server:
+                items = load_from_server(app.config.doxysummary_server, xmldir,
+                                         app.config.doxysummary_xml_engine,
+                                         app.config.doxysummary_server_timeout)
+            if items is None:
+                items = parse_doxygen_xml(xmldir, app.config.doxysummary_xml_engine,
+                                          cache)
+                if cache is not None:
+                    cache.report()
+            logger.verbose('[doxysummary] %d items loaded from %s', len(items), xmldir)
+            return items
+        return load
+
+    # projects are loaded when an entry is looked up in them (see symbol_index)
+    clear_xml_tree()
+    for project, xmldir in doxygen_projects(app.config):
+        add_project(project, loader(xmldir))
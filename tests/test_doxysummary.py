@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests of doxysummary: Doxygen runs, parsing of declarations, and builds of the
+example project.
+
+The Doxygen XML of ``example/example.hpp`` (with a derived class, a nested
+namespace, and a class ``geom::aabb`` whose name looks like the hash of a
+member refid) is stored in ``tests/xml``, so that Doxygen is not needed: the
+builds read a copy of it, and a fake ``doxygen`` command copies it.
+"""
+
+import doctest
+import os
+import pickle
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import time
+
+from pathlib import Path
+from urllib.parse import unquote
+
+import pytest
+
+from sphinx_doxysummary import declarator
+from sphinx_doxysummary.doxygen import load_stamp, run_doxygen
+from sphinx_doxysummary.inventory import read_inventory
+from sphinx_doxysummary.prebuilt import load_index, save_index
+from sphinx_doxysummary.server import request_server, serve
+from sphinx_doxysummary.xmltree import (SymbolIndex, compound_files, compound_refid,
+                                        extract_records, load_from_server,
+                                        parse_doxygen_xml, parse_index)
+
+tests_dir = Path(__file__).resolve().parent
+repo_dir = tests_dir.parent
+xml_fixture = tests_dir / 'xml'
+example_index = repo_dir / 'example' / 'source' / 'index.rst'
+
+conf_template = '''
+import sys
+sys.path.insert(0, {repo_dir!r})
+project = 'DoxySummary Example'
+extensions = ['sphinx.ext.autosummary', 'breathe', 'sphinx_doxysummary']
+breathe_projects = {{'example': {xmldir!r}}}
+breathe_default_project = 'example'
+doxygen_xml = [{xmldir!r}]
+'''
+
+
+def test_declarator_doctests():
+    """The doctests of the declarator parser pass, including malformed
+    declarations, which must not hang."""
+    result = doctest.testmod(declarator)
+    assert result.attempted > 0
+    assert result.failed == 0
+
+
+@pytest.mark.parametrize('declaration', [
+    '(std::vector<int)', '(int])', '(a<b)', '(operator<)',
+    '(std::enable_if_t<N<3, int> x)', '(std::map<int,', '((', '<<<', ')>]',
+])
+def test_declarator_malformed(declaration):
+    """Unbalanced declarations are parsed without error."""
+    assert isinstance(declarator.canonical_args(declaration), list)
+
+
+def test_compound_refid():
+    """Every item of the fixture is mapped to the compound file defining it,
+    including compounds whose names look like member hashes."""
+    assert compound_refid('classgeom_1_1aabb') == 'classgeom_1_1aabb'
+    for refid in parse_index(str(xml_fixture)):
+        assert (xml_fixture / f'{compound_refid(refid)}.xml').is_file(), refid
+
+
+def test_suggest_names():
+    """The suggestions of all enclosing scopes are ranked together."""
+    symbols = SymbolIndex()
+    for item in parse_index(str(xml_fixture)).values():
+        symbols.register(item)
+    assert symbols.suggest_names('foo_functon', 'example::inner')[0] == 'foo_function'
+    assert symbols.suggest_names('inner_functon', 'example::inner')[0] == (
+        'example::inner::inner_function')
+    with pytest.raises(ValueError, match='did you mean: foo_function'):
+        symbols.resolve_name('foo_functon', 'example::inner')
+
+
+def test_symbol_server(tmp_path):
+    """The symbol server replaces the socket of a stopped server, but not a
+    running server or another file, and builds do not wait for a server which
+    does not answer."""
+    if not hasattr(socket, 'AF_UNIX'):
+        pytest.skip('the symbol server listens to a Unix socket')
+    socket_path = str(tmp_path / 'server.sock')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(socket_path)
+    server = subprocess.Popen([sys.executable, '-m', 'sphinx_doxysummary', 'serve',
+                               '--socket', socket_path, str(xml_fixture)])
+    try:
+        for _ in range(300):
+            try:
+                assert request_server(socket_path, {'op': 'ping'}) == 'pong'
+                break
+            except OSError:
+                time.sleep(0.1)
+        items = request_server(socket_path, {'op': 'load', 'xmldir': str(xml_fixture)})
+        assert ({item.refid for item in items}
+                == {item.refid for item in parse_doxygen_xml(str(xml_fixture))})
+        found = request_server(socket_path, {'op': 'lookup', 'xmldir': str(xml_fixture),
+                                             'name': 'foo_function'})
+        assert [item.summary for item in found] == ['Foo function.']
+
+        second = subprocess.run([sys.executable, '-m', 'sphinx_doxysummary', 'serve',
+                                 '--socket', socket_path],
+                                stderr=subprocess.PIPE, universal_newlines=True,
+                                timeout=60)
+        assert second.returncode == 1
+        assert 'already listens' in second.stderr
+    finally:
+        request_server(socket_path, {'op': 'shutdown'})
+        server.wait(timeout=60)
+    assert not os.path.exists(socket_path)
+
+    regular = tmp_path / 'notes.txt'
+    regular.write_text('notes\n')
+    with pytest.raises(ValueError, match='not a socket'):
+        serve(str(regular))
+    assert regular.read_text() == 'notes\n'
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as hung:
+        hung.bind(socket_path)
+        hung.listen()
+        start = time.monotonic()
+        assert load_from_server(socket_path, str(xml_fixture), timeout=0.5) is None
+        assert time.monotonic() - start < 30
+
+
+def item_data(items):
+    """Map the refids of items to the data saved in inventories."""
+    return {item.refid: (item.name, item.kind, item.summary, item.argsstring,
+                         item.return_type, item.args, item.bases, item.description,
+                         item.protection, item.type)
+            for item in items}
+
+
+def test_xslt_engine():
+    """The XSLT engine extracts the same records as the Python engine."""
+    xml_fnames = compound_files(str(xml_fixture))
+    assert xml_fnames
+    for xml_fname in xml_fnames:
+        assert extract_records(xml_fname, 'xslt') == extract_records(xml_fname), xml_fname
+    assert (item_data(parse_doxygen_xml(str(xml_fixture), 'xslt'))
+            == item_data(parse_doxygen_xml(str(xml_fixture))))
+    with pytest.raises(ValueError):
+        extract_records(xml_fnames[0], 'sax')
+
+
+@pytest.fixture
+def doxygen_project(tmp_path, monkeypatch):
+    """Doxygen project with a fake ``doxygen`` command on ``PATH``, which copies
+    the XML fixture and counts its runs."""
+    if os.name == 'nt':
+        pytest.skip('the fake doxygen command is a POSIX script')
+    (tmp_path / 'inc').mkdir()
+    (tmp_path / 'inc' / 'example.hpp').write_text('int foo_function();\n')
+    (tmp_path / 'Doxyfile').write_text('INPUT = inc\n'
+                                       'OUTPUT_DIRECTORY = out\n'
+                                       'GENERATE_XML = YES\n')
+    bindir = tmp_path / 'bin'
+    bindir.mkdir()
+    doxygen = bindir / 'doxygen'
+    doxygen.write_text(f'#!{sys.executable}\n'
+                       'import shutil\n'
+                       f'shutil.copytree({str(xml_fixture)!r}, "out/xml", '
+                       'dirs_exist_ok=True)\n'
+                       'with open("runs.log", "a") as f:\n'
+                       '    f.write("run\\n")\n')
+    doxygen.chmod(0o755)
+    monkeypatch.setenv('PATH', f'{bindir}{os.pathsep}{os.environ["PATH"]}')
+    return tmp_path
+
+
+def doxygen_runs(project: Path) -> int:
+    """Count the runs of the fake doxygen command."""
+    log = project / 'runs.log'
+    return len(log.read_text().splitlines()) if log.exists() else 0
+
+
+def test_run_doxygen_stamp(doxygen_project):
+    """Doxygen is run only when its input changed or its output is missing."""
+    doxyfile = str(doxygen_project / 'Doxyfile')
+    xmldir, digests = run_doxygen(doxyfile)
+    assert xmldir == str(doxygen_project / 'out' / 'xml')
+    assert doxygen_runs(doxygen_project) == 1
+    assert os.path.join(xmldir, 'index.xml') in digests
+    assert load_stamp(xmldir)[1] == digests
+
+    # unchanged input: not run
+    assert run_doxygen(doxyfile) == (xmldir, None)
+    assert doxygen_runs(doxygen_project) == 1
+
+    # modified source file: run again
+    (doxygen_project / 'inc' / 'example.hpp').write_text('int foo_function(int);\n')
+    assert run_doxygen(doxyfile)[1] == digests
+    assert doxygen_runs(doxygen_project) == 2
+
+    # new source file matching the default patterns: run again
+    (doxygen_project / 'inc' / 'extra.h').write_text('int bar();\n')
+    assert run_doxygen(doxyfile)[1] is not None
+    assert doxygen_runs(doxygen_project) == 3
+
+    # file not matching the patterns: not run
+    (doxygen_project / 'inc' / 'notes.txt').write_text('notes\n')
+    assert run_doxygen(doxyfile)[1] is None
+    assert doxygen_runs(doxygen_project) == 3
+
+    # missing output: run again
+    os.remove(os.path.join(xmldir, 'index.xml'))
+    assert run_doxygen(doxyfile)[1] is not None
+    assert doxygen_runs(doxygen_project) == 4
+
+
+def test_run_doxygen_failure(doxygen_project):
+    """A failing Doxygen command is reported."""
+    with pytest.raises(ValueError):
+        run_doxygen(str(doxygen_project / 'Doxyfile'), 'false')
+    with pytest.raises(ValueError):
+        run_doxygen(str(doxygen_project / 'Doxyfile'), 'no-such-doxygen-command')
+
+
+@pytest.fixture
+def example_project(tmp_path):
+    """Source directory of the example project, reading a copy of the XML
+    fixture."""
+    pytest.importorskip('breathe')
+    xmldir = tmp_path / 'xml'
+    shutil.copytree(xml_fixture, xmldir)
+    srcdir = tmp_path / 'source'
+    srcdir.mkdir()
+    (srcdir / 'conf.py').write_text(conf_template.format(repo_dir=str(repo_dir),
+                                                         xmldir=str(xmldir)))
+    shutil.copy(example_index, srcdir / 'index.rst')
+    return tmp_path
+
+
+def build(project: Path, *options: str, builder: str = 'html') -> str:
+    """Build the output of a project (in a new process, since the symbol tables
+    of doxysummary are global), and get the warnings."""
+    result = subprocess.run(
+        [sys.executable, '-m', 'sphinx', '-q', '-b', builder, *options,
+         str(project / 'source'), str(project / 'build')],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    assert result.returncode == 0, result.stderr
+    return result.stderr
+
+
+def edit_summary(project: Path, old: str, new: str,
+                 compound: str = 'example_8hpp') -> None:
+    """Edit the brief description of an item in the XML file of a compound."""
+    fname = project / 'xml' / f'{compound}.xml'
+    text = fname.read_text()
+    assert f'<para>{old} </para>' in text
+    fname.write_text(text.replace(f'<para>{old} </para>', f'<para>{new} </para>'))
+
+
+@pytest.mark.parametrize('options', [[], ['-D', 'doxysummary_incremental=1']],
+                         ids=['default', 'incremental'])
+def test_xml_edit_propagates(example_project, options):
+    """A change of the XML files is shown by the next build, in the summary
+    table and in the generated file, without changing the rst sources."""
+    with open(example_project / 'source' / 'index.rst', 'a') as f:
+        f.write('\n.. doxysummary::\n   :toctree: generated\n\n   geom::aabb\n')
+    build(example_project, *options)
+    html = example_project / 'build'
+    assert 'Foo function.' in (html / 'index.html').read_text()
+
+    edit_summary(example_project, 'Foo function.', 'Foo function, edited.')
+    build(example_project, *options)
+    assert 'Foo function, edited.' in (html / 'index.html').read_text()
+    assert 'Foo function, edited.' in (html / 'generated' / 'foo_function.html').read_text()
+
+    # compound whose name looks like the hash of a member refid
+    edit_summary(example_project, 'Axis-aligned bounding box.', 'Bounding box, edited.',
+                 'classgeom_1_1aabb')
+    build(example_project, *options)
+    assert 'Bounding box, edited.' in (html / 'index.html').read_text()
+    assert 'Bounding box, edited.' in (html / 'generated' / 'geom.aabb.html').read_text()
+
+    # unchanged XML: the outputs are kept
+    mtime = (html / 'generated' / 'foo_function.html').stat().st_mtime_ns
+    build(example_project, *options)
+    assert (html / 'generated' / 'foo_function.html').stat().st_mtime_ns == mtime
+
+
+@pytest.mark.parametrize('template', ['cppbase.rst', 'cppnative.rst'])
+def test_member_pages_without_warnings(example_project, template):
+    """The members of a split class are declared without declaring the class
+    again."""
+    (example_project / 'source' / 'index.rst').write_text(
+        'Split class\n'
+        '===========\n\n'
+        '.. doxysummary::\n'
+        '   :toctree: generated\n\n'
+        '   Foo\n')
+    warnings = build(example_project, '-D', 'doxysummary_split_members=1',
+                     '-D', f'doxysummary_template={template}')
+    assert warnings == ''
+    generated = example_project / 'source' / 'generated'
+    assert sorted(path.name for path in generated.glob('Foo-members-*.rst')) == [
+        'Foo-members-1.rst', 'Foo-members-2.rst']
+    html = (example_project / 'build' / 'generated' / 'Foo-members-2.html').read_text()
+    assert 'a_public_method' in html
+
+
+@pytest.mark.parametrize('template', ['cppbase.rst', 'cppnative.rst'])
+def test_direct_links_have_anchors(example_project, template):
+    """The direct links of the summary tables point to existing anchors."""
+    build(example_project, '-D', 'doxysummary_direct_links=1',
+          '-D', f'doxysummary_template={template}')
+    html = example_project / 'build'
+    links = re.findall(r'href="(generated/[^"#]+)#([^"]+)"',
+                       (html / 'index.html').read_text())
+    assert links
+    for page, anchor in links:
+        assert f'id="{anchor}"' in (html / unquote(page)).read_text(), (page, anchor)
+
+
+def test_shard_merge_without_warnings(example_project):
+    """The rst files of the shard artifacts, saved in the source directory by
+    default, are not read by the merge build."""
+    index = example_project / 'source' / 'index.rst'
+    # the concept of the example is not supported by the C++ domain
+    index.write_text(re.sub(r'Example of concept.*?Incrementable\n', '',
+                            index.read_text(), flags=re.S))
+    for shard in range(3):
+        subprocess.run([sys.executable, '-m', 'sphinx_doxysummary', 'shard',
+                        '--shard', f'{shard}/3', str(example_project / 'source')],
+                       check=True)
+    shard_dir = example_project / 'source' / 'doxysummary_shards'
+    assert sorted(path.name for path in shard_dir.iterdir()) == [
+        'shard-0-of-3', 'shard-1-of-3', 'shard-2-of-3']
+    assert not (example_project / 'source' / 'generated').exists()
+
+    warnings = build(example_project, '-D', 'doxysummary_merge_shards=1')
+    assert warnings == ''
+    html = example_project / 'build'
+    assert 'Foo function.' in (html / 'generated' / 'foo_function.html').read_text()
+    assert not (html / 'doxysummary_shards').exists()
+
+
+def test_direct_links_in_latex(example_project):
+    """The anchors of the template ``cppnative.rst`` are not specific to HTML."""
+    build(example_project, '-D', 'doxysummary_direct_links=1',
+          '-D', 'doxysummary_template=cppnative.rst', builder='latex')
+    latex = next((example_project / 'build').glob('*.tex')).read_text()
+    links = re.findall(r'\\hyperref\[\\detokenize\{(generated/[^:}]+:[^}]+)\}', latex)
+    assert links
+    for link in links:
+        assert f'\\label{{\\detokenize{{{link}}}}}' in latex, link
+
+
+@pytest.mark.parametrize('layout', ['flat', 'scope', 'hash'])
+def test_stub_layouts(example_project, layout):
+    """The generated files are laid out and shortened as configured, and the
+    summary tables link to them."""
+    build(example_project, '-D', f'doxysummary_stub_layout={layout}')
+    generated = example_project / 'source' / 'generated'
+    stubs = {path.relative_to(generated).as_posix()
+             for path in generated.rglob('*.rst')}
+    long_name = 'example.a_long_named_function_for_testing_alias.rst'
+    if layout == 'flat':
+        assert long_name in stubs
+    elif layout == 'scope':
+        assert 'example/a_long_named_function_for_testing_alias.rst' in stubs
+    else:
+        assert any(re.fullmatch(r'[0-9a-f]{2}/' + re.escape(long_name), stub)
+                   for stub in stubs)
+
+    # names bounded by doxysummary_stub_max_length
+    shutil.rmtree(generated)
+    build(example_project, '-D', f'doxysummary_stub_layout={layout}',
+          '-D', 'doxysummary_stub_max_length=12')
+    stubs = [path.relative_to(generated) for path in generated.rglob('*.rst')]
+    assert stubs
+    assert all(len(part) <= 12 + len('.rst') for stub in stubs for part in stub.parts)
+    html = example_project / 'build'
+    links = set(re.findall(r'href="(generated/[^"#]+)', (html / 'index.html').read_text()))
+    assert len(links) == len(stubs)
+    for link in links:
+        assert (html / unquote(link)).is_file(), link
+
+
+def test_inventory(example_project):
+    """Inventories written by the command line and by builds hold the items of
+    the XML files, and are read in place of the XML files."""
+    xml_items = item_data(parse_doxygen_xml(str(xml_fixture)))
+    inventory = example_project / 'core.inv'
+    subprocess.run([sys.executable, '-m', 'sphinx_doxysummary', 'inventory',
+                    '--output', str(inventory), '--project', 'core', str(xml_fixture)],
+                   check=True)
+    assert inventory.read_bytes().startswith(b'# Doxysummary inventory version 2\n'
+                                             b'# Project: core\n')
+    assert item_data(read_inventory(str(inventory))) == xml_items
+
+    build(example_project, '-D', 'doxysummary_inventory=exported.inv')
+    exported = example_project / 'build' / 'exported.inv'
+    assert item_data(read_inventory(str(exported))) == xml_items
+
+    # the summaries are read from the inventory, edited to tell them apart
+    edit_summary(example_project, 'Foo function.', 'Foo function, edited.')
+    with open(example_project / 'source' / 'conf.py', 'a') as f:
+        f.write(f'doxygen_xml = [{str(inventory)!r}]\n')
+    build(example_project, '-E')
+    index = (example_project / 'build' / 'index.html').read_text()
+    assert 'Foo function.' in index
+    assert 'Foo function, edited.' not in index
+
+
+count_resolutions = '''
+import sys
+from sphinx.cmd.build import build_main
+from sphinx_doxysummary.generate import DoxySummaryEntry
+
+resolve = DoxySummaryEntry.resolve
+calls = []
+
+
+def counting_resolve(self):
+    calls.append((self.document, self.lineno, self.offset))
+    return resolve(self)
+
+
+DoxySummaryEntry.resolve = counting_resolve
+assert build_main(['-q', '-b', 'html', sys.argv[1], sys.argv[2]]) == 0
+print(len(calls), len(set(calls)))
+'''
+
+
+def test_entries_resolved_once(example_project):
+    """The entries resolved before reading the documents are reused by the
+    directives."""
+    script = example_project / 'count_resolutions.py'
+    script.write_text(count_resolutions)
+    result = subprocess.run([sys.executable, str(script), str(example_project / 'source'),
+                             str(example_project / 'build')],
+                            stdout=subprocess.PIPE, universal_newlines=True, check=True)
+    calls, resolved = map(int, result.stdout.split())
+    assert calls == resolved
+
+    store = example_project / 'build' / '.doctrees' / 'doxysummary_store'
+    with open(store / 'entries.pickle', 'rb') as f:
+        _, _, table = pickle.load(f)
+    assert calls == sum(len(entries) for entries in table['index'].values())
+    entry = next(entry for entries in table['index'].values() for entry in entries
+                 if entry.source.startswith('foo_function'))
+    assert (entry.summary, entry.docname) == ('Foo function.', 'generated/foo_function')
+
+
+def generated_files(project: Path) -> dict:
+    """Read the rst files generated in the source directory of a project."""
+    generated = project / 'source' / 'generated'
+    return {path.relative_to(generated).as_posix(): path.read_text()
+            for path in generated.rglob('*.rst')}
+
+
+def test_pipelined_build(example_project):
+    """A pipelined build generates the same files, with the same warnings, as
+    a default build."""
+    warnings = build(example_project)
+    expected = generated_files(example_project)
+    assert 'foo_function.rst' in expected
+    shutil.rmtree(example_project / 'source' / 'generated')
+    shutil.rmtree(example_project / 'build')
+
+    assert build(example_project, '-D', 'doxysummary_pipeline=1') == warnings
+    assert generated_files(example_project) == expected
+    html = example_project / 'build'
+    assert 'Foo function.' in (html / 'index.html').read_text()
+    assert 'Foo function.' in (html / 'generated' / 'foo_function.html').read_text()
+
+
+def doxysummary_cli(*args: str) -> subprocess.CompletedProcess:
+    """Run the command line interface of doxysummary."""
+    return subprocess.run([sys.executable, '-m', 'sphinx_doxysummary', *args],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True)
+
+
+def test_prebuilt_index(example_project):
+    """A symbol index built by the command line answers queries, and is used
+    by builds as long as the xml files are unchanged."""
+    xmldir = str(example_project / 'xml')
+    fname = str(example_project / 'symbols.pickle')
+    assert doxysummary_cli('index', '--output', fname, xmldir).returncode == 0
+
+    result = doxysummary_cli('query', '--index', fname, 'func_overload(int)')
+    assert result.returncode == 0
+    matched = [line for line in result.stdout.splitlines() if line.startswith('*')]
+    assert len(matched) == 1 and 'func_overload(int' in matched[0]
+    result = doxysummary_cli('query', '--index', fname, '--scope', 'example::inner',
+                             'foo_functon')
+    assert result.returncode == 1
+    assert 'did you mean: foo_function' in result.stderr
+
+    # items of the index, edited to tell them apart from the xml files
+    index = load_index(fname)
+    for item in index['projects'][xmldir][1]:
+        if item.name == 'foo_function':
+            item.summary = 'Foo function, from the index.'
+    save_index(fname, index)
+    build(example_project, '-D', f'doxysummary_index={fname}')
+    assert 'Foo function, from the index.' in (
+        example_project / 'build' / 'index.html').read_text()
+
+    # modified xml files: the index is outdated
+    edit_summary(example_project, 'Foo function.', 'Foo function, edited.')
+    build(example_project, '-D', f'doxysummary_index={fname}')
+    index_html = (example_project / 'build' / 'index.html').read_text()
+    assert 'Foo function, edited.' in index_html
+    assert 'from the index' not in index_html
+
+
+def test_inherited_members(example_project):
+    """Members of base classes are resolved when named by a derived class."""
+    symbols = SymbolIndex()
+    for item in parse_doxygen_xml(str(xml_fixture)):
+        symbols.register(item)
+    assert symbols.base_classes('Derived') == ['Foo']
+    assert symbols.base_classes('Foo') == []
+    assert symbols.resolve_name('Derived::a_public_method') == 'Foo::a_public_method'
+    assert symbols.resolve_name('a_public_method', 'Derived') == 'Foo::a_public_method'
+    assert symbols.resolve_inherited('Derived::no_such_member') is None
+
+    (example_project / 'source' / 'index.rst').write_text(
+        'Inherited member\n'
+        '================\n\n'
+        '.. doxysummary::\n'
+        '   :toctree: generated\n\n'
+        '   Derived::a_public_method\n')
+    assert build(example_project) == ''
+    html = example_project / 'build'
+    index = (html / 'index.html').read_text()
+    assert 'href="generated/Foo.a_public_method.html' in index
+    assert 'A public method.' in index
+    assert (html / 'generated' / 'Foo.a_public_method.html').is_file()